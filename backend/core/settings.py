@@ -47,6 +47,15 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Opt-in request profiling: Server-Timing header plus the SLOW_REQUEST_RING_SIZE
+# slowest sampled requests over SLOW_REQUEST_MS, kept in Redis
+REQUEST_PROFILING = env.bool('REQUEST_PROFILING', default=False)
+SLOW_REQUEST_MS = env.float('SLOW_REQUEST_MS', default=500)
+SLOW_REQUEST_SAMPLE_RATE = env.float('SLOW_REQUEST_SAMPLE_RATE', default=1.0)
+SLOW_REQUEST_RING_SIZE = env.int('SLOW_REQUEST_RING_SIZE', default=100)
+if REQUEST_PROFILING:
+    MIDDLEWARE.insert(1, 'monitor.profiling.ProfilingMiddleware')
+
 CORS_ALLOW_ALL_ORIGINS = True # Change in production
 CORS_ALLOW_CREDENTIALS = True
 
@@ -82,6 +91,38 @@ DATABASES = {
     'default': env.db('DATABASE_URL', default=f'sqlite:///{BASE_DIR}/db.sqlite3')
 }
 
+# Read replicas: safe-method API requests read from these (monitor/replicas.py),
+# writes, auth/sessions and everything outside a request stay on `default`.
+# Locally: REPLICA_DATABASE_URLS=sqlite:////tmp/replica.sqlite3 + `manage.py sync_replica`.
+REPLICA_DATABASE_URLS = env.list('REPLICA_DATABASE_URLS', default=[])
+REPLICA_DATABASES = []
+for index, url in enumerate(REPLICA_DATABASE_URLS):
+    alias = f'replica{index}'
+    DATABASES[alias] = {**env.db_url_config(url), 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(alias)
+# Seconds a client keeps reading from the primary after its own write
+REPLICA_STICKY_SECONDS = env.int('REPLICA_STICKY_SECONDS', default=15)
+if REPLICA_DATABASES:
+    DATABASE_ROUTERS = ['monitor.replicas.ReplicaRouter']
+    MIDDLEWARE.append('monitor.replicas.ReplicaMiddleware')
+
+# SQLite profile for the shared-volume deployment: WAL, busy timeout and cache
+# pragmas on connect (monitor/sqlite.py) plus persistent connections.
+SQLITE_TUNING = env.bool('SQLITE_TUNING', default=True)
+SQLITE_BUSY_TIMEOUT_MS = env.int('SQLITE_BUSY_TIMEOUT_MS', default=5000)
+SQLITE_MMAP_SIZE = env.int('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024)
+SQLITE_CACHE_SIZE_KB = env.int('SQLITE_CACHE_SIZE_KB', default=64 * 1024)
+for database in DATABASES.values():
+    if SQLITE_TUNING and database['ENGINE'] == 'django.db.backends.sqlite3':
+        database['CONN_MAX_AGE'] = env.int('SQLITE_CONN_MAX_AGE', default=600)
+        database['CONN_HEALTH_CHECKS'] = True
+        database.setdefault('OPTIONS', {}).setdefault('timeout', SQLITE_BUSY_TIMEOUT_MS / 1000)
+
+# Single-writer funnel: probe workers push results to Redis and
+# `manage.py run_result_writer` records them in batched transactions
+RESULT_FUNNEL = env.bool('RESULT_FUNNEL', default=False)
+RESULT_FUNNEL_BATCH = env.int('RESULT_FUNNEL_BATCH', default=200)
+
 AUTH_USER_MODEL = 'accounts.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -99,8 +140,19 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        'trigger': env('TRIGGER_THROTTLE_RATE', default='30/min'),
+    },
 }
 
+BULK_IMPORT_MAX_ROWS = env.int('BULK_IMPORT_MAX_ROWS', default=5000)
+
+# Manual "check now": skip sites checked in the last TRIGGER_RECENT_SECONDS,
+# merge repeat requests for sites already queued, and pace large batches.
+TRIGGER_RECENT_SECONDS = env.int('TRIGGER_RECENT_SECONDS', default=10)
+TRIGGER_COALESCE_SECONDS = env.int('TRIGGER_COALESCE_SECONDS', default=30)
+TRIGGER_BATCH_SIZE = env.int('TRIGGER_BATCH_SIZE', default=50)
+TRIGGER_BATCH_INTERVAL = env.float('TRIGGER_BATCH_INTERVAL', default=2.0)
 
 
 LANGUAGE_CODE = 'en-us'
@@ -126,6 +178,85 @@ CELERY_RESULT_BACKEND = env('CELERY_RESULT_BACKEND', default='redis://localhost:
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+
+# Queue routing: probes are sharded across PROBE_SHARDS by a consistent hash
+# of the website id, all other monitor tasks run on the housekeeping queue.
+# Start one worker per shard, e.g. `celery -A core worker -Q probes-0`.
+PROBE_SHARDS = env.list('PROBE_SHARDS', default=['probes-0'])
+PROBE_SHARD_VNODES = env.int('PROBE_SHARD_VNODES', default=256)
+HOUSEKEEPING_QUEUE = env('HOUSEKEEPING_QUEUE', default='housekeeping')
+CELERY_TASK_ROUTES = ('monitor.routing.route_task',)
+
+# Shards probed by `manage.py run_prober` instead of Celery. Beat skips these
+# when dispatching, so list every shard here to run the daemon exclusively.
+PROBER_DAEMON_SHARDS = env.list('PROBER_DAEMON_SHARDS', default=[])
+
+# Rows fetched per server-side cursor round trip by the streaming log and
+# incident exports (/api/logs/export/, /api/incidents/export/)
+EXPORT_CHUNK_SIZE = env.int('EXPORT_CHUNK_SIZE', default=5000)
+
+# Dispatcher backpressure (monitor/backpressure.py): sites with a check still
+# queued are not dispatched again (markers expire after DISPATCH_PENDING_TTL).
+# A shard whose broker queue holds DISPATCH_MAX_QUEUE_DEPTH checks, or whose
+# p95 queue wait over the last DISPATCH_LAG_WINDOW seconds reaches
+# DISPATCH_MAX_LAG_SECONDS, only gets its most urgent sites (down, then
+# failing, then most overdue) up to the depth limit, but at least
+# DISPATCH_MIN_BATCH per dispatch.
+DISPATCH_MAX_QUEUE_DEPTH = env.int('DISPATCH_MAX_QUEUE_DEPTH', default=1000)
+DISPATCH_MAX_LAG_SECONDS = env.float('DISPATCH_MAX_LAG_SECONDS', default=60.0)
+DISPATCH_LAG_WINDOW = env.int('DISPATCH_LAG_WINDOW', default=300)
+DISPATCH_MIN_BATCH = env.int('DISPATCH_MIN_BATCH', default=50)
+DISPATCH_PENDING_TTL = env.int('DISPATCH_PENDING_TTL', default=900)
+
+# Bytes requested by websites using the `range` probe mode
+PROBE_RANGE_BYTES = env.int('PROBE_RANGE_BYTES', default=16384)
+
+# Websites with the same normalized URL and probe mode reuse a probe result
+# up to this many seconds old (capped at half the site's interval); 0 disables
+PROBE_SHARE_MAX_AGE = env.int('PROBE_SHARE_MAX_AGE', default=30)
+
+# Probe budgets (monitor/budgets.py), shared by all workers through Redis: at
+# most PROBE_MAX_IN_FLIGHT probes overall and PROBE_HOST_MAX_IN_FLIGHT per
+# host at once, and PROBE_HOST_RATE probes/sec per host (bursts of
+# PROBE_HOST_BURST). 0 disables a limit. Over-budget probes are retried after
+# at least PROBE_DEFER_SECONDS, and skipped after PROBE_MAX_DEFERRALS retries.
+PROBE_BUDGETS = env.bool('PROBE_BUDGETS', default=True)
+PROBE_MAX_IN_FLIGHT = env.int('PROBE_MAX_IN_FLIGHT', default=500)
+PROBE_HOST_MAX_IN_FLIGHT = env.int('PROBE_HOST_MAX_IN_FLIGHT', default=4)
+PROBE_HOST_RATE = env.float('PROBE_HOST_RATE', default=2.0)
+PROBE_HOST_BURST = env.int('PROBE_HOST_BURST', default=10)
+PROBE_LEASE_SECONDS = env.int('PROBE_LEASE_SECONDS', default=60)
+PROBE_DEFER_SECONDS = env.float('PROBE_DEFER_SECONDS', default=5.0)
+PROBE_MAX_DEFERRALS = env.int('PROBE_MAX_DEFERRALS', default=5)
+
+# Cache (per-user website access sets, analytics). The in-process default is
+# only invalidated in the process that saw the change; with several web
+# processes set CACHE_URL (e.g. redis://localhost:6379/1) so a revoked grant
+# takes effect everywhere at once rather than within ACCESS_CACHE_TTL.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+ACCESS_CACHE_TTL = env.int('ACCESS_CACHE_TTL', default=300)
+INCIDENT_STATS_CACHE_TTL = env.int('INCIDENT_STATS_CACHE_TTL', default=60)
+
+# Adaptive check intervals (per-site opt-in via Website.adaptive_interval)
+ADAPTIVE_STABLE_CHECKS = env.int('ADAPTIVE_STABLE_CHECKS', default=3)
+ADAPTIVE_BACKOFF_FACTOR = env.float('ADAPTIVE_BACKOFF_FACTOR', default=1.5)
+
+# Latency anomaly detection (tune with `manage.py replay_latency`)
+LATENCY_EWMA_ALPHA = env.float('LATENCY_EWMA_ALPHA', default=0.05)
+LATENCY_ANOMALY_Z = env.float('LATENCY_ANOMALY_Z', default=4.0)
+LATENCY_WARMUP_SAMPLES = env.int('LATENCY_WARMUP_SAMPLES', default=20)
+LATENCY_ANOMALY_MIN_DELTA = env.float('LATENCY_ANOMALY_MIN_DELTA', default=0.1)
+LATENCY_ALERT_AFTER = env.int('LATENCY_ALERT_AFTER', default=3)
+
+# Compressed per-website sample store (monitor/tsdb.py). When enabled every
+# result is also appended there and history/replays read from it instead of
+# MonitorLog; `manage.py tsdb_backfill` imports existing logs.
+TSDB_ENABLED = env.bool('TSDB_ENABLED', default=False)
+TSDB_DIR = env('TSDB_DIR', default=str(BASE_DIR / 'tsdb'))
+TSDB_BLOCK_SAMPLES = env.int('TSDB_BLOCK_SAMPLES', default=1024)
+
 # Celery Beat Schedule
 from celery.schedules import crontab
 CELERY_BEAT_SCHEDULE = {
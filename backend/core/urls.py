@@ -1,12 +1,14 @@
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from monitor.views import WebsiteViewSet, MonitorLogViewSet, SystemHealthView, SystemSnapshotViewSet
+from monitor.views import WebsiteViewSet, MonitorLogViewSet, SystemHealthView, SystemSnapshotViewSet, SlowRequestView, IncidentViewSet, ErrorViewSet, ProbeBudgetView
 from accounts.views import UserViewSet, LoginView, LogoutView
 
 router = DefaultRouter()
 router.register(r'websites', WebsiteViewSet, basename='website')
 router.register(r'logs', MonitorLogViewSet, basename='log')
+router.register(r'incidents', IncidentViewSet, basename='incident')
+router.register(r'errors', ErrorViewSet, basename='error')
 router.register(r'snapshots', SystemSnapshotViewSet, basename='snapshot')
 router.register(r'users', UserViewSet, basename='user')
 
@@ -17,6 +19,8 @@ urlpatterns = [
     path('api/logout/', LogoutView.as_view(), name='api_logout'),
     path('api/health/', include([
         path('system/', SystemHealthView.as_view(), name='system_health'),
+        path('slow-requests/', SlowRequestView.as_view(), name='slow_requests'),
+        path('probe-budgets/', ProbeBudgetView.as_view(), name='probe_budgets'),
     ])),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
 
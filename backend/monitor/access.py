@@ -0,0 +1,66 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Website
+from .replicas import use_primary
+
+logger = logging.getLogger(__name__)
+
+ACCESS_CACHE_KEY = 'website_access:{}'
+
+
+def has_full_access(user):
+    return user.is_master or user.is_staff
+
+
+def accessible_website_ids(user):
+    """
+    Ids of the websites a non-master user owns or was granted through
+    `authorized_users`, cached per user. Invalidated by the signals in
+    monitor/signals.py; a cache outage falls back to computing it directly.
+    Always read from the primary: a lagging replica could otherwise put a
+    revoked grant back into the cache for ACCESS_CACHE_TTL.
+    """
+    key = ACCESS_CACHE_KEY.format(user.pk)
+    try:
+        ids = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Access cache unavailable: {e}")
+        ids = None
+    if ids is not None:
+        return ids
+
+    with use_primary():
+        owned = Website.objects.filter(owner_id=user.pk).values_list('id', flat=True)
+        granted = Website.authorized_users.through.objects.filter(user_id=user.pk).values_list('website_id', flat=True)
+        ids = sorted(set(owned) | set(granted))
+    try:
+        cache.set(key, ids, settings.ACCESS_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Access cache unavailable: {e}")
+    return ids
+
+
+def invalidate_access(user_ids):
+    keys = [ACCESS_CACHE_KEY.format(pk) for pk in set(user_ids) if pk is not None]
+    if not keys:
+        return
+    try:
+        cache.delete_many(keys)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate access cache: {e}")
+
+
+def visible_websites(user):
+    if has_full_access(user):
+        return Website.objects.all()
+    return Website.objects.filter(id__in=accessible_website_ids(user))
+
+
+def scope_to_websites(queryset, user, field='website_id'):
+    """Restrict any queryset with a website foreign key to the user's websites."""
+    if has_full_access(user):
+        return queryset
+    return queryset.filter(**{f"{field}__in": accessible_website_ids(user)})
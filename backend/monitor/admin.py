@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Website, MonitorLog
+from .models import Website, MonitorLog, ErrorSignature
 
 @admin.register(Website)
 class WebsiteAdmin(admin.ModelAdmin):
@@ -12,3 +12,9 @@ class MonitorLogAdmin(admin.ModelAdmin):
     list_display = ('website', 'timestamp', 'status_code', 'response_time', 'is_success')
     list_filter = ('is_success',)
     date_hierarchy = 'timestamp'
+
+@admin.register(ErrorSignature)
+class ErrorSignatureAdmin(admin.ModelAdmin):
+    list_display = ('error_class', 'template', 'first_seen')
+    list_filter = ('error_class',)
+    search_fields = ('template',)
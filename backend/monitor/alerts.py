@@ -0,0 +1,159 @@
+"""
+Per-recipient alert digests.
+
+Website alerts that fire within SystemConfig.alert_digest_window seconds of
+each other (a shared upstream outage, say) are buffered in Redis and sent
+as one email per recipient, clustered by host/IP and error class, at most
+alert_digest_max_batch alerts each. A window of 0, or Redis being down,
+sends every alert on its own.
+"""
+import json
+import socket
+import time
+import logging
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.utils import timezone
+
+from .errors import classify_error
+from .models import SystemConfig
+from .utils import get_redis
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = 'alert_digest:buffer:{}'
+WINDOW_KEY = 'alert_digest:window:{}'
+
+
+def format_alert(name, url, level, message):
+    subject = f"[{level}] Uptime Pulse: {name}"
+    full_message = f"Alert for {name} ({url})\n\nLevel: {level}\nTime: {timezone.now()}\n\nMessage: {message}"
+    return subject, full_message
+
+
+def deliver(subject, body, recipient):
+    try:
+        send_mail(
+            subject,
+            body,
+            settings.DEFAULT_FROM_EMAIL,
+            [recipient],
+            fail_silently=True,
+        )
+    except Exception as e:
+        print(f"FAILED TO SEND EMAIL: {e}")
+
+
+def queue_alert(website, level, message, error_message=None):
+    """
+    Buffer an alert for its recipient. The first alert in a window schedules a
+    flush after `alert_digest_window` seconds; a full batch flushes right away.
+    Returns False when digesting is disabled or Redis is unreachable so the
+    caller can fall back to sending immediately.
+    """
+    config = SystemConfig.get_solo()
+    if not config.alert_digest_window:
+        return False
+
+    from .tasks import flush_alert_digest
+
+    recipient = website.alert_email
+    event = {
+        "website_id": website.id,
+        "name": website.name,
+        "url": website.url,
+        "level": level,
+        "message": message,
+        "error_class": classify_error(error_message) if error_message else None,
+        "time": time.time(),
+    }
+    try:
+        r = get_redis(config)
+        pending = r.rpush(BUFFER_KEY.format(recipient), json.dumps(event))
+        if pending >= config.alert_digest_max_batch:
+            flush_alert_digest.delay(recipient)
+        elif r.set(WINDOW_KEY.format(recipient), 1, nx=True, ex=config.alert_digest_window):
+            flush_alert_digest.apply_async(args=[recipient], countdown=config.alert_digest_window)
+    except Exception as e:
+        logger.warning(f"Alert digest unavailable, sending directly: {e}")
+        return False
+    return True
+
+
+def flush_digest(recipient):
+    config = SystemConfig.get_solo()
+    r = get_redis(config)
+    buffer_key = BUFFER_KEY.format(recipient)
+    window_key = WINDOW_KEY.format(recipient)
+
+    # Open a fresh window before draining so alerts arriving mid-flush
+    # schedule their own delivery instead of waiting on this one.
+    r.delete(window_key)
+    with r.pipeline() as pipe:
+        pipe.lrange(buffer_key, 0, config.alert_digest_max_batch - 1)
+        pipe.ltrim(buffer_key, config.alert_digest_max_batch, -1)
+        raw, _ = pipe.execute()
+
+    if r.llen(buffer_key) and r.set(window_key, 1, nx=True, ex=max(config.alert_digest_window, 1)):
+        from .tasks import flush_alert_digest
+        flush_alert_digest.apply_async(args=[recipient], countdown=config.alert_digest_window)
+
+    events = [json.loads(x) for x in raw]
+    if not events:
+        return 0
+
+    subject, body = build_digest(events)
+    print(f"ALERTER: {subject}")
+    deliver(subject, body, recipient)
+    return len(events)
+
+
+def _resolve(host, cache):
+    if host not in cache:
+        try:
+            cache[host] = socket.gethostbyname(host)
+        except (OSError, UnicodeError):
+            cache[host] = None
+    return cache[host]
+
+
+def build_digest(events):
+    if len(events) == 1:
+        e = events[0]
+        return format_alert(e['name'], e['url'], e['level'], e['message'])
+
+    resolved = {}
+    for e in events:
+        e['host'] = urlsplit(e['url']).hostname or e['url']
+        e['ip'] = _resolve(e['host'], resolved)
+
+    levels = Counter(e['level'] for e in events)
+    subject = "[{}] Uptime Pulse digest: {} alerts".format(
+        ", ".join(f"{level} x{count}" for level, count in levels.most_common()),
+        len(events),
+    )
+
+    # Cluster by the factors a shared upstream failure would have in common
+    groups = defaultdict(list)
+    for e in events:
+        groups[(e['level'], e['ip'] or e['host'], e['error_class'])].append(e)
+
+    lines = [f"{len(events)} alerts collected up to {timezone.now()}.", ""]
+    for (level, target, error_class), members in sorted(groups.items(), key=lambda g: -len(g[1])):
+        factors = [f"target {target}"]
+        if error_class:
+            factors.append(f"error {error_class}")
+        lines.append(f"== {level}: {len(members)} site(s) sharing {', '.join(factors)} ==")
+        for e in members:
+            lines.append(f"  - {e['name']} ({e['url']}): {e['message']}")
+        lines.append("")
+
+    shared_hosts = Counter(e['host'] for e in events)
+    shared = [f"{host} ({count} sites)" for host, count in shared_hosts.most_common() if count > 1]
+    if shared:
+        lines.append("Shared hosts: " + ", ".join(shared))
+
+    return subject, "\n".join(lines)
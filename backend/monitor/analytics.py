@@ -0,0 +1,183 @@
+"""
+Incident reliability stats: MTTR (mean time to resolve), MTBF (mean
+uptime between the end of one incident and the start of the next),
+downtime and availability, overall, per period and per website. Fleet-wide
+results are cached for INCIDENT_STATS_CACHE_TTL seconds.
+"""
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Incident
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ('day', 'week', 'month')
+STATS_CACHE_KEY = 'incident_stats:{}'
+
+
+def parse_window(params, default_days=30):
+    """[since, until) from ISO `since`/`until` query params, or the last `days` days."""
+    until = parse_datetime(params['until']) if params.get('until') else None
+    since = parse_datetime(params['since']) if params.get('since') else None
+    if params.get('until') and until is None or params.get('since') and since is None:
+        raise ValueError("since/until must be ISO 8601 datetimes")
+    until = until or timezone.now()
+    if since is None:
+        since = until - timedelta(days=int(params.get('days', default_days)))
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    if timezone.is_naive(until):
+        until = timezone.make_aware(until)
+    if since >= until:
+        raise ValueError("since must be before until")
+    return since, until
+
+
+def with_gaps(incidents):
+    """
+    Annotate each incident with `uptime_before`: the time between the end of
+    the previous incident on the same website and this one's start. The
+    previous incident is looked up over all of the website's incidents (on
+    the (website, start_time) index), so time-window or other filters on
+    `incidents` never hide it, and unlike a window function the annotation
+    can be aggregated per website.
+    """
+    previous = (
+        Incident.objects.filter(website_id=OuterRef('website_id'))
+        .filter(Q(start_time__lt=OuterRef('start_time')) | Q(start_time=OuterRef('start_time'), id__lt=OuterRef('id')))
+        .order_by('-start_time', '-id')
+        .values('end_time')[:1]
+    )
+    return incidents.annotate(
+        previous_end=Subquery(previous),
+    ).annotate(
+        uptime_before=ExpressionWrapper(F('start_time') - F('previous_end'), output_field=DurationField()),
+    )
+
+
+def _round(value):
+    return round(value, 1) if value is not None else None
+
+
+def _open_downtime(incidents, now):
+    """Seconds of downtime per website for incidents that are still open."""
+    downtime = {}
+    for website_id, start in incidents.filter(is_resolved=False).values_list('website_id', 'start_time'):
+        downtime[website_id] = downtime.get(website_id, 0) + (now - start).total_seconds()
+    return downtime
+
+
+def _mtbf(value):
+    # MTBF: mean uptime between the end of one incident and the start of the next
+    return _round(value.total_seconds()) if value is not None else None
+
+
+def summary(incidents, since, until, website_count):
+    """MTTR, MTBF, downtime and availability over incidents that started in [since, until)."""
+    now = timezone.now()
+    totals = incidents.aggregate(
+        incidents=Count('id'),
+        open_incidents=Count('id', filter=Q(is_resolved=False)),
+        mttr=Avg('mttr_seconds'),
+        resolved_downtime=Sum('mttr_seconds'),
+    )
+    mtbf = with_gaps(incidents.order_by()).aggregate(mtbf=Avg('uptime_before'))['mtbf']
+    downtime = (totals['resolved_downtime'] or 0) + sum(_open_downtime(incidents, now).values())
+    observed = max((min(until, now) - since).total_seconds(), 1) * max(website_count, 1)
+    return {
+        "since": since,
+        "until": until,
+        "websites": website_count,
+        "incidents": totals['incidents'],
+        "open_incidents": totals['open_incidents'],
+        "mttr_seconds": _round(totals['mttr']),
+        "mtbf_seconds": _mtbf(mtbf),
+        "downtime_seconds": round(downtime, 1),
+        "availability": round(max(0.0, 1 - downtime / observed) * 100, 4),
+    }
+
+
+def timeline(incidents, period):
+    """Incident count, resolved downtime and MTTR per day/week/month of start_time."""
+    rows = (
+        incidents.order_by()
+        .annotate(period=Trunc('start_time', period))
+        .values('period')
+        .annotate(incidents=Count('id'), downtime_seconds=Sum('mttr_seconds'), mttr=Avg('mttr_seconds'))
+        .order_by('period')
+    )
+    return [
+        {
+            "period": row['period'],
+            "incidents": row['incidents'],
+            "downtime_seconds": row['downtime_seconds'] or 0,
+            "mttr_seconds": _round(row['mttr']),
+        }
+        for row in rows
+    ]
+
+
+def per_website(incidents, since, until):
+    """
+    One row per website with incidents in the window, worst first, with the
+    same MTBF definition as summary().
+    """
+    now = timezone.now()
+    span = max((min(until, now) - since).total_seconds(), 1)
+    rows = (
+        with_gaps(incidents.order_by())
+        .values('website_id', 'website__name')
+        .annotate(
+            incidents=Count('id'),
+            mtbf=Avg('uptime_before'),
+            open_incidents=Count('id', filter=Q(is_resolved=False)),
+            mttr=Avg('mttr_seconds'),
+            resolved_downtime=Sum('mttr_seconds'),
+        )
+        .order_by('-incidents', 'website_id')
+    )
+    open_downtime = _open_downtime(incidents, now)
+
+    results = []
+    for row in rows:
+        downtime = (row['resolved_downtime'] or 0) + open_downtime.get(row['website_id'], 0)
+        results.append({
+            "website_id": row['website_id'],
+            "website_name": row['website__name'],
+            "incidents": row['incidents'],
+            "open_incidents": row['open_incidents'],
+            "mttr_seconds": _round(row['mttr']),
+            "mtbf_seconds": _mtbf(row['mtbf']),
+            "downtime_seconds": round(downtime, 1),
+            "availability": round(max(0.0, 1 - downtime / span) * 100, 4),
+        })
+    return results
+
+
+def cached(scope, params, compute):
+    """
+    Cache fleet-wide results for INCIDENT_STATS_CACHE_TTL seconds. `scope`
+    identifies which websites the caller can see so users never share entries.
+    """
+    digest = hashlib.sha1(repr((scope, sorted(params.items()))).encode()).hexdigest()
+    key = STATS_CACHE_KEY.format(digest)
+    try:
+        result = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Incident stats cache unavailable: {e}")
+        return compute()
+    if result is None:
+        result = compute()
+        try:
+            cache.set(key, result, settings.INCIDENT_STATS_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Incident stats cache unavailable: {e}")
+    return result
@@ -0,0 +1,104 @@
+"""
+Per-website latency baselines.
+
+Each website keeps an EWMA of its log response time. A check is anomalous
+when it is LATENCY_ANOMALY_Z deviations above the baseline and at least
+LATENCY_ANOMALY_MIN_DELTA seconds slower than usual; record_result
+snapshots the first one and alerts after LATENCY_ALERT_AFTER in a row.
+`manage.py replay_latency` replays stored logs to compare thresholds.
+"""
+import math
+from collections import namedtuple
+
+from django.conf import settings
+
+Thresholds = namedtuple('Thresholds', ['alpha', 'z', 'warmup', 'min_delta'])
+
+# Floor for the log-space standard deviation so a very steady site is not
+# flagged for a few percent of jitter
+MIN_STD = 0.05
+
+
+def thresholds_from_settings():
+    return Thresholds(
+        alpha=settings.LATENCY_EWMA_ALPHA,
+        z=settings.LATENCY_ANOMALY_Z,
+        warmup=settings.LATENCY_WARMUP_SAMPLES,
+        min_delta=settings.LATENCY_ANOMALY_MIN_DELTA,
+    )
+
+
+class LatencyBaseline:
+    """
+    Exponentially weighted mean and variance of log(response time).
+
+    Constant memory and O(1) per sample. Latencies are roughly log-normal, so
+    working in log space makes the z-score mean "x times slower than usual"
+    for fast and slow sites alike. Anomalous samples are clamped to the
+    threshold before being folded in, so one spike cannot drag the baseline
+    up while a sustained level shift is still followed.
+    """
+
+    __slots__ = ('mean', 'var', 'count')
+
+    def __init__(self, mean=None, var=None, count=0):
+        self.mean = mean
+        self.var = var or 0.0
+        self.count = count
+
+    @classmethod
+    def for_website(cls, website):
+        return cls(website.latency_mean, website.latency_var, website.latency_samples)
+
+    def store(self, website):
+        website.latency_mean = self.mean
+        website.latency_var = self.var
+        website.latency_samples = self.count
+
+    @property
+    def typical(self):
+        """Baseline latency in seconds (geometric mean)."""
+        return math.exp(self.mean) if self.mean is not None else None
+
+    def std(self):
+        return max(math.sqrt(self.var), MIN_STD)
+
+    def observe(self, seconds, thresholds):
+        """Fold one successful response time in; returns (is_anomaly, z-score)."""
+        x = math.log(max(seconds, 1e-4))
+        if self.mean is None:
+            self.mean, self.var, self.count = x, 0.0, 1
+            return False, 0.0
+
+        z = (x - self.mean) / self.std()
+        anomaly = (
+            self.count >= thresholds.warmup
+            and z > thresholds.z
+            and seconds - self.typical > thresholds.min_delta
+        )
+        if anomaly:
+            x = self.mean + thresholds.z * self.std()
+
+        # Plain running average until warm so early samples are weighted fairly
+        alpha = max(thresholds.alpha, 1.0 / (self.count + 1))
+        diff = x - self.mean
+        increment = alpha * diff
+        self.mean += increment
+        self.var = (1 - alpha) * (self.var + diff * increment)
+        self.count += 1
+        return anomaly, z
+
+
+def observe_latency(website, result, thresholds=None):
+    """
+    Update the website's stored baseline from a probe result and track the
+    anomaly streak. Returns the z-score if the check was anomalous, else None.
+    Failed checks do not touch the baseline.
+    """
+    if not result['is_success'] or result['response_time'] is None:
+        return None
+    baseline = LatencyBaseline.for_website(website)
+    anomaly, z = baseline.observe(result['response_time'], thresholds or thresholds_from_settings())
+    baseline.store(website)
+    website.latency_anomalies = website.latency_anomalies + 1 if anomaly else 0
+    return z if anomaly else None
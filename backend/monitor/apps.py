@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class MonitorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'monitor'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if settings.SQLITE_TUNING:
+            from django.db.backends.signals import connection_created
+            from .sqlite import configure_connection
+            connection_created.connect(configure_connection, dispatch_uid='monitor.sqlite_profile')
@@ -0,0 +1,176 @@
+"""
+Backpressure for the beat dispatcher.
+
+Every dispatch measures, per probe shard, the number of checks waiting in
+the broker queue and how long recently dispatched checks waited before a
+worker started them. A shard over DISPATCH_MAX_QUEUE_DEPTH or
+DISPATCH_MAX_LAG_SECONDS is shedding: it only gets enough new checks to
+refill its queue to the depth limit (at least DISPATCH_MIN_BATCH), most
+urgent first, and the rest wait for a later dispatch. Sites that still have
+a check queued are never dispatched again.
+"""
+import json
+import logging
+import math
+import time
+
+from django.conf import settings
+
+from .routing import shard_for_website
+from .triggers import PENDING_KEY, mark_pending
+from .utils import get_broker, get_redis
+
+logger = logging.getLogger(__name__)
+
+LAG_KEY = 'probe_lag:{}'
+LAG_SAMPLES = 200
+STATE_KEY = 'dispatch_state'
+STATE_TTL = 600
+
+
+def record_lag(website_id, dispatched_at):
+    """Note how long a dispatched check sat in the queue before it started."""
+    lag = max(0.0, time.time() - dispatched_at)
+    key = LAG_KEY.format(shard_for_website(website_id))
+    try:
+        get_redis().pipeline().lpush(key, f"{time.time():.3f} {lag:.3f}").ltrim(key, 0, LAG_SAMPLES - 1).execute()
+    except Exception as e:
+        logger.debug(f"Failed to record probe lag: {e}")
+
+
+def mark_queued(website_ids, countdown=0):
+    """Best-effort pending markers for checks queued outside the dispatcher (failure polls, retries)."""
+    try:
+        mark_pending(get_redis(), website_ids, int(countdown + settings.DISPATCH_PENDING_TTL))
+    except Exception as e:
+        logger.debug(f"Failed to mark {website_ids} pending: {e}")
+
+
+def queue_depths(shards):
+    """Ready checks per shard queue in the broker (None if the broker can't be read)."""
+    try:
+        with get_broker().pipeline() as pipe:
+            for shard in shards:
+                pipe.llen(shard)
+            return dict(zip(shards, pipe.execute()))
+    except Exception as e:
+        logger.warning(f"Could not read probe queue depths: {e}")
+        return {shard: None for shard in shards}
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(pct / 100 * len(ordered))) - 1)]
+
+
+def lag_stats(r, shards, now=None):
+    """Median and p95 queue wait (seconds) over the last DISPATCH_LAG_WINDOW seconds, per shard."""
+    now = now or time.time()
+    with r.pipeline() as pipe:
+        for shard in shards:
+            pipe.lrange(LAG_KEY.format(shard), 0, LAG_SAMPLES - 1)
+        samples = pipe.execute()
+
+    stats = {}
+    for shard, raw in zip(shards, samples):
+        lags = []
+        for entry in raw:
+            at, lag = entry.split()
+            if now - float(at) <= settings.DISPATCH_LAG_WINDOW:
+                lags.append(float(lag))
+        stats[shard] = {
+            "samples": len(lags),
+            "lag_p50": round(_percentile(lags, 50), 3) if lags else None,
+            "lag_p95": round(_percentile(lags, 95), 3) if lags else None,
+        }
+    return stats
+
+
+def priority(website, now):
+    """
+    Sort key, most urgent first: down sites, then failing or anomalous ones,
+    then healthy ones; within a class, the most overdue relative to their
+    interval (never-checked sites first).
+    """
+    if website.current_status == 'down':
+        rank = 0
+    elif website.consecutive_failures or website.latency_anomalies:
+        rank = 1
+    else:
+        rank = 2
+    if not website.last_check_time:
+        return rank, -math.inf
+    overdue = (now - website.last_check_time).total_seconds() / max(website.effective_interval(), 1)
+    return rank, -overdue
+
+
+def plan(r, due, now):
+    """
+    Split the due websites into the ones to dispatch now and a per-shard
+    state report. Websites with a check already queued are dropped; shards
+    that are shedding are cut down to their remaining capacity by priority.
+    """
+    by_shard = {}
+    for website in due:
+        by_shard.setdefault(shard_for_website(website.id), []).append(website)
+    shards = sorted(by_shard)
+
+    with r.pipeline() as pipe:
+        for website in due:
+            pipe.exists(PENDING_KEY.format(website.id))
+        pending = {website.id for website, queued in zip(due, pipe.execute()) if queued}
+
+    depths = queue_depths(shards)
+    lags = lag_stats(r, shards)
+    max_depth = settings.DISPATCH_MAX_QUEUE_DEPTH
+    max_lag = settings.DISPATCH_MAX_LAG_SECONDS
+
+    selected = []
+    state = {}
+    for shard in shards:
+        waiting = [w for w in by_shard[shard] if w.id not in pending]
+        ordered = sorted(waiting, key=lambda w: priority(w, now))
+        depth = depths[shard]
+        lag = lags[shard]['lag_p95']
+        shedding = (depth is not None and depth >= max_depth) or (lag is not None and lag >= max_lag)
+        limit = len(ordered)
+        if shedding:
+            room = max_depth - depth if depth is not None else 0
+            limit = max(room, settings.DISPATCH_MIN_BATCH)
+        candidates, shed = ordered[:limit], ordered[limit:]
+        selected.extend(candidates)
+        state[shard] = {
+            "queue_depth": depth,
+            **lags[shard],
+            "shedding": shedding,
+            "due": len(by_shard[shard]),
+            "already_queued": len(by_shard[shard]) - len(waiting),
+            "dispatched": len(candidates),
+            "shed": len(shed),
+            "shed_down": sum(1 for w in shed if w.current_status == 'down'),
+        }
+    return selected, state
+
+
+def save_state(r, state):
+    report = {
+        "time": time.time(),
+        "shedding": any(shard['shedding'] for shard in state.values()),
+        "limits": {
+            "max_queue_depth": settings.DISPATCH_MAX_QUEUE_DEPTH,
+            "max_lag_seconds": settings.DISPATCH_MAX_LAG_SECONDS,
+            "min_batch": settings.DISPATCH_MIN_BATCH,
+        },
+        "shards": state,
+    }
+    try:
+        r.set(STATE_KEY, json.dumps(report), ex=STATE_TTL)
+    except Exception as e:
+        logger.debug(f"Failed to save dispatch state: {e}")
+    return report
+
+
+def dispatch_state(r):
+    """The report saved by the last dispatch, or None if there was none recently."""
+    raw = r.get(STATE_KEY)
+    return json.loads(raw) if raw else None
@@ -0,0 +1,116 @@
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution spec into a sampler returning seconds:
+    `const:0.05`, `uniform:0.01:0.2` or `lognormal:<median>:<sigma>`.
+    """
+    kind, *params = spec.split(':')
+    params = [float(p) for p in params]
+    if kind == 'const':
+        return lambda rng: params[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == 'lognormal':
+        mu = math.log(params[0])
+        return lambda rng: rng.lognormvariate(mu, params[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class FarmProfile:
+    def __init__(self, latency='lognormal:0.05:0.5', error_rate=0.0, slow_rate=0.0, hang_rate=0.0,
+                 body_size=2048, slow_body_seconds=2.0, hang_seconds=20.0, seed=None):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.hang_rate = hang_rate
+        self.body_size = body_size
+        self.slow_body_seconds = slow_body_seconds
+        self.hang_seconds = hang_seconds
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def draw(self):
+        with self.lock:
+            roll = self.rng.random()
+            latency = self.sample_latency(self.rng)
+        if roll < self.hang_rate:
+            return 'hang', latency
+        roll -= self.hang_rate
+        if roll < self.error_rate:
+            return 'error', latency
+        roll -= self.error_rate
+        if roll < self.slow_rate:
+            return 'slow', latency
+        return 'ok', latency
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        farm = self.server.farm
+        behaviour, latency = farm.profile.draw()
+        farm.count(behaviour)
+        time.sleep(latency)
+
+        if behaviour == 'hang':
+            time.sleep(farm.profile.hang_seconds)
+            return
+
+        status = 500 if behaviour == 'error' else 200
+        body = b'x' * farm.profile.body_size
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        if behaviour == 'slow':
+            chunks = 10
+            step = max(1, len(body) // chunks)
+            for i in range(0, len(body), step):
+                self.wfile.write(body[i:i + step])
+                self.wfile.flush()
+                time.sleep(farm.profile.slow_body_seconds / chunks)
+        else:
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+
+class TargetFarm:
+    """Local HTTP stand-in for monitored sites, driven by a FarmProfile."""
+
+    def __init__(self, profile, host='127.0.0.1', port=0):
+        self.profile = profile
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.farm = self
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, behaviour):
+        with self._lock:
+            self.counts[behaviour] = self.counts.get(behaviour, 0) + 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
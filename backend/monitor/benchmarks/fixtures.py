@@ -0,0 +1,189 @@
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from monitor.errors import intern_error, window_start
+from monitor.models import Website, MonitorLog, Incident, SystemSnapshot, ErrorCount
+
+MASTER_USERNAME = '__bench_master__'
+USER_PREFIX = '__bench_user_'
+
+ERRORS = [
+    "HTTP 500",
+    "HTTP 502",
+    "HTTP 503",
+    "HTTPSConnectionPool(host='example.com', port=443): Read timed out. (read timeout=15)",
+    "HTTPSConnectionPool(host='example.com', port=443): Max retries exceeded with url: / "
+    "(Caused by NewConnectionError('<urllib3.connection.HTTPSConnection object at 0x7f3a2c1b4d30>: "
+    "Failed to establish a new connection: [Errno 111] Connection refused'))",
+]
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep the timestamps we generate instead of auto_now_add."""
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in zip(fields, saved):
+            field.auto_now_add = auto_now_add
+
+
+def clear():
+    get_user_model().objects.filter(username__startswith='__bench_').delete()
+
+
+def seed(websites=1000, logs=1_000_000, days=30, users=5, sites_per_user=50, incidents_per_site=4,
+         batch_size=20_000, seed=1, stdout=None):
+    """
+    Bulk-seed a realistic dataset owned by throwaway `__bench_*` users:
+    websites with per-site latency profiles, evenly spread MonitorLogs,
+    incidents with matching failure logs, snapshots for each incident, and
+    the error signatures and hourly error counts failures produce.
+    """
+    rng = np.random.default_rng(seed)
+    pyrng = random.Random(seed)
+    User = get_user_model()
+    now = timezone.now()
+    start = now - timedelta(days=days)
+
+    def say(msg):
+        if stdout:
+            stdout.write(msg)
+
+    clear()
+    master = User.objects.create_user(username=MASTER_USERNAME, password='bench', is_master=True)
+    members = [User.objects.create_user(username=f"{USER_PREFIX}{i}__", password='bench') for i in range(users)]
+
+    sites = Website.objects.bulk_create([
+        Website(
+            owner=master,
+            name=f"Bench Site {i}",
+            url=f"https://bench-{i}.example.com/health",
+            check_interval=int(rng.choice([1, 5, 10])),
+            current_status='up',
+            last_check_time=now,
+        )
+        for i in range(websites)
+    ], batch_size=batch_size)
+    site_ids = [s.id for s in sites]
+    say(f"Seeded {len(sites)} websites")
+
+    Through = Website.authorized_users.through
+    Through.objects.bulk_create([
+        Through(website_id=site_id, user_id=member.id)
+        for member in members
+        for site_id in pyrng.sample(site_ids, min(sites_per_user, len(site_ids)))
+    ], batch_size=batch_size)
+    # Give every member a few sites of their own as well
+    own = Website.objects.filter(id__in=site_ids[:users * 2]).order_by('id')
+    for idx, site in enumerate(own):
+        site.owner = members[idx % users] if members else master
+    Website.objects.bulk_update(own, ['owner'], batch_size=batch_size)
+
+    signatures = [intern_error(message, 'https://example.com/') for message in ERRORS]
+
+    # Incidents first so failure logs can line up with them
+    incidents = []
+    span = (now - start).total_seconds()
+    for site_id in site_ids:
+        for _ in range(incidents_per_site):
+            begin = start + timedelta(seconds=float(rng.uniform(0, span)))
+            duration = float(rng.lognormal(np.log(600), 1.0))
+            end = begin + timedelta(seconds=duration)
+            resolved = end < now
+            signature = pyrng.choice(signatures)
+            incidents.append(Incident(
+                website_id=site_id,
+                start_time=begin,
+                end_time=end if resolved else None,
+                reason=signature.error_class,
+                error=signature,
+                is_resolved=resolved,
+                mttr_seconds=int(duration) if resolved else None,
+            ))
+    incidents = Incident.objects.bulk_create(incidents, batch_size=batch_size)
+    say(f"Seeded {len(incidents)} incidents")
+
+    snapshots = [
+        SystemSnapshot(
+            title=f"Service Failure: Bench Site {inc.website_id}",
+            reason=f"Service dropped offline. Error: {inc.error.template}",
+            timestamp=inc.start_time,
+            cpu=float(rng.uniform(5, 95)),
+            memory=float(rng.uniform(20, 90)),
+            disk=float(rng.uniform(30, 80)),
+            load_1=float(rng.uniform(0, 4)),
+            load_5=float(rng.uniform(0, 4)),
+            load_15=float(rng.uniform(0, 4)),
+            net_sent=int(rng.integers(1e6, 1e10)),
+            net_recv=int(rng.integers(1e6, 1e10)),
+            website_id=inc.website_id,
+            incident_id=inc.id,
+        )
+        for inc in incidents
+    ]
+    with explicit_timestamps(SystemSnapshot._meta.get_field('timestamp')):
+        SystemSnapshot.objects.bulk_create(snapshots, batch_size=batch_size)
+    say(f"Seeded {len(snapshots)} snapshots")
+
+    outages = {}
+    for inc in incidents:
+        outages.setdefault(inc.website_id, []).append(
+            (inc.start_time.timestamp(), (inc.end_time or now).timestamp())
+        )
+
+    per_site = max(1, logs // max(1, len(site_ids)))
+    medians = rng.lognormal(np.log(0.25), 0.8, size=len(site_ids))
+    created = 0
+    buffer = []
+    counts = {}
+    for site_id, median in zip(site_ids, medians):
+        times = np.sort(rng.uniform(start.timestamp(), now.timestamp(), size=per_site))
+        latencies = rng.lognormal(np.log(median), 0.35, size=per_site)
+        failed = rng.random(per_site) < 0.002
+        for begin, end in outages.get(site_id, []):
+            failed |= (times >= begin) & (times <= end)
+        for ts, latency, is_failed in zip(times.tolist(), latencies.tolist(), failed.tolist()):
+            timestamp = datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+            signature = pyrng.choice(signatures) if is_failed else None
+            if signature:
+                key = (site_id, signature.id, window_start(timestamp))
+                count, last_seen = counts.get(key, (0, timestamp))
+                counts[key] = (count + 1, max(last_seen, timestamp))
+            buffer.append(MonitorLog(
+                website_id=site_id,
+                timestamp=timestamp,
+                status_code=None if is_failed and latency > 1 else (503 if is_failed else 200),
+                response_time=latency,
+                ttfb=latency * 0.6,
+                payload_size=0 if is_failed else 18_432,
+                is_success=not is_failed,
+                error=signature,
+            ))
+        if len(buffer) >= batch_size:
+            with transaction.atomic():
+                MonitorLog.objects.bulk_create(buffer, batch_size=batch_size)
+            created += len(buffer)
+            buffer = []
+            say(f"  {created} logs")
+    if buffer:
+        MonitorLog.objects.bulk_create(buffer, batch_size=batch_size)
+        created += len(buffer)
+    say(f"Seeded {created} logs")
+
+    ErrorCount.objects.bulk_create([
+        ErrorCount(website_id=site_id, signature_id=signature_id, window_start=window, count=count, last_seen=last_seen)
+        for (site_id, signature_id, window), (count, last_seen) in counts.items()
+    ], batch_size=batch_size)
+    say(f"Seeded {len(counts)} error counts")
+
+    return master, members
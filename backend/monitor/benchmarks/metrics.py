@@ -0,0 +1,125 @@
+import json
+import os
+import platform
+import threading
+import time
+
+import numpy as np
+import psutil
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+WRITE_VERBS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def percentiles(values, points=(50, 95, 99)):
+    if not len(values):
+        return {f"p{p}": None for p in points}
+    arr = np.asarray(values, dtype=float)
+    return {f"p{p}": round(float(np.percentile(arr, p)), 6) for p in points}
+
+
+class WriteCounter:
+    """
+    Counts INSERT/UPDATE/DELETE statements on every database connection,
+    including ones opened later by worker threads.
+    """
+
+    def __init__(self):
+        self.writes = 0
+        self.queries = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        verb = sql.lstrip()[:6].upper()
+        with self._lock:
+            self.queries += 1
+            if verb in WRITE_VERBS:
+                self.writes += len(params) if many and params else 1
+        return execute(sql, params, many, context)
+
+    def _install(self, sender=None, connection=connection, **kwargs):
+        # The same wrapper object is reused when a thread reconnects
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        self._install()
+        connection_created.connect(self._install)
+        return self
+
+    def __exit__(self, *exc):
+        connection_created.disconnect(self._install)
+        if self in connection.execute_wrappers:
+            connection.execute_wrappers.remove(self)
+
+
+class RSSSampler:
+    """Samples this process' resident set size in a background thread."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._process = psutil.Process(os.getpid())
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append(self._process.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self):
+        if not self.samples:
+            return {"start": None, "peak": None, "end": None}
+        return {"start": self.samples[0], "peak": max(self.samples), "end": self.samples[-1]}
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "db_vendor": connection.vendor,
+        "timestamp": time.time(),
+    }
+
+
+def write_report(report, output=None, stdout=None):
+    text = json.dumps(report, indent=2, default=str)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text)
+    elif stdout is not None:
+        stdout.write(text)
+    return text
+
+
+def compare_to_baseline(current, baseline, checks, tolerance):
+    """
+    Compare selected metrics against a previous report. `checks` maps a dotted
+    metric path to 'higher' or 'lower' (the better direction). Returns a list
+    of human readable regressions beyond `tolerance` (a fraction).
+    """
+    def lookup(report, path):
+        for part in path.split('.'):
+            report = report.get(part) if isinstance(report, dict) else None
+        return report
+
+    regressions = []
+    for path, better in checks.items():
+        new, old = lookup(current, path), lookup(baseline, path)
+        if new is None or not old:
+            continue
+        change = (new - old) / old
+        if (better == 'higher' and change < -tolerance) or (better == 'lower' and change > tolerance):
+            regressions.append(f"{path}: {old} -> {new} ({change * 100:+.1f}%)")
+    return regressions
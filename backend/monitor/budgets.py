@@ -0,0 +1,172 @@
+"""
+Probe budgets shared by all Celery workers and the run_prober daemon.
+
+With PROBE_BUDGETS on, at most PROBE_MAX_IN_FLIGHT probes run at once,
+PROBE_HOST_MAX_IN_FLIGHT per host, and each host gets PROBE_HOST_RATE
+probes a second in bursts of PROBE_HOST_BURST. A probe over budget raises
+ProbeDeferred and is retried, or skipped after PROBE_MAX_DEFERRALS retries;
+every deferral is recorded for /api/health/probe-budgets/. Without Redis
+the limits are not applied.
+"""
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from .utils import get_redis
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = 'probe_budget:in_flight'
+HOST_KEY = 'probe_budget:host:{}'
+BUCKET_KEY = 'probe_budget:rate:{}'
+DEFERRALS_KEY = 'probe_deferrals'
+DEFERRAL_COUNTS_KEY = 'probe_deferrals:counts'
+DEFERRALS_KEPT = 500
+
+# In-flight probes are sorted sets of lease tokens scored by expiry, so a
+# worker that dies mid-probe frees its slot after PROBE_LEASE_SECONDS. The
+# per-host rate is a token bucket refilled at PROBE_HOST_RATE per second.
+# Everything is checked and taken in one script, so workers never race.
+ACQUIRE = """
+local now = tonumber(ARGV[1])
+local lease = tonumber(ARGV[3])
+local global_max = tonumber(ARGV[4])
+local host_max = tonumber(ARGV[5])
+local rate = tonumber(ARGV[6])
+local burst = tonumber(ARGV[7])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if global_max > 0 and redis.call('ZCARD', KEYS[1]) >= global_max then
+    return {'global_concurrency', '0'}
+end
+if host_max > 0 and redis.call('ZCARD', KEYS[2]) >= host_max then
+    return {'host_concurrency', '0'}
+end
+if rate > 0 then
+    local bucket = redis.call('HMGET', KEYS[3], 'tokens', 'at')
+    local tokens = tonumber(bucket[1]) or burst
+    local at = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - at) * rate)
+    if tokens < 1 then
+        return {'host_rate', tostring((1 - tokens) / rate)}
+    end
+    redis.call('HSET', KEYS[3], 'tokens', tostring(tokens - 1), 'at', tostring(now))
+    redis.call('EXPIRE', KEYS[3], math.ceil(burst / rate) + 1)
+end
+redis.call('ZADD', KEYS[1], now + lease, ARGV[2])
+redis.call('ZADD', KEYS[2], now + lease, ARGV[2])
+redis.call('EXPIRE', KEYS[1], lease * 2)
+redis.call('EXPIRE', KEYS[2], lease * 2)
+return {'ok', '0'}
+"""
+
+
+class ProbeDeferred(Exception):
+    """A probe was not started because a budget is exhausted; retry after `retry_after` seconds."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"{reason}, retry in {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def probe_host(website):
+    return (urlsplit(website.url).hostname or '').lower()
+
+
+@contextmanager
+def probe_budget(website):
+    """
+    Hold a global and a per-host probe slot (and a per-host rate token)
+    while the block runs, or raise ProbeDeferred. Budgets are skipped if
+    PROBE_BUDGETS is off or Redis is unavailable.
+    """
+    if not settings.PROBE_BUDGETS:
+        yield
+        return
+
+    host = probe_host(website)
+    keys = [GLOBAL_KEY, HOST_KEY.format(host), BUCKET_KEY.format(host)]
+    token = uuid.uuid4().hex
+    try:
+        r = get_redis()
+        reason, retry = r.register_script(ACQUIRE)(keys=keys, args=[
+            time.time(), token, settings.PROBE_LEASE_SECONDS, settings.PROBE_MAX_IN_FLIGHT,
+            settings.PROBE_HOST_MAX_IN_FLIGHT, settings.PROBE_HOST_RATE, settings.PROBE_HOST_BURST,
+        ])
+    except Exception as e:
+        logger.debug(f"Probe budgets unavailable: {e}")
+        r = None
+    else:
+        if reason != b'ok':
+            raise ProbeDeferred(reason.decode(), max(float(retry), settings.PROBE_DEFER_SECONDS))
+
+    try:
+        yield
+    finally:
+        if r is not None:
+            try:
+                r.pipeline().zrem(keys[0], token).zrem(keys[1], token).execute()
+            except Exception as e:
+                logger.debug(f"Failed to release probe slot: {e}")
+
+
+def record_deferral(websites, deferred, action):
+    """
+    Note that a probe of `websites` was `delayed` (retried later) or
+    `skipped` (left to the next dispatch) because of `deferred`: a log line,
+    a per-reason counter and an entry in a capped Redis list.
+    """
+    ids = [website.id for website in websites]
+    host = probe_host(websites[0])
+    logger.info(f"Probe of {host} {action} ({deferred.reason}) for websites {ids}")
+    entry = {
+        "time": time.time(),
+        "website_ids": ids,
+        "host": host,
+        "reason": deferred.reason,
+        "action": action,
+        "retry_after": round(deferred.retry_after, 2),
+    }
+    try:
+        pipe = get_redis().pipeline()
+        pipe.lpush(DEFERRALS_KEY, json.dumps(entry))
+        pipe.ltrim(DEFERRALS_KEY, 0, DEFERRALS_KEPT - 1)
+        pipe.hincrby(DEFERRAL_COUNTS_KEY, f"{action}:{deferred.reason}", len(ids))
+        pipe.execute()
+    except Exception as e:
+        logger.debug(f"Failed to record probe deferral: {e}")
+
+
+def budget_status(r, hosts=20):
+    """Limits, current usage, the busiest hosts, deferral counters and recent deferrals."""
+    now = time.time()
+    pipe = r.pipeline()
+    pipe.zcount(GLOBAL_KEY, now, '+inf')
+    pipe.hgetall(DEFERRAL_COUNTS_KEY)
+    pipe.lrange(DEFERRALS_KEY, 0, 49)
+    in_flight, counts, recent = pipe.execute()
+
+    busiest = []
+    for key in r.scan_iter(match=HOST_KEY.format('*'), count=500):
+        busiest.append((r.zcount(key, now, '+inf'), key.decode()[len(HOST_KEY.format('')):]))
+    busiest.sort(reverse=True)
+    return {
+        "enabled": settings.PROBE_BUDGETS,
+        "limits": {
+            "max_in_flight": settings.PROBE_MAX_IN_FLIGHT,
+            "host_max_in_flight": settings.PROBE_HOST_MAX_IN_FLIGHT,
+            "host_rate": settings.PROBE_HOST_RATE,
+            "host_burst": settings.PROBE_HOST_BURST,
+        },
+        "in_flight": in_flight,
+        "hosts": [{"host": host, "in_flight": count} for count, host in busiest[:hosts] if count],
+        "deferrals": {k.decode(): int(v) for k, v in counts.items()},
+        "recent": [json.loads(x) for x in recent],
+    }
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .access import invalidate_access
+from .models import Website
+from .serializers import WebsiteSerializer
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def import_websites(rows, user, queryset):
+    """
+    Validate every row up front, then create/update them in one transaction.
+    Rows carrying an `id` update that website (it must be in `queryset`),
+    others create a website owned by `user`. New websites get first checks
+    staggered across their check interval instead of all firing at once.
+
+    Returns (ok, results) where results has one entry per input row.
+    """
+    results = []
+    creates, updates = [], []
+    requested_ids = [_as_int(row.get('id')) for row in rows if isinstance(row, dict) and row.get('id')]
+    existing = queryset.in_bulk([pk for pk in requested_ids if pk is not None])
+
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            results.append({"row": index, "status": "error", "errors": {"non_field_errors": ["Expected an object"]}})
+            continue
+        website_id = row.get('id')
+        if website_id:
+            instance = existing.get(_as_int(website_id))
+            if instance is None:
+                results.append({"row": index, "status": "error", "errors": {"id": ["Website not found"]}})
+                continue
+            serializer = WebsiteSerializer(instance, data=row, partial=True)
+        else:
+            serializer = WebsiteSerializer(data=row)
+
+        if serializer.is_valid():
+            results.append({"row": index, "status": "valid"})
+            (updates if website_id else creates).append((index, serializer))
+        else:
+            results.append({"row": index, "status": "error", "errors": serializer.errors})
+
+    if any(r['status'] == 'error' for r in results):
+        for r in results:
+            if r['status'] == 'valid':
+                r['status'] = 'skipped'
+        return False, results
+
+    now = timezone.now()
+    new_websites = []
+    for position, (index, serializer) in enumerate(creates):
+        website = Website(owner=user, **serializer.validated_data)
+        spread = website.effective_interval()
+        website.next_check_at = now + timedelta(seconds=spread * position / max(len(creates), 1))
+        new_websites.append((index, website))
+
+    changed_fields = set()
+    updated_websites = []
+    for index, serializer in updates:
+        website = serializer.instance
+        website.updated_at = now
+        for attr, value in serializer.validated_data.items():
+            setattr(website, attr, value)
+            changed_fields.add(attr)
+        updated_websites.append((index, website))
+
+    with transaction.atomic():
+        if new_websites:
+            Website.objects.bulk_create([w for _, w in new_websites], batch_size=500)
+        if updated_websites and changed_fields:
+            Website.objects.bulk_update([w for _, w in updated_websites], sorted(changed_fields | {'updated_at'}), batch_size=500)
+
+    # bulk_create skips post_save, so refresh the owner's access set here
+    if new_websites:
+        invalidate_access([user.pk])
+
+    for index, website in new_websites:
+        results[index] = {"row": index, "status": "created", "id": website.id, "next_check_at": website.next_check_at}
+    for index, website in updated_websites:
+        results[index] = {"row": index, "status": "updated", "id": website.id}
+    return True, results
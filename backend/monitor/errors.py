@@ -0,0 +1,134 @@
+"""
+Error catalog.
+
+Probe failures are interned as ErrorSignatures: a coarse class plus a
+message template with hosts, IPs, object addresses and long numbers
+stripped, so every site and poll hitting the same failure shares one row.
+Logs reference the signature instead of repeating the text, and ErrorCount
+keeps hourly occurrences per website for GET /api/errors/top/.
+`manage.py intern_errors` converts logs written before the catalog existed.
+"""
+import hashlib
+import re
+from datetime import timezone as dt_timezone
+from urllib.parse import urlsplit
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Sum, Value
+from django.db.models.functions import Greatest
+
+from .models import ErrorSignature, ErrorCount
+
+# digest -> ErrorSignature id; signatures are never deleted, so this only grows up to the cap
+_interned = {}
+INTERN_CACHE_SIZE = 10000
+
+_NORMALIZERS = [
+    (re.compile(r'0x[0-9a-fA-F]+'), '0x?'),
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}\b'), '<ip>'),
+    (re.compile(r'\[[0-9a-fA-F:]*:[0-9a-fA-F:]+\]'), '<ip>'),
+    (re.compile(r"host='[^']*'"), "host='<host>'"),
+    (re.compile(r'\b\d{4,}\b'), '<n>'),
+]
+
+
+def classify_error(message):
+    """Collapse a probe error message into a coarse class shared across sites."""
+    if not message:
+        return 'Unknown'
+    match = re.match(r'HTTP (\d)\d\d', message)
+    if match:
+        return f"HTTP {match.group(1)}xx"
+    lowered = message.lower()
+    if 'timed out' in lowered or 'timeout' in lowered:
+        return 'Timeout'
+    if 'name or service not known' in lowered or 'nodename nor servname' in lowered or 'getaddrinfo' in lowered or 'name resolution' in lowered:
+        return 'DNS Failure'
+    if 'ssl' in lowered or 'certificate' in lowered:
+        return 'TLS Error'
+    if 'connection refused' in lowered:
+        return 'Connection Refused'
+    if 'connection reset' in lowered or 'remotedisconnected' in lowered or 'connection aborted' in lowered:
+        return 'Connection Reset'
+    if 'connection' in lowered:
+        return 'Connection Error'
+    return 'Other'
+
+
+def normalize_error(message, url=None):
+    """
+    Message template shared by every site and poll hitting the same failure:
+    the site's host, IP addresses, object addresses and long numbers are
+    replaced with placeholders. Short numbers (status codes, errno, ports,
+    timeouts) are kept.
+    """
+    template = message.strip()
+    host = urlsplit(url).hostname if url else None
+    if host:
+        template = re.sub(re.escape(host), '<host>', template, flags=re.IGNORECASE)
+    for pattern, replacement in _NORMALIZERS:
+        template = pattern.sub(replacement, template)
+    return template
+
+
+def intern_error(message, url=None):
+    """The ErrorSignature for a raw probe error message, created on first sight."""
+    template = normalize_error(message, url)
+    error_class = classify_error(message)
+    digest = hashlib.sha256(f"{error_class}\0{template}".encode()).hexdigest()
+    signature_id = _interned.get(digest)
+    if signature_id is not None:
+        return ErrorSignature(id=signature_id, error_class=error_class, template=template, digest=digest)
+
+    signature, _ = ErrorSignature.objects.get_or_create(
+        digest=digest, defaults={"error_class": error_class, "template": template})
+    if len(_interned) >= INTERN_CACHE_SIZE:
+        _interned.clear()
+    # Only remember ids that committed; a rolled back signature must be created again
+    transaction.on_commit(lambda: _interned.__setitem__(digest, signature.id))
+    return signature
+
+
+def window_start(timestamp):
+    return timestamp.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def count_error(website_id, signature_id, timestamp, occurrences=1):
+    """Add occurrences of a signature on a website to the hourly window containing `timestamp`."""
+    start = window_start(timestamp)
+    counts = ErrorCount.objects.filter(website_id=website_id, signature_id=signature_id, window_start=start)
+    changes = {"count": F('count') + occurrences, "last_seen": Greatest(F('last_seen'), Value(timestamp))}
+    if counts.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            ErrorCount.objects.create(website_id=website_id, signature_id=signature_id, window_start=start,
+                                      count=occurrences, last_seen=timestamp)
+    except IntegrityError:
+        # Another worker created the window first
+        counts.update(**changes)
+
+
+def top_errors(counts, since, until, limit=20):
+    """
+    Most frequent signatures in [since, until) from an (access-scoped)
+    ErrorCount queryset: occurrences, affected websites and last sighting.
+    """
+    rows = list(
+        counts.filter(window_start__gte=window_start(since), window_start__lt=until)
+        .values('signature')
+        .annotate(occurrences=Sum('count'), websites=Count('website', distinct=True), last_seen=Max('last_seen'))
+        .order_by('-occurrences')[:limit]
+    )
+    signatures = ErrorSignature.objects.in_bulk([row['signature'] for row in rows])
+    return [
+        {
+            "id": row['signature'],
+            "error_class": signatures[row['signature']].error_class,
+            "template": signatures[row['signature']].template,
+            "occurrences": row['occurrences'],
+            "websites": row['websites'],
+            "last_seen": row['last_seen'],
+        }
+        for row in rows
+    ]
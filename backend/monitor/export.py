@@ -0,0 +1,166 @@
+"""
+Streaming exports of monitor logs and incidents as NDJSON or CSV.
+
+Rows come straight from the database as values_list tuples through a
+server-side cursor, one website at a time in time order (which the
+(website, timestamp) indexes serve without sorting), and are written out
+in ~64KB pieces, optionally gzipped. Memory use does not depend on the
+number of rows and the first rows go out as soon as the first chunk is read.
+"""
+import csv
+import io
+import json
+import zlib
+
+from django.conf import settings
+from django.db import router
+from django.http import StreamingHttpResponse
+from rest_framework.response import Response
+
+from . import analytics
+from .access import visible_websites
+from .models import ErrorSignature, Incident, MonitorLog
+
+FLUSH_BYTES = 64 * 1024
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+class ErrorTemplates(dict):
+    """ErrorSignature id -> (class, template), loaded on first sight; the catalog is small."""
+
+    def __init__(self, using):
+        super().__init__()
+        self.using = using
+
+    def __missing__(self, signature_id):
+        signature = ErrorSignature.objects.using(self.using).filter(id=signature_id).values_list('error_class', 'template').first()
+        self[signature_id] = signature or (None, None)
+        return self[signature_id]
+
+
+def _iso(value):
+    return value.isoformat().replace('+00:00', 'Z') if value else None
+
+
+def log_rows(websites, since, until, using='default'):
+    columns = ['timestamp', 'website_id', 'website_name', 'status_code', 'response_time', 'ttfb',
+               'payload_size', 'is_success', 'error_class', 'error']
+    errors = ErrorTemplates(using)
+
+    def rows():
+        for website_id, name in websites:
+            logs = (
+                MonitorLog.objects.using(using).filter(website_id=website_id, timestamp__gte=since, timestamp__lt=until)
+                .order_by('timestamp')
+                .values_list('timestamp', 'status_code', 'response_time', 'ttfb', 'payload_size', 'is_success',
+                             'error_id', 'error_message')
+            )
+            for timestamp, status_code, response_time, ttfb, payload_size, is_success, error_id, message in \
+                    logs.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+                error_class, template = errors[error_id] if error_id else (None, message or None)
+                yield (_iso(timestamp), website_id, name, status_code, response_time, ttfb, payload_size,
+                       is_success, error_class, template)
+
+    return columns, rows()
+
+
+def incident_rows(websites, since, until, using='default'):
+    columns = ['id', 'website_id', 'website_name', 'start_time', 'end_time', 'is_resolved', 'mttr_seconds',
+               'reason', 'error_class', 'error']
+    errors = ErrorTemplates(using)
+
+    def rows():
+        for website_id, name in websites:
+            incidents = (
+                Incident.objects.using(using).filter(website_id=website_id, start_time__gte=since, start_time__lt=until)
+                .order_by('start_time')
+                .values_list('id', 'start_time', 'end_time', 'is_resolved', 'mttr_seconds', 'reason', 'error_id')
+            )
+            for pk, start_time, end_time, is_resolved, mttr, reason, error_id in \
+                    incidents.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+                error_class, template = errors[error_id] if error_id else (None, None)
+                yield (pk, website_id, name, _iso(start_time), _iso(end_time), is_resolved, mttr, reason,
+                       error_class, template)
+
+    return columns, rows()
+
+
+def _ndjson(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), separators=(',', ':')) + '\n'
+
+
+def _csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def stream(columns, rows, output, compress=False):
+    """
+    Encode rows as `output` ('ndjson' or 'csv') and yield bytes in pieces of
+    about FLUSH_BYTES. The first piece is sent as soon as there is one row,
+    so clients see a response before the export is done.
+    """
+    encode = _ndjson if output == 'ndjson' else _csv
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    pending, size, first = [], 0, True
+    for text in encode(columns, rows):
+        pending.append(text)
+        size += len(text)
+        if first or size >= FLUSH_BYTES:
+            data = ''.join(pending).encode()
+            pending, size, first = [], 0, False
+            # Sync-flush so each piece can be decompressed as it arrives
+            yield gzip.compress(data) + gzip.flush(zlib.Z_SYNC_FLUSH) if gzip else data
+    data = ''.join(pending).encode()
+    yield gzip.compress(data) + gzip.flush() if gzip else data
+
+
+def filename(kind, since, until, output, compress=False):
+    span = f"{since:%Y%m%dT%H%M%S}-{until:%Y%m%dT%H%M%S}"
+    return f"{kind}-{span}.{output}" + ('.gz' if compress else '')
+
+
+def content_type(output, compress=False):
+    return 'application/gzip' if compress else CONTENT_TYPES[output]
+
+
+def export_response(request, kind, rows):
+    """
+    Stream `rows(websites, since, until, using)` for the caller's websites as NDJSON
+    or CSV (`output`), gzipped if `gzip=true`. Filters: website_id (comma
+    separated), since/until (ISO 8601) or days.
+    """
+    params = request.query_params
+    output = params.get('output', 'ndjson')
+    if output not in CONTENT_TYPES:
+        return Response({"error": f"output must be one of {', '.join(CONTENT_TYPES)}"}, status=400)
+    compress = params.get('gzip') == 'true'
+    try:
+        since, until = analytics.parse_window(params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    try:
+        website_ids = [int(pk) for pk in params['website_id'].split(',')] if params.get('website_id') else None
+    except ValueError:
+        return Response({"error": "website_id must be a comma-separated list of ids"}, status=400)
+
+    websites = visible_websites(request.user).order_by('id')
+    if website_ids is not None:
+        websites = websites.filter(id__in=website_ids)
+    # Rows are read after the view returns, when ReplicaMiddleware no longer
+    # routes reads, so pick the database now
+    using = router.db_for_read(MonitorLog)
+    columns, data = rows(list(websites.values_list('id', 'name')), since, until, using)
+    response = StreamingHttpResponse(stream(columns, data, output, compress),
+                                     content_type=content_type(output, compress))
+    response['Content-Disposition'] = f'attachment; filename="{filename(kind, since, until, output, compress)}"'
+    # Keep proxies from buffering the whole export before passing it on
+    response['X-Accel-Buffering'] = 'no'
+    return response
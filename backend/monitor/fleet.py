@@ -0,0 +1,109 @@
+from datetime import timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Avg, Case, Count, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import ExtractMinute, TruncHour
+from django.utils import timezone
+
+from . import tsdb
+from .models import MonitorLog
+
+BUCKET_SECONDS = 1800
+BUCKETS = 48
+
+
+def window_start(now):
+    """Start of the oldest bucket; the newest bucket is the current half hour."""
+    now = now.astimezone(dt_timezone.utc)
+    current = now.replace(minute=30 if now.minute >= 30 else 0, second=0, microsecond=0)
+    return current - timedelta(seconds=BUCKET_SECONDS * (BUCKETS - 1))
+
+
+def fleet_summary(websites, now=None):
+    """
+    Status, last latency, 24h uptime and a 48-point half-hourly latency
+    sparkline for every website in `websites`, in two queries: the websites
+    with their latest response time as a correlated subquery, and one
+    GROUP BY (website, hour, half hour) over the last 24 hours of logs, or
+    with TSDB_ENABLED a rollup of each website's stored samples instead.
+    """
+    now = now or timezone.now()
+    start = window_start(now)
+
+    latest = MonitorLog.objects.filter(website=OuterRef('pk')).order_by('-timestamp').values('response_time')[:1]
+    rows = list(
+        websites.order_by('name', 'id')
+        .annotate(last_latency=Subquery(latest))
+        .values('id', 'name', 'url', 'tags', 'is_active', 'current_status', 'last_check_time', 'last_latency')
+    )
+
+    if settings.TSDB_ENABLED:
+        series = _stored_series([row['id'] for row in rows], start, now)
+    else:
+        series = _log_series(websites, start)
+
+    results = []
+    for row in rows:
+        entry = series.get(row['id'])
+        results.append({
+            **{k: row[k] for k in ('id', 'name', 'url', 'tags', 'is_active', 'current_status', 'last_check_time')},
+            "last_latency_ms": round(row['last_latency'] * 1000) if row['last_latency'] is not None else None,
+            "uptime_24h": round(entry['ok'] / entry['checks'] * 100, 2) if entry else None,
+            "checks_24h": entry['checks'] if entry else 0,
+            "sparkline": entry['points'] if entry else [None] * BUCKETS,
+        })
+    return {
+        "generated_at": now,
+        "window_start": start,
+        "bucket_seconds": BUCKET_SECONDS,
+        "results": results,
+    }
+
+
+def _log_series(websites, start):
+    """website id -> checks, successes and latency points from one GROUP BY over MonitorLog."""
+    buckets = (
+        MonitorLog.objects.filter(website__in=websites, timestamp__gte=start)
+        .order_by()
+        .annotate(minute=ExtractMinute('timestamp', tzinfo=dt_timezone.utc))
+        .annotate(
+            hour=TruncHour('timestamp', tzinfo=dt_timezone.utc),
+            half=Case(When(minute__gte=30, then=Value(1)), default=Value(0), output_field=IntegerField()),
+        )
+        .values('website_id', 'hour', 'half')
+        .annotate(
+            checks=Count('id'),
+            ok=Count('id', filter=Q(is_success=True)),
+            latency=Avg('response_time', filter=Q(is_success=True)),
+        )
+    )
+
+    series = {}
+    for bucket in buckets:
+        hour = bucket['hour'] if timezone.is_aware(bucket['hour']) else bucket['hour'].replace(tzinfo=dt_timezone.utc)
+        index = int((hour - start).total_seconds()) // BUCKET_SECONDS + bucket['half']
+        if not 0 <= index < BUCKETS:
+            continue
+        entry = series.setdefault(bucket['website_id'], {"checks": 0, "ok": 0, "points": [None] * BUCKETS})
+        entry['checks'] += bucket['checks']
+        entry['ok'] += bucket['ok']
+        if bucket['latency'] is not None:
+            entry['points'][index] = round(bucket['latency'] * 1000)
+    return series
+
+
+def _stored_series(website_ids, start, now):
+    """The same series from the sample store: one vectorized tsdb.rollup per website."""
+    series = {}
+    for website_id in website_ids:
+        records = tsdb.scan(website_id, start, now)
+        if not len(records):
+            continue
+        totals = tsdb.rollup(records, start, BUCKET_SECONDS, BUCKETS)
+        series[website_id] = {
+            "checks": int(totals['checks'].sum()),
+            "ok": int(totals['ok'].sum()),
+            "points": [None if np.isnan(value) else round(value * 1000) for value in totals['latency'].tolist()],
+        }
+    return series
@@ -0,0 +1,100 @@
+import json
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+
+from .models import MonitorLog, Website
+from .utils import get_redis
+
+logger = logging.getLogger(__name__)
+
+RESULTS_KEY = 'probe_results'
+# The batch being written; left behind by a writer that died mid-batch
+PROCESSING_KEY = 'probe_results:processing'
+
+
+def submit_result(website_id, result):
+    """Queue a probe result for the single writer (RESULT_FUNNEL). Returns False if Redis is unavailable."""
+    try:
+        item = {"website_id": website_id, "checked_at": time.time(), "result": result}
+        get_redis().rpush(RESULTS_KEY, json.dumps(item))
+    except Exception as e:
+        logger.warning(f"Result funnel unavailable, writing directly: {e}")
+        return False
+    return True
+
+
+def _checked_at(item):
+    checked_at = item.get('checked_at')
+    return datetime.fromtimestamp(checked_at, tz=dt_timezone.utc) if checked_at is not None else None
+
+
+def _already_recorded(items):
+    """Items of a replayed batch whose log was committed before the writer died."""
+    stamped = [item for item in items if item.get('checked_at') is not None]
+    if not stamped:
+        return set()
+    logged = set(
+        MonitorLog.objects.filter(website_id__in={item['website_id'] for item in stamped},
+                                  timestamp__in={_checked_at(item) for item in stamped})
+        .values_list('website_id', 'timestamp')
+    )
+    return {id(item) for item in stamped if (item['website_id'], _checked_at(item)) in logged}
+
+
+def write_batch(items, replay=False):
+    """
+    Record a batch of queued results in one transaction so SQLite takes the
+    write lock once per batch instead of once per statement. Each result
+    gets its own savepoint so a bad row does not sink the batch; alerts and
+    snapshots go out on commit, and failure polls are scheduled after it
+    from the updated state. Results keep the time they were probed, however
+    long they waited in the queue. With `replay`, results already logged
+    at their probe time are skipped.
+    """
+    from .tasks import record_result, schedule_failure_poll
+
+    websites = Website.objects.in_bulk({item['website_id'] for item in items})
+    skip = _already_recorded(items) if replay else set()
+    recorded = []
+    with transaction.atomic():
+        for item in items:
+            website = websites.get(item['website_id'])
+            if website is None or id(item) in skip:
+                continue
+            try:
+                checked_at = _checked_at(item)
+                with transaction.atomic():
+                    record_result(website, item['result'], checked_at)
+            except Exception as e:
+                logger.exception(f"Failed to record queued result for website {website.id}: {e}")
+                continue
+            recorded.append((website, item['result']))
+
+    for website, result in recorded:
+        schedule_failure_poll(website, result)
+    return len(recorded)
+
+
+def drain(r, batch_size):
+    """
+    Write up to `batch_size` queued results and return how many were taken
+    off the queue. The batch is moved atomically (LMOVE in MULTI/EXEC) to a
+    processing list and only deleted once it committed; a batch left there
+    by a crashed writer is replayed first, skipping results it already
+    recorded, so nothing is dropped or logged twice.
+    """
+    raw = r.lrange(PROCESSING_KEY, 0, -1)
+    replay = bool(raw)
+    if not replay:
+        with r.pipeline() as pipe:
+            for _ in range(batch_size):
+                pipe.lmove(RESULTS_KEY, PROCESSING_KEY, 'LEFT', 'RIGHT')
+            raw = [item for item in pipe.execute() if item is not None]
+        if not raw:
+            return 0
+    write_batch([json.loads(item) for item in raw], replay=replay)
+    r.delete(PROCESSING_KEY)
+    return len(raw)
@@ -0,0 +1,109 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from monitor.benchmarks.fixtures import MASTER_USERNAME, USER_PREFIX
+from monitor.benchmarks.metrics import compare_to_baseline, environment, percentiles, write_report
+from monitor.models import Website, MonitorLog
+
+ENDPOINTS = {
+    'websites': '/api/websites/',
+    'history': '/api/websites/{website_id}/history/',
+    'logs': '/api/logs/',
+    'snapshots': '/api/snapshots/',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark dashboard API endpoints as a master user and as a regular user with "
+        "authorized_users access. Reports p50/p95 latency, SQL query count and response bytes as JSON. "
+        "Seed data first with `manage.py seed_fixtures`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument('--endpoint', action='append', choices=sorted(ENDPOINTS), help="Limit to these endpoints (repeatable)")
+        parser.add_argument('--output', help="Write the JSON report to this file")
+        parser.add_argument('--baseline', help="Previous JSON report to compare against")
+        parser.add_argument('--tolerance', type=float, default=0.10)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        master = User.objects.filter(username=MASTER_USERNAME).first()
+        member = User.objects.filter(username__startswith=USER_PREFIX).order_by('id').first()
+        if not master or not member:
+            raise CommandError("No benchmark users found. Run `manage.py seed_fixtures` first.")
+
+        endpoints = options['endpoint'] or sorted(ENDPOINTS)
+        results = {}
+        for label, user in (('master', master), ('user', member)):
+            client = Client()
+            client.force_login(user)
+            website = (
+                Website.objects.filter(owner=master).first() if label == 'master'
+                else Website.objects.filter(authorized_users=user).first()
+            )
+            results[label] = {}
+            for name in endpoints:
+                url = ENDPOINTS[name].format(website_id=website.id if website else 0)
+                result = self._measure(client, url, options['iterations'], options['warmup'])
+                results[label][name] = result
+                self.stderr.write(f"{label:<7} {name:<10} p50={result['latency_ms']['p50']}ms "
+                                  f"queries={result['queries']} bytes={result['bytes']}")
+
+        report = {
+            "benchmark": "api_latency",
+            "environment": environment(),
+            "config": {"iterations": options['iterations'], "warmup": options['warmup'], "endpoints": endpoints},
+            "dataset": {
+                "websites": Website.objects.count(),
+                "logs": MonitorLog.objects.count(),
+            },
+            "results": results,
+        }
+        write_report(report, options['output'], self.stdout)
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            checks = {}
+            for label in results:
+                for name in results[label]:
+                    checks[f"results.{label}.{name}.latency_ms.p95"] = 'lower'
+                    checks[f"results.{label}.{name}.queries"] = 'lower'
+            regressions = compare_to_baseline(report, baseline, checks, options['tolerance'])
+            if regressions:
+                raise CommandError("Regressions vs. baseline:\n" + "\n".join(regressions))
+
+    def _measure(self, client, url, iterations, warmup):
+        for _ in range(warmup):
+            client.get(url)
+
+        latencies = []
+        queries = []
+        size = status = None
+        for _ in range(iterations):
+            reset_queries()
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = client.get(url)
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(ctx.captured_queries))
+            size = len(content)
+            status = response.status_code
+
+        return {
+            "url": url,
+            "status": status,
+            "latency_ms": {k: round(v, 2) if v is not None else None for k, v in percentiles(latencies, (50, 95)).items()},
+            "queries": max(queries) if queries else None,
+            "bytes": size,
+        }
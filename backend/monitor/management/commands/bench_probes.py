@@ -0,0 +1,141 @@
+import asyncio
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from monitor.benchmarks.farm import FarmProfile, TargetFarm
+from monitor.benchmarks.metrics import (
+    RSSSampler, WriteCounter, compare_to_baseline, environment, percentiles, write_report,
+)
+from monitor.models import Website
+from monitor.prober import Prober
+
+BENCH_USERNAME = '__probe_bench__'
+
+REGRESSION_CHECKS = {
+    'results.checks_per_sec': 'higher',
+    'results.lag_seconds.p95': 'lower',
+    'results.rss_bytes.peak': 'lower',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure probe throughput against a local fake-target farm. Seeds websites owned by a "
+        "throwaway user, runs the run_prober pipeline (Prober probing and recording results) for "
+        "--duration seconds and prints a JSON report. Celery dispatch (dispatch_all_checks, broker, "
+        "workers) is not part of the measurement. Run it against a scratch DATABASE_URL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--websites', type=int, default=500)
+        parser.add_argument('--duration', type=float, default=60.0, help="Seconds to run the probe loop")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between checks of each website")
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--db-workers', type=int, default=4)
+        parser.add_argument('--latency', default='lognormal:0.05:0.5', help="const:S | uniform:A:B | lognormal:MEDIAN:SIGMA")
+        parser.add_argument('--error-rate', type=float, default=0.01)
+        parser.add_argument('--slow-rate', type=float, default=0.01, help="Fraction of responses with a slowly dripped body")
+        parser.add_argument('--hang-rate', type=float, default=0.0, help="Fraction of requests that never answer")
+        parser.add_argument('--body-size', type=int, default=2048)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help="Write the JSON report to this file")
+        parser.add_argument('--baseline', help="Previous JSON report to compare against")
+        parser.add_argument('--tolerance', type=float, default=0.10, help="Allowed regression vs. baseline (fraction)")
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded websites and logs")
+        parser.add_argument('--budgets', action='store_true',
+                            help="Apply the probe budgets (off by default: every farm site is on the same host)")
+
+    def handle(self, *args, **options):
+        with override_settings(PROBE_BUDGETS=options['budgets']):
+            self._run(options)
+
+    def _run(self, options):
+        profile = FarmProfile(
+            latency=options['latency'],
+            error_rate=options['error_rate'],
+            slow_rate=options['slow_rate'],
+            hang_rate=options['hang_rate'],
+            body_size=options['body_size'],
+            seed=options['seed'],
+        )
+        farm = TargetFarm(profile).start()
+        owner = self._seed(farm, options['websites'])
+
+        lags, durations = [], []
+        outcomes = {'success': 0, 'failure': 0}
+
+        def on_check(website_id, due_at, started_at, finished_at, result):
+            lags.append(max(0.0, started_at - due_at))
+            durations.append(finished_at - started_at)
+            outcomes['success' if result['is_success'] else 'failure'] += 1
+
+        prober = Prober(
+            concurrency=options['concurrency'],
+            db_workers=options['db_workers'],
+            refresh_interval=max(options['duration'], 1),
+            on_check=on_check,
+            queryset=Website.objects.filter(owner=owner),
+            interval=options['interval'],
+        )
+
+        try:
+            with WriteCounter() as writes, RSSSampler() as rss:
+                started = time.monotonic()
+                asyncio.run(prober.run(asyncio.Event(), duration=options['duration']))
+                elapsed = time.monotonic() - started
+        finally:
+            farm.stop()
+            if not options['keep']:
+                owner.delete()
+
+        checks = len(lags)
+        report = {
+            "benchmark": "probe_throughput",
+            "path": "run_prober",
+            "environment": environment(),
+            "config": {k: options[k] for k in (
+                'websites', 'duration', 'interval', 'concurrency', 'db_workers', 'latency',
+                'error_rate', 'slow_rate', 'hang_rate', 'body_size', 'seed',
+            )},
+            "results": {
+                "elapsed_seconds": round(elapsed, 3),
+                "checks": checks,
+                "checks_per_sec": round(checks / elapsed, 3) if elapsed else 0,
+                "demand_checks_per_sec": round(options['websites'] / options['interval'], 3),
+                "outcomes": outcomes,
+                "lag_seconds": percentiles(lags),
+                "check_seconds": percentiles(durations),
+                "db_writes": writes.writes,
+                "db_writes_per_sec": round(writes.writes / elapsed, 3) if elapsed else 0,
+                "db_queries": writes.queries,
+                "rss_bytes": rss.summary(),
+                "farm_responses": farm.counts,
+            },
+        }
+        write_report(report, options['output'], self.stdout)
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = compare_to_baseline(report, baseline, REGRESSION_CHECKS, options['tolerance'])
+            if regressions:
+                raise CommandError("Regressions vs. baseline:\n" + "\n".join(regressions))
+
+    def _seed(self, farm, count):
+        User = get_user_model()
+        User.objects.filter(username=BENCH_USERNAME).delete()
+        owner = User.objects.create_user(username=BENCH_USERNAME)
+        Website.objects.bulk_create([
+            Website(
+                owner=owner,
+                name=f"bench-{i}",
+                url=f"{farm.base_url}/site/{i}",
+                check_interval=1,
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        return owner
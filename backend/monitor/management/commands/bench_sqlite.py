@@ -0,0 +1,197 @@
+import multiprocessing
+import queue
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.backends.signals import connection_created
+
+from monitor.benchmarks.metrics import environment, percentiles, write_report
+from monitor.funnel import write_batch
+from monitor.models import Website, MonitorLog
+from monitor.sqlite import configure_connection
+
+BENCH_USERNAME = '__sqlite_bench__'
+
+RESULT = {
+    "status_code": 200,
+    "response_time": 0.1,
+    "ttfb": 0.05,
+    "payload_size": 2048,
+    "is_success": True,
+    "error_message": None,
+}
+
+
+def _record(website_id):
+    from monitor.tasks import record_result
+    record_result(Website.objects.get(id=website_id), RESULT)
+
+
+def _writer(website_ids, deadline, funnel, stats):
+    """One probe worker: writes results itself, or hands them to the funnel."""
+    connections.close_all()
+    if funnel is not None:
+        # Results still buffered when the funnel stops are dropped rather than blocking exit
+        funnel.cancel_join_thread()
+    rng = random.Random()
+    writes = locked = 0
+    while time.time() < deadline:
+        website_id = rng.choice(website_ids)
+        if funnel is not None:
+            try:
+                funnel.put({"website_id": website_id, "result": RESULT}, timeout=0.5)
+                writes += 1
+            except queue.Full:
+                pass
+            continue
+        try:
+            _record(website_id)
+            writes += 1
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+    stats.put({"role": "writer", "submitted": writes, "locked": locked})
+
+
+def _funnel(deadline, items, batch, stats):
+    """The single writer: drains submitted results in batched transactions."""
+    connections.close_all()
+    written = batches = locked = 0
+    while time.time() < deadline:
+        taken = []
+        try:
+            taken.append(items.get(timeout=0.2))
+            while len(taken) < batch:
+                taken.append(items.get_nowait())
+        except queue.Empty:
+            pass
+        if not taken:
+            continue
+        try:
+            written += write_batch(taken)
+            batches += 1
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+    stats.put({"role": "funnel", "written": written, "batches": batches, "locked": locked})
+
+
+def _reader(website_ids, deadline, stats):
+    """Dashboard-like reads: the website list plus one site's recent logs."""
+    connections.close_all()
+    rng = random.Random()
+    latencies = []
+    locked = 0
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            list(Website.objects.filter(id__in=website_ids[:50]).values('id', 'current_status', 'last_check_time'))
+            list(MonitorLog.objects.filter(website_id=rng.choice(website_ids)).order_by('-timestamp')[:20])
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    stats.put({"role": "reader", "latencies": latencies, "locked": locked})
+
+
+class Command(BaseCommand):
+    help = (
+        "SQLite concurrency benchmark: --writers processes record probe results while --readers "
+        "processes run dashboard queries. Compares direct writes with the single-writer funnel and "
+        "reports sustained writes/sec, 'database is locked' errors and read latency. "
+        "Run it against a scratch SQLite DATABASE_URL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--websites', type=int, default=200)
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds per mode")
+        parser.add_argument('--mode', choices=['direct', 'funnel', 'both'], default='both')
+        parser.add_argument('--batch', type=int, default=200, help="Funnel results per transaction")
+        parser.add_argument('--no-tuning', action='store_true', help="Run with the default rollback journal instead of the SQLite profile")
+        parser.add_argument('--output', help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("bench_sqlite needs a SQLite DATABASE_URL")
+
+        if options['no_tuning']:
+            connection_created.disconnect(configure_connection, dispatch_uid='monitor.sqlite_profile')
+            connections.close_all()
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA journal_mode={'DELETE' if options['no_tuning'] else 'WAL'}")
+            journal_mode = cursor.fetchone()[0]
+
+        owner, website_ids = self._seed(options['websites'])
+        modes = ['direct', 'funnel'] if options['mode'] == 'both' else [options['mode']]
+        results = {}
+        try:
+            for mode in modes:
+                results[mode] = self._run(mode, website_ids, options)
+                self.stderr.write(
+                    f"{mode:<7} writes/sec={results[mode]['writes_per_sec']} locked={results[mode]['lock_errors']} "
+                    f"read p95={results[mode]['read_ms']['p95']}ms"
+                )
+        finally:
+            connections.close_all()
+            owner.delete()
+
+        write_report({
+            "benchmark": "sqlite_concurrency",
+            "environment": environment(),
+            "config": {k: options[k] for k in ('websites', 'writers', 'readers', 'duration', 'batch', 'no_tuning')},
+            "journal_mode": journal_mode,
+            "results": results,
+        }, options['output'], self.stdout)
+
+    def _seed(self, count):
+        User = get_user_model()
+        User.objects.filter(username=BENCH_USERNAME).delete()
+        owner = User.objects.create_user(username=BENCH_USERNAME)
+        Website.objects.bulk_create([
+            Website(owner=owner, name=f"sqlite-bench-{i}", url=f"https://sqlite-bench-{i}.example.com/")
+            for i in range(count)
+        ], batch_size=1000)
+        return owner, list(Website.objects.filter(owner=owner).values_list('id', flat=True))
+
+    def _run(self, mode, website_ids, options):
+        ctx = multiprocessing.get_context('fork')
+        stats = ctx.Queue()
+        items = ctx.Queue(maxsize=options['batch'] * 10) if mode == 'funnel' else None
+        logs_before = MonitorLog.objects.filter(website_id__in=website_ids).count()
+        connections.close_all()
+
+        deadline = time.time() + options['duration']
+        procs = [ctx.Process(target=_writer, args=(website_ids, deadline, items, stats)) for _ in range(options['writers'])]
+        procs += [ctx.Process(target=_reader, args=(website_ids, deadline, stats)) for _ in range(options['readers'])]
+        if mode == 'funnel':
+            # Let the funnel drain what is still queued when the writers stop
+            procs.append(ctx.Process(target=_funnel, args=(deadline + 1.0, items, options['batch'], stats)))
+        started = time.monotonic()
+        for proc in procs:
+            proc.start()
+        reports = [stats.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+        elapsed = time.monotonic() - started
+
+        written = MonitorLog.objects.filter(website_id__in=website_ids).count() - logs_before
+        latencies = [x for r in reports if r['role'] == 'reader' for x in r['latencies']]
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "results_written": written,
+            "writes_per_sec": round(written / options['duration'], 1),
+            "lock_errors": sum(r['locked'] for r in reports),
+            "funnel_batches": sum(r.get('batches', 0) for r in reports),
+            "reads": len(latencies),
+            "reads_per_sec": round(len(latencies) / options['duration'], 1),
+            "read_ms": {k: round(v * 1000, 2) if v is not None else None for k, v in percentiles(latencies).items()},
+        }
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from monitor.errors import intern_error, count_error, window_start
+from monitor.models import MonitorLog, Incident
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the raw error messages of existing MonitorLog rows into the error catalog: each row "
+        "gets its ErrorSignature and drops the text, and hourly ErrorCounts are added for them. "
+        "Incidents are linked to their signature and their reason shortened to its error class. Safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=2000, help="Rows per transaction")
+
+    def handle(self, *args, **options):
+        converted = 0
+        while True:
+            rows = list(
+                MonitorLog.objects.filter(error_message__isnull=False).exclude(error_message='').order_by('id')
+                .values_list('id', 'website_id', 'website__url', 'timestamp', 'error_message')[:options['batch']]
+            )
+            if not rows:
+                break
+            with transaction.atomic():
+                logs = {}
+                windows = {}
+                for log_id, website_id, url, timestamp, message in rows:
+                    signature = intern_error(message, url)
+                    logs.setdefault(signature.id, []).append(log_id)
+                    key = (website_id, signature.id, window_start(timestamp))
+                    count, last_seen = windows.get(key, (0, timestamp))
+                    windows[key] = (count + 1, max(last_seen, timestamp))
+                for signature_id, ids in logs.items():
+                    MonitorLog.objects.filter(id__in=ids).update(error_id=signature_id, error_message=None)
+                for (website_id, signature_id, _), (count, last_seen) in windows.items():
+                    count_error(website_id, signature_id, last_seen, occurrences=count)
+            converted += len(rows)
+            self.stderr.write(f"converted {converted} logs")
+
+        linked = 0
+        for incident in Incident.objects.filter(error__isnull=True).exclude(reason='').select_related('website').iterator():
+            incident.error = intern_error(incident.reason, incident.website.url)
+            incident.reason = incident.error.error_class
+            incident.save(update_fields=['error', 'reason'])
+            linked += 1
+        self.stdout.write(f"Converted {converted} logs, linked {linked} incidents")
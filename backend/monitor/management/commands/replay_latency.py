@@ -0,0 +1,117 @@
+import bisect
+import itertools
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from monitor import tsdb
+from monitor.anomaly import LatencyBaseline, Thresholds
+from monitor.benchmarks.metrics import write_report
+from monitor.models import Website, MonitorLog, Incident
+
+
+def _series(website, since):
+    """(timestamp, response_time) of successful checks, oldest first, from the sample store when enabled."""
+    if settings.TSDB_ENABLED:
+        records = tsdb.scan(website.id, since)
+        records = records[records['is_success'] == 1]
+        return [
+            (datetime.fromtimestamp(t / 1000, tz=dt_timezone.utc), response_time)
+            for t, response_time in zip(records['t'].tolist(), records['response_time'].tolist())
+        ]
+    return list(
+        MonitorLog.objects.filter(website=website, timestamp__gte=since, is_success=True, response_time__isnull=False)
+        .order_by('timestamp').values_list('timestamp', 'response_time')
+    )
+
+
+def _floats(value):
+    return [float(v) for v in value.split(',') if v.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay historical response times through the latency anomaly detector for a grid "
+        "of thresholds. Reports how often each setting flags checks and how many incidents were "
+        "preceded by an anomaly, to pick LATENCY_* settings. --store seeds the live baselines."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--website', type=int, action='append', help="Website id (repeatable, default all)")
+        parser.add_argument('--days', type=int, default=30, help="History to replay")
+        parser.add_argument('--alpha', default=str(settings.LATENCY_EWMA_ALPHA), help="Comma-separated EWMA weights")
+        parser.add_argument('--z', default=str(settings.LATENCY_ANOMALY_Z), help="Comma-separated z thresholds")
+        parser.add_argument('--warmup', type=int, default=settings.LATENCY_WARMUP_SAMPLES)
+        parser.add_argument('--min-delta', type=float, default=settings.LATENCY_ANOMALY_MIN_DELTA)
+        parser.add_argument('--lead', type=int, default=15, help="Minutes before an incident an anomaly counts as an early warning")
+        parser.add_argument('--output', help="Write the JSON report to this file")
+        parser.add_argument('--store', action='store_true', help="Save the replayed baseline on each website (single alpha/z only)")
+
+    def handle(self, *args, **options):
+        grid = [
+            Thresholds(alpha=alpha, z=z, warmup=options['warmup'], min_delta=options['min_delta'])
+            for alpha, z in itertools.product(_floats(options['alpha']), _floats(options['z']))
+        ]
+        if options['store'] and len(grid) != 1:
+            raise CommandError("--store needs exactly one --alpha and one --z")
+
+        since = timezone.now() - timedelta(days=options['days'])
+        websites = Website.objects.all()
+        if options['website']:
+            websites = websites.filter(id__in=options['website'])
+
+        lead = timedelta(minutes=options['lead'])
+        totals = {t: {"checks": 0, "anomalies": 0, "incidents": 0, "warned": 0, "alerts": 0} for t in grid}
+        for website in websites.iterator():
+            series = _series(website, since)
+            if not series:
+                continue
+            incidents = list(Incident.objects.filter(website=website, start_time__gte=since).values_list('start_time', flat=True))
+
+            for thresholds in grid:
+                baseline = LatencyBaseline()
+                flagged = []
+                streak = 0
+                stats = totals[thresholds]
+                for timestamp, response_time in series:
+                    anomaly, _ = baseline.observe(response_time, thresholds)
+                    streak = streak + 1 if anomaly else 0
+                    if anomaly:
+                        flagged.append(timestamp)
+                    if streak == settings.LATENCY_ALERT_AFTER:
+                        stats['alerts'] += 1
+                stats['checks'] += len(series)
+                stats['anomalies'] += len(flagged)
+                stats['incidents'] += len(incidents)
+                for start in incidents:
+                    i = bisect.bisect_left(flagged, start - lead)
+                    if i < len(flagged) and flagged[i] <= start:
+                        stats['warned'] += 1
+
+                if options['store']:
+                    baseline.store(website)
+                    website.latency_anomalies = streak
+                    website.save(update_fields=['latency_mean', 'latency_var', 'latency_samples', 'latency_anomalies'])
+
+        results = []
+        for thresholds, stats in totals.items():
+            results.append({
+                "alpha": thresholds.alpha,
+                "z": thresholds.z,
+                **stats,
+                "anomaly_rate": round(stats['anomalies'] / stats['checks'], 5) if stats['checks'] else None,
+                "early_warning_rate": round(stats['warned'] / stats['incidents'], 3) if stats['incidents'] else None,
+            })
+            self.stderr.write(
+                f"alpha={thresholds.alpha:<6} z={thresholds.z:<5} anomalies={stats['anomalies']}/{stats['checks']} "
+                f"alerts={stats['alerts']} early warnings={stats['warned']}/{stats['incidents']}"
+            )
+
+        write_report({
+            "benchmark": "latency_replay",
+            "config": {"days": options['days'], "warmup": options['warmup'], "min_delta": options['min_delta'],
+                       "lead_minutes": options['lead'], "alert_after": settings.LATENCY_ALERT_AFTER},
+            "results": results,
+        }, options['output'], self.stdout)
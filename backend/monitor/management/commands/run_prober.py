@@ -0,0 +1,48 @@
+import asyncio
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from monitor.prober import Prober
+
+
+class Command(BaseCommand):
+    help = "Run the standalone probe scheduler for one or more shards without going through Celery."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shard', action='append', default=[], help="Probe shard to own (repeatable). Defaults to PROBER_DAEMON_SHARDS.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Maximum probes in flight")
+        parser.add_argument('--db-workers', type=int, default=4, help="Threads writing results to the database")
+        parser.add_argument('--refresh', type=int, default=30, help="Seconds between website list refreshes")
+
+    def handle(self, *args, **options):
+        shards = options['shard'] or settings.PROBER_DAEMON_SHARDS
+        if not shards:
+            raise CommandError("No shards to probe. Pass --shard or set PROBER_DAEMON_SHARDS.")
+        unknown = set(shards) - set(settings.PROBE_SHARDS)
+        if unknown:
+            raise CommandError(f"Unknown shard(s): {', '.join(sorted(unknown))}. Known: {', '.join(settings.PROBE_SHARDS)}")
+        not_exclusive = set(shards) - set(settings.PROBER_DAEMON_SHARDS)
+        if not_exclusive:
+            self.stderr.write(self.style.WARNING(
+                f"Shard(s) {', '.join(sorted(not_exclusive))} are not in PROBER_DAEMON_SHARDS; "
+                "Celery beat will keep dispatching them too."
+            ))
+
+        prober = Prober(
+            shards=shards,
+            concurrency=options['concurrency'],
+            db_workers=options['db_workers'],
+            refresh_interval=options['refresh'],
+        )
+        self.stdout.write(f"Prober running for shard(s): {', '.join(shards)}")
+        asyncio.run(self._run(prober))
+        self.stdout.write("Prober stopped")
+
+    async def _run(self, prober):
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await prober.run(stop)
@@ -0,0 +1,39 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from monitor.funnel import RESULTS_KEY, drain
+from monitor.utils import get_redis
+
+
+class Command(BaseCommand):
+    help = (
+        "Single writer for RESULT_FUNNEL: records queued probe results in batched transactions. "
+        "Run exactly one instance."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=settings.RESULT_FUNNEL_BATCH, help="Results per transaction")
+        parser.add_argument('--idle', type=float, default=0.2, help="Seconds to sleep when the queue is empty")
+
+    def handle(self, *args, **options):
+        stopping = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stopping.append(True))
+
+        r = get_redis(socket_timeout=10)
+        self.stdout.write(f"Result writer running ({r.llen(RESULTS_KEY)} queued)")
+        while not stopping:
+            close_old_connections()
+            try:
+                taken = drain(r, options['batch'])
+            except Exception as e:
+                self.stderr.write(f"Result writer error: {e}")
+                time.sleep(1)
+                continue
+            if not taken:
+                time.sleep(options['idle'])
+        self.stdout.write("Result writer stopped")
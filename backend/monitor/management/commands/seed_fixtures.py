@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from monitor.benchmarks import fixtures
+
+
+class Command(BaseCommand):
+    help = "Bulk-seed benchmark websites, logs, incidents and snapshots owned by throwaway __bench_* users."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--websites', type=int, default=1000)
+        parser.add_argument('--logs', type=int, default=1_000_000)
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--users', type=int, default=5, help="Non-master users with authorized_users access")
+        parser.add_argument('--sites-per-user', type=int, default=50)
+        parser.add_argument('--incidents-per-site', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=20_000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--clear', action='store_true', help="Only delete previously seeded data")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            fixtures.clear()
+            self.stdout.write("Removed benchmark fixtures")
+            return
+
+        started = time.monotonic()
+        fixtures.seed(
+            websites=options['websites'],
+            logs=options['logs'],
+            days=options['days'],
+            users=options['users'],
+            sites_per_user=options['sites_per_user'],
+            incidents_per_site=options['incidents_per_site'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.monotonic() - started:.1f}s"))
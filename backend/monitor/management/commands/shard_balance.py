@@ -0,0 +1,42 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from monitor.models import Website
+from monitor.routing import HashRing
+
+
+class Command(BaseCommand):
+    help = "Show how active websites are spread across probe shards, optionally simulating a shard change."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--add', action='append', default=[], help="Simulate adding a shard (repeatable)")
+        parser.add_argument('--remove', action='append', default=[], help="Simulate removing a shard (repeatable)")
+        parser.add_argument('--all', action='store_true', help="Include inactive websites")
+
+    def handle(self, *args, **options):
+        websites = Website.objects.all() if options['all'] else Website.objects.filter(is_active=True)
+        ids = list(websites.values_list('id', flat=True))
+
+        current = HashRing(settings.PROBE_SHARDS, settings.PROBE_SHARD_VNODES)
+        self._report("Current shards", current, ids)
+
+        if options['add'] or options['remove']:
+            shards = [s for s in settings.PROBE_SHARDS if s not in options['remove']] + options['add']
+            proposed = HashRing(shards, settings.PROBE_SHARD_VNODES)
+            self.stdout.write("")
+            self._report("Proposed shards", proposed, ids)
+            moved = sum(1 for i in ids if current.shard_for(i) != proposed.shard_for(i))
+            pct = (moved / len(ids) * 100) if ids else 0
+            self.stdout.write(f"\n{moved} of {len(ids)} websites would move ({pct:.1f}%)")
+
+    def _report(self, title, ring, ids):
+        counts = Counter(ring.shard_for(i) for i in ids)
+        total = len(ids) or 1
+        ideal = len(ids) / len(ring.shards) if ring.shards else 0
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{title} ({len(ring.shards)} shards, {len(ids)} websites)"))
+        for shard in ring.shards:
+            count = counts.get(shard, 0)
+            skew = ((count / ideal) - 1) * 100 if ideal else 0
+            self.stdout.write(f"  {shard:<24} {count:>8}  {count / total * 100:6.2f}%  ({skew:+.1f}% vs even)")
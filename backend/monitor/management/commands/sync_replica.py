@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database into every SQLite replica in REPLICA_DATABASE_URLS using the "
+        "online backup API. Stands in for real replication when testing the replica router locally."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, help="Keep syncing every N seconds (simulates replication lag)")
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("sync_replica only copies SQLite files; use the database's own replication otherwise")
+        replicas = [alias for alias in settings.REPLICA_DATABASES
+                    if settings.DATABASES[alias]['ENGINE'] == 'django.db.backends.sqlite3']
+        if not replicas:
+            raise CommandError("No SQLite replicas configured in REPLICA_DATABASE_URLS")
+
+        while True:
+            started = time.monotonic()
+            for alias in replicas:
+                # Drop our own handle so the copy is not read through a stale connection
+                connections[alias].close()
+                source = sqlite3.connect(primary['NAME'])
+                target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                    source.close()
+            self.stdout.write(f"Synced {', '.join(replicas)} in {time.monotonic() - started:.2f}s")
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,85 @@
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from monitor import tsdb
+from monitor.benchmarks.metrics import write_report
+from monitor.models import Website, MonitorLog
+
+CHUNK = 4096
+
+
+class Command(BaseCommand):
+    help = (
+        "Import MonitorLog history into the compressed sample store (TSDB_DIR). Logs whose "
+        "timestamp is already stored are skipped, so an interrupted run is finished by running "
+        "it again. Reports bytes per sample on disk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--website', type=int, action='append', help="Website id (repeatable, default all)")
+        parser.add_argument('--days', type=int, help="Only import this much history")
+        parser.add_argument('--seal', action='store_true', help="Also seal the partial head block of each website")
+        parser.add_argument('--output', help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        websites = Website.objects.all()
+        if options['website']:
+            websites = websites.filter(id__in=options['website'])
+
+        imported = 0
+        totals = {"blocks": 0, "sealed_samples": 0, "sealed_bytes": 0, "head_samples": 0, "head_bytes": 0}
+        for website in websites.iterator():
+            logs = MonitorLog.objects.filter(website=website)
+            since = None
+            if options['days']:
+                since = timezone.now() - timedelta(days=options['days'])
+                logs = logs.filter(timestamp__gte=since)
+            # Samples already stored per time (by an earlier run or live recording);
+            # a count, not a set, since logs can share a millisecond
+            stored = Counter(tsdb.scan(website.id, since)['t'].tolist())
+
+            rows = logs.order_by('timestamp').values_list(
+                'timestamp', 'response_time', 'ttfb', 'status_code', 'payload_size', 'is_success')
+            chunk = []
+            for row in rows.iterator(chunk_size=CHUNK):
+                chunk.append(row)
+                if len(chunk) == CHUNK:
+                    imported += self._append(website.id, chunk, stored)
+                    chunk = []
+            if chunk:
+                imported += self._append(website.id, chunk, stored)
+            if options['seal']:
+                tsdb.seal(website.id)
+
+            for key, value in tsdb.usage(website.id).items():
+                if key in totals:
+                    totals[key] += value
+
+        samples = totals['sealed_samples'] + totals['head_samples']
+        self.stderr.write(
+            f"imported={imported} samples={samples} sealed={totals['sealed_samples']} "
+            f"sealed bytes/sample={totals['sealed_bytes'] / totals['sealed_samples'] if totals['sealed_samples'] else 0:.2f}"
+        )
+        write_report({
+            "benchmark": "tsdb_backfill",
+            "imported": imported,
+            **totals,
+            "sealed_bytes_per_sample": round(totals['sealed_bytes'] / totals['sealed_samples'], 2) if totals['sealed_samples'] else None,
+            "raw_bytes_per_sample": tsdb.RECORD.itemsize,
+        }, options['output'], self.stdout)
+
+    def _append(self, website_id, rows, stored):
+        records = tsdb.to_records(rows)
+        keep = np.ones(len(records), dtype=bool)
+        for i, t in enumerate(records['t'].tolist()):
+            if stored[t]:
+                stored[t] -= 1
+                keep[i] = False
+        records = records[keep]
+        if len(records):
+            tsdb.append(website_id, records)
+        return len(records)
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0006_systemsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systemconfig',
+            name='alert_digest_max_batch',
+            field=models.PositiveIntegerField(default=50, help_text='Maximum alerts per digest email'),
+        ),
+        migrations.AddField(
+            model_name='systemconfig',
+            name='alert_digest_window',
+            field=models.PositiveIntegerField(default=60, help_text='Seconds to collect website alerts into one digest (0 disables)'),
+        ),
+    ]
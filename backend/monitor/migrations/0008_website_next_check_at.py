@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0007_systemconfig_alert_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='website',
+            name='next_check_at',
+            field=models.DateTimeField(blank=True, help_text='Earliest time of the next scheduled check (staggered imports)', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0008_website_next_check_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='website',
+            name='tags',
+            field=models.CharField(blank=True, default='', help_text='Comma-separated labels for grouping', max_length=255),
+        ),
+    ]
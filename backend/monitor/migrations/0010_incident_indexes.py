@@ -0,0 +1,25 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0009_website_tags'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['website', 'start_time'], name='monitor_inc_website_d66d9c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['start_time'], name='monitor_inc_start_t_ae9035_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['end_time'], name='monitor_inc_end_tim_79f8c1_idx'),
+        ),
+    ]
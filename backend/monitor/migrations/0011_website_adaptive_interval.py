@@ -0,0 +1,33 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0010_incident_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='website',
+            name='adaptive_interval',
+            field=models.BooleanField(default=False, help_text='Let the check interval adapt to site stability'),
+        ),
+        migrations.AddField(
+            model_name='website',
+            name='adaptive_max_interval',
+            field=models.PositiveIntegerField(default=3600, help_text='Longest adaptive interval in seconds'),
+        ),
+        migrations.AddField(
+            model_name='website',
+            name='adaptive_min_interval',
+            field=models.PositiveIntegerField(default=60, help_text='Shortest adaptive interval in seconds'),
+        ),
+        migrations.AddField(
+            model_name='website',
+            name='current_interval',
+            field=models.PositiveIntegerField(blank=True, help_text='Current adaptive interval in seconds', null=True),
+        ),
+    ]
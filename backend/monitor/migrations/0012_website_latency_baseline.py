@@ -0,0 +1,33 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0011_website_adaptive_interval'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='website',
+            name='latency_anomalies',
+            field=models.PositiveIntegerField(default=0, help_text='Consecutive anomalous response times'),
+        ),
+        migrations.AddField(
+            model_name='website',
+            name='latency_mean',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='website',
+            name='latency_samples',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='website',
+            name='latency_var',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.28 on 2026-10-19 03:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0012_website_latency_baseline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='website',
+            name='probe_cache',
+            field=models.JSONField(blank=True, default=dict, help_text='Conditional GET validators and unsupported probe mode'),
+        ),
+        migrations.AddField(
+            model_name='website',
+            name='probe_mode',
+            field=models.CharField(choices=[('get', 'Full GET'), ('head', 'HEAD only'), ('conditional', 'Conditional GET'), ('range', 'Ranged GET')], default='get', max_length=12),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.28 on 2026-10-19 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0013_website_probe_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='website',
+            name='cert_expires_at',
+            field=models.DateTimeField(blank=True, help_text='Certificate expiry seen by the last TLS probe', null=True),
+        ),
+        migrations.AddField(
+            model_name='website',
+            name='probe_type',
+            field=models.CharField(choices=[('http', 'HTTP'), ('tcp', 'TCP connect'), ('dns', 'DNS resolve'), ('tls', 'TLS handshake')], default='http', help_text="Non-HTTP types use the URL's host and port", max_length=8),
+        ),
+        migrations.AlterField(
+            model_name='website',
+            name='probe_mode',
+            field=models.CharField(choices=[('get', 'Full GET'), ('head', 'HEAD only'), ('conditional', 'Conditional GET'), ('range', 'Ranged GET')], default='get', help_text='HTTP request style', max_length=12),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.28 on 2026-10-19 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0014_website_probe_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='monitorlog',
+            index=models.Index(fields=['website', '-timestamp'], name='monitor_mon_website_643d75_idx'),
+        ),
+    ]
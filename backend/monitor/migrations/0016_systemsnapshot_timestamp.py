@@ -0,0 +1,17 @@
+# Generated by Django 4.2.28 on 2026-10-19 04:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0015_monitorlog_website_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='systemsnapshot',
+            index=models.Index(fields=['-timestamp'], name='monitor_sys_timesta_67986a_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.28 on 2026-10-19 04:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0016_systemsnapshot_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ErrorSignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('error_class', models.CharField(max_length=64)),
+                ('template', models.TextField()),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['error_class'], name='monitor_err_error_c_5f08e6_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='error',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='incidents', to='monitor.errorsignature'),
+        ),
+        migrations.AddField(
+            model_name='monitorlog',
+            name='error',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='monitor.errorsignature'),
+        ),
+        migrations.CreateModel(
+            name='ErrorCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('last_seen', models.DateTimeField()),
+                ('signature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counts', to='monitor.errorsignature')),
+                ('website', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='error_counts', to='monitor.website')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['window_start', 'signature'], name='monitor_err_window__58df86_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='errorcount',
+            constraint=models.UniqueConstraint(fields=('website', 'signature', 'window_start'), name='unique_error_count_window'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.28 on 2026-10-19 04:35
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitor', '0017_error_catalog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='incident',
+            name='start_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='monitorlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
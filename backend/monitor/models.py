@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.conf import settings
 
 class Website(models.Model):
@@ -7,15 +8,35 @@ class Website(models.Model):
         ('down', 'Down'),
         ('pending', 'Pending'),
     ]
+    PROBE_TYPE_CHOICES = [
+        ('http', 'HTTP'),
+        ('tcp', 'TCP connect'),
+        ('dns', 'DNS resolve'),
+        ('tls', 'TLS handshake'),
+    ]
+    PROBE_MODE_CHOICES = [
+        ('get', 'Full GET'),
+        ('head', 'HEAD only'),
+        ('conditional', 'Conditional GET'),
+        ('range', 'Ranged GET'),
+    ]
 
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='owned_websites')
     authorized_users = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='accessible_websites', blank=True)
     name = models.CharField(max_length=255)
     url = models.URLField()
+    tags = models.CharField(max_length=255, blank=True, default='', help_text="Comma-separated labels for grouping")
     
     # Polling Configuration
     check_interval = models.PositiveIntegerField(default=5, help_text="Standard frequency in minutes")
     failure_poll_interval = models.PositiveIntegerField(default=5, help_text="Poll frequency in seconds when down")
+    probe_type = models.CharField(max_length=8, choices=PROBE_TYPE_CHOICES, default='http', help_text="Non-HTTP types use the URL's host and port")
+    probe_mode = models.CharField(max_length=12, choices=PROBE_MODE_CHOICES, default='get', help_text="HTTP request style")
+
+    # Adaptive polling: back off towards the max while stable, snap to the min on trouble
+    adaptive_interval = models.BooleanField(default=False, help_text="Let the check interval adapt to site stability")
+    adaptive_min_interval = models.PositiveIntegerField(default=60, help_text="Shortest adaptive interval in seconds")
+    adaptive_max_interval = models.PositiveIntegerField(default=3600, help_text="Longest adaptive interval in seconds")
     
     # Alerting Configuration
     alert_threshold = models.PositiveIntegerField(default=3, help_text="Consecutive failures before critical alert")
@@ -26,8 +47,18 @@ class Website(models.Model):
     is_active = models.BooleanField(default=True)
     current_status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     last_check_time = models.DateTimeField(null=True, blank=True)
+    next_check_at = models.DateTimeField(null=True, blank=True, help_text="Earliest time of the next scheduled check (staggered imports)")
     consecutive_failures = models.PositiveIntegerField(default=0)
     consecutive_successes = models.PositiveIntegerField(default=0)
+    current_interval = models.PositiveIntegerField(null=True, blank=True, help_text="Current adaptive interval in seconds")
+
+    # Streaming latency baseline (EWMA of log response time, see monitor/anomaly.py)
+    latency_mean = models.FloatField(null=True, blank=True)
+    latency_var = models.FloatField(null=True, blank=True)
+    latency_samples = models.PositiveIntegerField(default=0)
+    latency_anomalies = models.PositiveIntegerField(default=0, help_text="Consecutive anomalous response times")
+    cert_expires_at = models.DateTimeField(null=True, blank=True, help_text="Certificate expiry seen by the last TLS probe")
+    probe_cache = models.JSONField(default=dict, blank=True, help_text="Conditional GET validators and unsupported probe mode")
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -35,36 +66,102 @@ class Website(models.Model):
     def __str__(self):
         return f"{self.name} ({self.url})"
 
+    def effective_interval(self):
+        """Seconds between checks right now, used by both dispatch_all_checks and run_prober."""
+        if self.current_status == 'down':
+            return self.failure_poll_interval
+        if not self.adaptive_interval:
+            return self.check_interval * 60
+        low = min(self.adaptive_min_interval, self.adaptive_max_interval)
+        interval = self.current_interval or self.check_interval * 60
+        return max(low, min(interval, self.adaptive_max_interval))
+
+    def adapt_interval(self, is_success, anomaly=False):
+        """
+        Tighten to the minimum on a failure or latency anomaly, otherwise grow
+        by ADAPTIVE_BACKOFF_FACTOR once ADAPTIVE_STABLE_CHECKS successes in a
+        row have been seen. No-op unless adaptive_interval is set.
+        """
+        if not self.adaptive_interval:
+            return
+        if not is_success or anomaly:
+            self.current_interval = self.adaptive_min_interval
+        elif self.consecutive_successes >= settings.ADAPTIVE_STABLE_CHECKS:
+            grown = int(self.effective_interval() * settings.ADAPTIVE_BACKOFF_FACTOR)
+            self.current_interval = min(max(grown, self.adaptive_min_interval), self.adaptive_max_interval)
+
 class MonitorLog(models.Model):
     website = models.ForeignKey(Website, on_delete=models.CASCADE, related_name='logs')
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
     status_code = models.IntegerField(null=True, blank=True)
     response_time = models.FloatField(help_text="Response time in seconds")
     ttfb = models.FloatField(null=True, blank=True, help_text="Time to first byte in seconds")
     payload_size = models.IntegerField(null=True, blank=True, help_text="Payload size in bytes")
     is_success = models.BooleanField()
+    # Raw message only for rows written before the error catalog; new failures reference `error`
     error_message = models.TextField(null=True, blank=True)
+    error = models.ForeignKey('ErrorSignature', on_delete=models.PROTECT, null=True, blank=True, related_name='logs')
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['website', '-timestamp']),
+        ]
 
     def __str__(self):
         return f"{self.website.name} check at {self.timestamp}"
 
 class Incident(models.Model):
     website = models.ForeignKey(Website, on_delete=models.CASCADE, related_name='incidents')
-    start_time = models.DateTimeField(auto_now_add=True)
+    start_time = models.DateTimeField(default=timezone.now)
     end_time = models.DateTimeField(null=True, blank=True)
     reason = models.TextField(blank=True)
+    error = models.ForeignKey('ErrorSignature', on_delete=models.PROTECT, null=True, blank=True, related_name='incidents')
     is_resolved = models.BooleanField(default=False)
     mttr_seconds = models.PositiveIntegerField(null=True, blank=True)
 
     class Meta:
         ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['website', 'start_time']),
+            models.Index(fields=['start_time']),
+            models.Index(fields=['end_time']),
+        ]
 
     def __str__(self):
         return f"Incident for {self.website.name} at {self.start_time}"
 
+class ErrorSignature(models.Model):
+    """One normalized probe error (host, addresses and ids stripped), stored once and referenced by id."""
+    error_class = models.CharField(max_length=64)
+    template = models.TextField()
+    digest = models.CharField(max_length=64, unique=True)
+    first_seen = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['error_class']),
+        ]
+
+    def __str__(self):
+        return f"{self.error_class}: {self.template[:80]}"
+
+class ErrorCount(models.Model):
+    """Occurrences of one error signature on one website within an hourly window."""
+    website = models.ForeignKey(Website, on_delete=models.CASCADE, related_name='error_counts')
+    signature = models.ForeignKey(ErrorSignature, on_delete=models.CASCADE, related_name='counts')
+    window_start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['website', 'signature', 'window_start'], name='unique_error_count_window'),
+        ]
+        indexes = [
+            models.Index(fields=['window_start', 'signature']),
+        ]
+
 class SystemConfig(models.Model):
     custom_postgres_url = models.CharField(max_length=500, blank=True, null=True)
     custom_redis_url = models.CharField(max_length=500, blank=True, null=True)
@@ -73,6 +170,10 @@ class SystemConfig(models.Model):
     cpu_alert_threshold = models.IntegerField(default=85, help_text="CPU percentage")
     memory_alert_threshold = models.IntegerField(default=85, help_text="RAM percentage")
     disk_alert_threshold = models.IntegerField(default=85, help_text="Disk percentage")
+
+    # Website alert digesting
+    alert_digest_window = models.PositiveIntegerField(default=60, help_text="Seconds to collect website alerts into one digest (0 disables)")
+    alert_digest_max_batch = models.PositiveIntegerField(default=50, help_text="Maximum alerts per digest email")
     
     @classmethod
     def get_solo(cls):
@@ -101,6 +202,9 @@ class SystemSnapshot(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp']),
+        ]
 
     def __str__(self):
         return f"Snapshot: {self.title} at {self.timestamp}"
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.db import close_old_connections
+
+from .models import Website
+from .budgets import ProbeDeferred, record_deferral
+from .targets import shared_probe, target_key
+from .routing import shard_for_website
+
+logger = logging.getLogger(__name__)
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel: `slots` buckets of `tick` seconds each. Delays longer
+    than one revolution are stored with a round counter, so scheduling and
+    cancelling are O(1) and each tick only touches one bucket.
+    """
+
+    def __init__(self, slots=3600, tick=1.0):
+        self.tick = tick
+        self.slots = [dict() for _ in range(slots)]
+        self.cursor = 0
+        self._where = {}
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key):
+        return key in self._where
+
+    def schedule(self, key, delay):
+        self.cancel(key)
+        ticks = max(1, math.ceil(delay / self.tick))
+        slot = (self.cursor + ticks) % len(self.slots)
+        self.slots[slot][key] = (ticks - 1) // len(self.slots)
+        self._where[key] = slot
+
+    def cancel(self, key):
+        slot = self._where.pop(key, None)
+        if slot is not None:
+            self.slots[slot].pop(key, None)
+
+    def advance(self):
+        """Move forward one tick and return the keys that fell due."""
+        self.cursor = (self.cursor + 1) % len(self.slots)
+        bucket = self.slots[self.cursor]
+        due = []
+        for key, rounds in list(bucket.items()):
+            if rounds:
+                bucket[key] = rounds - 1
+            else:
+                del bucket[key]
+                del self._where[key]
+                due.append(key)
+        return due
+
+
+def next_interval(website, result=None):
+    """Seconds until the next check, mirroring dispatch_all_checks."""
+    if result is not None and not result['is_success']:
+        return website.failure_poll_interval
+    return website.effective_interval()
+
+
+class Prober:
+    """
+    Self-contained scheduler and probe loop for `manage.py run_prober`.
+
+    Websites are kept in memory and scheduled on a TimingWheel. Probes run on
+    a thread pool (bounded by `concurrency`), results are written through
+    `record_result` on a separate, smaller pool, and the website set is
+    re-read from the database every `refresh_interval` seconds.
+    """
+
+    def __init__(self, shards=None, concurrency=50, db_workers=4, refresh_interval=30, tick=1.0, on_check=None,
+                 queryset=None, interval=None):
+        self.shards = set(shards) if shards else None
+        self.queryset = queryset
+        # Fixed re-check interval in seconds, overriding the per-site schedule (benchmarks)
+        self.interval = interval
+        self.concurrency = concurrency
+        self.refresh_interval = refresh_interval
+        self.on_check = on_check
+        self.wheel = TimingWheel(tick=tick)
+        self.websites = {}
+        self.due_at = {}
+        self.in_flight = set()
+        # target key -> in-flight probe future, so websites sharing a URL share a request
+        self.target_probes = {}
+        self.probe_pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='probe')
+        self.db_pool = ThreadPoolExecutor(max_workers=db_workers, thread_name_prefix='probe-db')
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _owns(self, website_id):
+        return self.shards is None or shard_for_website(website_id) in self.shards
+
+    def _load(self):
+        close_old_connections()
+        queryset = self.queryset if self.queryset is not None else Website.objects.filter(is_active=True)
+        return [w for w in queryset.all() if self._owns(w.id)]
+
+    def _schedule(self, website_id, delay):
+        self.wheel.schedule(website_id, delay)
+        self.due_at[website_id] = time.time() + delay
+
+    async def refresh(self):
+        loop = asyncio.get_running_loop()
+        fresh = {w.id: w for w in await loop.run_in_executor(self.db_pool, self._load)}
+        now = time.time()
+
+        for website_id in set(self.websites) - set(fresh):
+            self.wheel.cancel(website_id)
+            self.due_at.pop(website_id, None)
+            self.websites.pop(website_id)
+
+        for website_id, website in fresh.items():
+            if website_id in self.in_flight:
+                continue
+            known = website_id in self.websites
+            self.websites[website_id] = website
+            if known:
+                continue
+            interval = self._interval(website)
+            if website.next_check_at:
+                delay = max(0.0, website.next_check_at.timestamp() - now)
+                self._schedule(website_id, delay)
+                continue
+            if website.last_check_time:
+                delay = website.last_check_time.timestamp() + interval - now
+            else:
+                delay = 0
+            if delay <= 0:
+                # Spread overdue sites out instead of probing them all at once
+                delay = random.uniform(0, min(interval, self.refresh_interval))
+            self._schedule(website_id, delay)
+
+        logger.info(f"Prober refreshed: {len(self.websites)} websites, {len(self.in_flight)} in flight")
+
+    async def _check(self, website_id, semaphore):
+        website = self.websites.get(website_id)
+        due_at = self.due_at.pop(website_id, time.time())
+        if website is None:
+            return
+        loop = asyncio.get_running_loop()
+        self.in_flight.add(website_id)
+        result = None
+        retry_after = None
+        try:
+            async with semaphore:
+                started_at = time.time()
+                result = await self._probe(website)
+                await loop.run_in_executor(self.db_pool, self._record, website, result)
+            if self.on_check:
+                self.on_check(website_id, due_at, started_at, time.time(), result)
+        except ProbeDeferred as e:
+            retry_after = e.retry_after * random.uniform(1, 1.5)
+            await loop.run_in_executor(self.db_pool, record_deferral, [website], e, 'delayed')
+        except Exception as e:
+            logger.exception(f"Prober check failed for website {website_id}: {e}")
+        finally:
+            self.in_flight.discard(website_id)
+            if website_id in self.websites:
+                delay = retry_after if retry_after is not None else self._interval(self.websites[website_id], result)
+                self._schedule(website_id, delay)
+
+    async def _probe(self, website):
+        key = target_key(website)
+        pending = self.target_probes.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().run_in_executor(self.probe_pool, shared_probe, website, self.session)
+        self.target_probes[key] = future
+        try:
+            return await future
+        finally:
+            self.target_probes.pop(key, None)
+
+    def _interval(self, website, result=None):
+        return self.interval if self.interval is not None else next_interval(website, result)
+
+    def _record(self, website, result):
+        from .tasks import record_result
+        close_old_connections()
+        record_result(website, result)
+
+    async def run(self, stop_event, duration=None):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        await self.refresh()
+        started = time.monotonic()
+        next_tick = started + self.wheel.tick
+        next_refresh = started + self.refresh_interval
+
+        while not stop_event.is_set():
+            now = time.monotonic()
+            if duration is not None and now - started >= duration:
+                break
+            if now >= next_refresh:
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    logger.exception(f"Prober refresh failed: {e}")
+                next_refresh = now + self.refresh_interval
+
+            # Catch up on missed ticks if the loop was busy
+            while next_tick <= now:
+                for website_id in self.wheel.advance():
+                    if website_id in self.in_flight:
+                        continue
+                    task = asyncio.create_task(self._check(website_id, semaphore))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                next_tick += self.wheel.tick
+
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=max(0, next_tick - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+
+        if tasks:
+            logger.info(f"Prober stopping, waiting for {len(tasks)} in-flight checks")
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.probe_pool.shutdown(wait=True)
+        self.db_pool.shutdown(wait=True)
+        self.session.close()
@@ -0,0 +1,228 @@
+"""
+Single probes of a website.
+
+probe_type picks what is checked: an HTTP request (`http`), a plain TCP
+connect (`tcp`), a DNS lookup (`dns`) or a verified TLS handshake that
+records the certificate expiry (`tls`); non-HTTP types use the URL's host
+and port. HTTP probes use probe_mode: `get`, `head`, `conditional` (ETag /
+Last-Modified validators from the last full response) or `range` (the first
+PROBE_RANGE_BYTES). A server that rejects HEAD or Range gets a plain GET,
+and payload_size is always the full body size.
+"""
+import re
+import socket
+import ssl
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+
+PROBE_TIMEOUT = 15
+
+# Statuses meaning the server does not support a probe mode; the probe is
+# repeated as a plain GET and the mode is skipped from then on
+UNSUPPORTED_STATUS = {
+    'head': (405, 501),
+    'range': (416,),
+}
+
+_content_range_total = re.compile(r'/(\d+)\s*$')
+
+
+def _content_length(response):
+    try:
+        return int(response.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return None
+
+
+def _range_total(response):
+    match = _content_range_total.search(response.headers.get('Content-Range', ''))
+    return int(match.group(1)) if match else None
+
+
+def _read_capped(response, limit):
+    """Read at most `limit` body bytes; the rest is dropped with the connection."""
+    read = 0
+    for chunk in response.iter_content(8192):
+        read += len(chunk)
+        if read >= limit:
+            break
+    return min(read, limit)
+
+
+def _request(http, url, mode, cache, start_time):
+    """
+    One request in `mode`. Returns (status_code, ttfb, payload_size), where
+    payload_size is the size of the resource body: downloaded for a full
+    GET, otherwise taken from Content-Length/Content-Range or, for a 304,
+    the size seen on the last full response.
+    """
+    headers = {}
+    if mode == 'conditional':
+        if cache.get('etag'):
+            headers['If-None-Match'] = cache['etag']
+        if cache.get('last_modified'):
+            headers['If-Modified-Since'] = cache['last_modified']
+    elif mode == 'range':
+        headers['Range'] = f"bytes=0-{settings.PROBE_RANGE_BYTES - 1}"
+
+    method = 'HEAD' if mode == 'head' else 'GET'
+    # Use stream=True to measure TTFB
+    with http.request(method, url, headers=headers, timeout=PROBE_TIMEOUT, stream=True) as response:
+        # TTFB is the time when headers are received
+        ttfb = time.time() - start_time
+        status_code = response.status_code
+
+        if mode == 'head':
+            payload_size = _content_length(response)
+        elif status_code == 304:
+            payload_size = cache.get('size')
+        elif mode == 'range':
+            read = _read_capped(response, settings.PROBE_RANGE_BYTES)
+            payload_size = _range_total(response) or _content_length(response) or read
+        else:
+            payload_size = len(response.content)
+
+        if mode == 'conditional' and status_code == 200:
+            cache.update(
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+                size=payload_size,
+            )
+    return status_code, ttfb, payload_size
+
+
+def probe(website, session=None):
+    """
+    Run one check of `website.probe_type` and return the measurements as a
+    dict matching the MonitorLog columns, plus probe-type extras that
+    record_result stores on the website.
+    """
+    if website.probe_type == 'http':
+        return probe_http(website, session)
+    return SOCKET_PROBES[website.probe_type](website)
+
+
+def probe_http(website, session=None):
+    """
+    Run one HTTP check against `website.url`. Also returns the updated
+    `probe_cache` (conditional GET validators, unsupported mode).
+    """
+    http = session or requests
+    cache = dict(website.probe_cache or {})
+    mode = website.probe_mode
+    if cache.get('unsupported') == mode:
+        mode = 'get'
+
+    start_time = time.time()
+    ttfb = None
+    payload_size = 0
+
+    try:
+        status_code, ttfb, payload_size = _request(http, website.url, mode, cache, start_time)
+        if status_code in UNSUPPORTED_STATUS.get(mode, ()):
+            cache['unsupported'] = mode
+            start_time = time.time()
+            status_code, ttfb, payload_size = _request(http, website.url, 'get', cache, start_time)
+        response_time = time.time() - start_time
+        is_success = 200 <= status_code < 400
+        error_message = None if is_success else f"HTTP {status_code}"
+    except requests.exceptions.RequestException as e:
+        response_time = time.time() - start_time
+        status_code = None
+        is_success = False
+        error_message = str(e)
+
+    return {
+        "status_code": status_code,
+        "response_time": response_time,
+        "ttfb": ttfb,
+        "payload_size": payload_size,
+        "is_success": is_success,
+        "error_message": error_message,
+        "probe_cache": cache,
+    }
+
+
+def _address(url):
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    return parts.hostname, port
+
+
+def _socket_result(response_time, ttfb=None, error_message=None, **extra):
+    return {
+        "status_code": None,
+        "response_time": response_time,
+        "ttfb": ttfb,
+        "payload_size": None,
+        "is_success": error_message is None,
+        "error_message": error_message,
+        **extra,
+    }
+
+
+def probe_dns(website):
+    """Resolve the URL's host; response_time is the lookup time."""
+    host, port = _address(website.url)
+    start_time = time.time()
+    try:
+        socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as e:
+        return _socket_result(time.time() - start_time, error_message=f"DNS name resolution failed: {e}")
+    return _socket_result(time.time() - start_time)
+
+
+def probe_tcp(website):
+    """
+    Open and close a TCP connection to the URL's host and port (80/443 by
+    scheme if not given); response_time includes the DNS lookup, ttfb is the
+    connect alone.
+    """
+    host, port = _address(website.url)
+    start_time = time.time()
+    try:
+        address = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)[0][4]
+        connect_start = time.time()
+        with socket.create_connection(address[:2], timeout=PROBE_TIMEOUT):
+            connected = time.time()
+    except (socket.gaierror, UnicodeError) as e:
+        return _socket_result(time.time() - start_time, error_message=f"DNS name resolution failed: {e}")
+    except OSError as e:
+        return _socket_result(time.time() - start_time, error_message=f"TCP connect failed: {e}")
+    return _socket_result(connected - start_time, ttfb=connected - connect_start)
+
+
+def probe_tls(website):
+    """
+    TCP connect plus a verified TLS handshake, without sending a request.
+    ttfb is the time to the established TCP connection, and the peer
+    certificate's notAfter is returned as `cert_expires_at` (epoch seconds).
+    """
+    host, port = _address(website.url)
+    context = ssl.create_default_context()
+    start_time = time.time()
+    ttfb = None
+    try:
+        with socket.create_connection((host, port), timeout=PROBE_TIMEOUT) as sock:
+            ttfb = time.time() - start_time
+            with context.wrap_socket(sock, server_hostname=host) as tls:
+                cert = tls.getpeercert()
+                response_time = time.time() - start_time
+    except ssl.SSLError as e:
+        return _socket_result(time.time() - start_time, ttfb=ttfb, error_message=f"SSL handshake failed: {e}")
+    except (socket.gaierror, UnicodeError) as e:
+        return _socket_result(time.time() - start_time, error_message=f"DNS name resolution failed: {e}")
+    except OSError as e:
+        return _socket_result(time.time() - start_time, ttfb=ttfb, error_message=f"TLS connect failed: {e}")
+    expires = ssl.cert_time_to_seconds(cert['notAfter']) if cert and cert.get('notAfter') else None
+    return _socket_result(response_time, ttfb=ttfb, cert_expires_at=expires)
+
+
+SOCKET_PROBES = {
+    'tcp': probe_tcp,
+    'dns': probe_dns,
+    'tls': probe_tls,
+}
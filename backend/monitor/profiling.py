@@ -0,0 +1,144 @@
+import contextvars
+import json
+import random
+import re
+import time
+import logging
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Sorted set of sampled slow requests scored by duration; only the slowest are kept
+SLOW_REQUESTS_KEY = 'slow_requests:slowest'
+
+_profile = contextvars.ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.queries = defaultdict(lambda: [0, 0.0])
+        self.spans = defaultdict(float)
+        self._depth = defaultdict(int)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.sql_count += 1
+            self.sql_time += elapsed
+            entry = self.queries[fingerprint(sql)]
+            entry[0] += 1
+            entry[1] += elapsed
+
+
+@contextmanager
+def span(name):
+    """
+    Attribute the wall time of the block to `name` on the current request
+    profile. Nested spans of the same name only count once, and SQL issued
+    inside the block is excluded so it is not reported twice.
+    """
+    profile = _profile.get()
+    if profile is None or profile._depth[name]:
+        yield
+        return
+    profile._depth[name] += 1
+    started = time.perf_counter()
+    sql_before = profile.sql_time
+    try:
+        yield
+    finally:
+        profile._depth[name] -= 1
+        profile.spans[name] += (time.perf_counter() - started) - (profile.sql_time - sql_before)
+
+
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_in_lists = re.compile(r"IN \((?:\?,?\s*)+\)")
+
+
+def fingerprint(sql):
+    """Normalize a SQL statement so repeated queries with different literals group together."""
+    sql = _literals.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    return _in_lists.sub('IN (...)', sql)
+
+
+class TimedSerializerMixin:
+    """Reports `to_representation` time under the `ser` span of the request profile."""
+
+    def to_representation(self, instance):
+        with span('ser'):
+            return super().to_representation(instance)
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in (REQUEST_PROFILING) per-request profiler. Adds a Server-Timing
+    header with SQL, serializer and external call time, and keeps the
+    SLOW_REQUEST_RING_SIZE slowest of a sample of requests slower than
+    SLOW_REQUEST_MS in Redis together with their heaviest query fingerprints.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                # Every alias, so reads routed to replicas are profiled too
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _profile.reset(token)
+        total = time.perf_counter() - started
+
+        response['Server-Timing'] = ", ".join([
+            f'db;dur={profile.sql_time * 1000:.1f};desc="{profile.sql_count} queries"',
+            f"ser;dur={profile.spans['ser'] * 1000:.1f}",
+            f"ext;dur={profile.spans['ext'] * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+
+        if total * 1000 >= settings.SLOW_REQUEST_MS and random.random() < settings.SLOW_REQUEST_SAMPLE_RATE:
+            self.capture(request, response, profile, total)
+        return response
+
+    def capture(self, request, response, profile, total):
+        top = sorted(profile.queries.items(), key=lambda q: -q[1][1])[:10]
+        sample = {
+            "time": time.time(),
+            "method": request.method,
+            "path": request.get_full_path(),
+            "status": response.status_code,
+            "user": getattr(getattr(request, 'user', None), 'username', None),
+            "total_ms": round(total * 1000, 1),
+            "sql_ms": round(profile.sql_time * 1000, 1),
+            "sql_count": profile.sql_count,
+            "ser_ms": round(profile.spans['ser'] * 1000, 1),
+            "ext_ms": round(profile.spans['ext'] * 1000, 1),
+            "queries": [
+                {"fingerprint": sql, "count": count, "total_ms": round(elapsed * 1000, 2)}
+                for sql, (count, elapsed) in top
+            ],
+        }
+        try:
+            from .utils import get_redis
+            pipe = get_redis().pipeline()
+            pipe.zadd(SLOW_REQUESTS_KEY, {json.dumps(sample): total})
+            # Drop everything but the slowest SLOW_REQUEST_RING_SIZE
+            pipe.zremrangebyrank(SLOW_REQUESTS_KEY, 0, -settings.SLOW_REQUEST_RING_SIZE - 1)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to record slow request: {e}")
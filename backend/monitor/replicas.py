@@ -0,0 +1,78 @@
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Users, sessions and permissions are always read from the primary so a
+# login or a grant is never hidden by replication lag
+PRIMARY_ONLY_APPS = {'accounts', 'auth', 'sessions', 'contenttypes', 'admin'}
+
+_read_from_replica = contextvars.ContextVar('read_from_replica', default=False)
+
+
+@contextmanager
+def use_primary():
+    """Force reads in the block onto the primary, e.g. right after a write in a GET handler."""
+    token = _read_from_replica.set(False)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a random REPLICA_DATABASES alias only while
+    ReplicaMiddleware has marked the current request as read-only. Celery
+    tasks, management commands and writes always use `default`.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get() and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            return random.choice(settings.REPLICA_DATABASES)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from replication (or `manage.py sync_replica`)
+        return db == 'default'
+
+
+class ReplicaMiddleware:
+    """
+    Safe-method requests read from replicas unless the client wrote within
+    REPLICA_STICKY_SECONDS, tracked with a short-lived cookie set on every
+    unsafe request so users always see their own changes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned = float(request.COOKIES.get(PIN_COOKIE) or 0) > time.time()
+        except ValueError:
+            pinned = False
+        replica = request.method in SAFE_METHODS and not pinned
+        token = _read_from_replica.set(replica)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+
+        if request.method not in SAFE_METHODS:
+            until = time.time() + settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(PIN_COOKIE, f"{until:.0f}", max_age=settings.REPLICA_STICKY_SECONDS,
+                                httponly=True, samesite=settings.SESSION_COOKIE_SAMESITE)
+        return response
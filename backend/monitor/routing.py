@@ -0,0 +1,55 @@
+import bisect
+import hashlib
+from functools import lru_cache
+
+from django.conf import settings
+
+PROBE_TASKS = {'monitor.tasks.check_website', 'monitor.tasks.check_target'}
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(str(key).encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Consistent-hash ring over probe shard names. Each shard owns `vnodes`
+    points on the ring so adding or removing one shard only moves roughly
+    1/N of the websites.
+    """
+
+    def __init__(self, shards, vnodes=256):
+        self.shards = list(shards)
+        self._points = sorted(
+            (_hash(f"{shard}#{i}"), shard) for shard in self.shards for i in range(vnodes)
+        )
+        self._keys = [point for point, _ in self._points]
+
+    def shard_for(self, key):
+        if not self._points:
+            return None
+        idx = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._points[idx][1]
+
+
+@lru_cache(maxsize=None)
+def get_ring():
+    return HashRing(settings.PROBE_SHARDS, settings.PROBE_SHARD_VNODES)
+
+
+def shard_for_website(website_id):
+    return get_ring().shard_for(website_id)
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """Celery router: probes go to their website's shard, everything else to housekeeping."""
+    if name in PROBE_TASKS:
+        website_id = args[0] if args else kwargs.get('website_id', kwargs.get('website_ids'))
+        if isinstance(website_id, (list, tuple)):
+            # Shared checks go to the shard of their first website
+            website_id = website_id[0] if website_id else None
+        if website_id is not None:
+            return {'queue': shard_for_website(website_id)}
+    elif name.startswith('monitor.tasks.'):
+        return {'queue': settings.HOUSEKEEPING_QUEUE}
+    return None
@@ -1,25 +1,66 @@
+from django.conf import settings
+from django.db.models import Count, Prefetch, Q
 from rest_framework import serializers
 from .models import Website, MonitorLog, Incident, SystemSnapshot
 import numpy as np
+from .profiling import TimedSerializerMixin
+from . import tsdb
+
+class MonitorLogSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    error_message = serializers.SerializerMethodField()
+    error_class = serializers.CharField(source='error.error_class', read_only=True, default=None)
 
-class MonitorLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = MonitorLog
-        fields = ['id', 'timestamp', 'status_code', 'response_time', 'ttfb', 'payload_size', 'is_success', 'error_message']
+        fields = ['id', 'timestamp', 'status_code', 'response_time', 'ttfb', 'payload_size', 'is_success',
+                  'error_message', 'error', 'error_class']
+
+    def get_error_message(self, obj):
+        # Older rows carry the raw text, newer ones the interned template (select_related('error'))
+        if obj.error_message or obj.error_id is None:
+            return obj.error_message
+        return obj.error.template
 
-class IncidentSerializer(serializers.ModelSerializer):
+class IncidentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Incident
         fields = ['id', 'start_time', 'end_time', 'reason', 'is_resolved', 'mttr_seconds']
 
-class SystemSnapshotSerializer(serializers.ModelSerializer):
+class IncidentHistorySerializer(IncidentSerializer):
+    website_name = serializers.CharField(source='website.name', read_only=True)
+    uptime_before_seconds = serializers.SerializerMethodField()
+
+    class Meta(IncidentSerializer.Meta):
+        fields = ['id', 'website', 'website_name', 'start_time', 'end_time', 'reason', 'error', 'is_resolved',
+                  'mttr_seconds', 'uptime_before_seconds']
+
+    def get_uptime_before_seconds(self, obj):
+        gap = getattr(obj, 'uptime_before', None)
+        return round(gap.total_seconds(), 1) if gap is not None else None
+
+class SystemSnapshotSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     website_name = serializers.CharField(source='website.name', read_only=True)
     
     class Meta:
         model = SystemSnapshot
         fields = '__all__'
 
-class WebsiteSerializer(serializers.ModelSerializer):
+class SystemSnapshotListSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Summary columns for the Crashlytics timeline; the full snapshot comes from the detail endpoint."""
+    website_name = serializers.CharField(source='website.name', read_only=True, default=None)
+    incident_resolved = serializers.BooleanField(source='incident.is_resolved', read_only=True, default=None)
+
+    class Meta:
+        model = SystemSnapshot
+        fields = ['id', 'title', 'timestamp', 'website', 'website_name', 'incident', 'incident_resolved', 'response_time']
+
+# Computed per website and only included on request once ?fields= or ?expand= is used
+EXPANDABLE_FIELDS = ('recent_logs', 'uptime_percentage', 'performance_metrics', 'active_incident')
+
+def _names(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+class WebsiteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     recent_logs = serializers.SerializerMethodField()
     uptime_percentage = serializers.SerializerMethodField()
     performance_metrics = serializers.SerializerMethodField()
@@ -28,28 +69,91 @@ class WebsiteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Website
         fields = [
-            'id', 'name', 'url', 'check_interval', 'failure_poll_interval',
+            'id', 'name', 'url', 'tags', 'check_interval', 'failure_poll_interval', 'probe_type', 'probe_mode',
+            'adaptive_interval', 'adaptive_min_interval', 'adaptive_max_interval', 'current_interval',
             'alert_threshold', 'recovery_threshold', 'alert_email',
-            'is_active', 'current_status', 'last_check_time', 
+            'is_active', 'current_status', 'last_check_time', 'cert_expires_at',
             'recent_logs', 'uptime_percentage', 'performance_metrics', 'active_incident'
         ]
-        read_only_fields = ['owner', 'current_status', 'last_check_time', 'consecutive_failures']
+        read_only_fields = ['owner', 'current_status', 'last_check_time', 'consecutive_failures', 'current_interval', 'cert_expires_at']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        # Writes keep every field so validation and the echoed object are unchanged
+        if request is not None and request.method == 'GET':
+            selected = self.selected_fields(request.query_params)
+            if selected is not None:
+                for name in set(self.fields) - selected:
+                    self.fields.pop(name)
+
+    @classmethod
+    def selected_fields(cls, params):
+        """
+        Field names picked by ?fields=a,b and ?expand=c, or None when neither
+        is given (the full legacy representation). ?fields= alone lists
+        exactly what to return; ?expand= alone adds EXPANDABLE_FIELDS to the
+        cheap model fields. Unknown names are ignored.
+        """
+        fields, expand = _names(params.get('fields')), _names(params.get('expand'))
+        if not fields and not expand:
+            return None
+        base = fields or set(cls.Meta.fields) - set(EXPANDABLE_FIELDS)
+        return (base | expand) & set(cls.Meta.fields)
+
+    @staticmethod
+    def prefetch(queryset, selected):
+        """Add the joins and prefetches needed by the selected (None = all) computed fields."""
+        wanted = set(EXPANDABLE_FIELDS) if selected is None else selected
+        if 'recent_logs' in wanted:
+            queryset = queryset.prefetch_related(Prefetch(
+                'logs', queryset=MonitorLog.objects.select_related('error').order_by('-timestamp')[:20], to_attr='recent_log_list'))
+        if 'performance_metrics' in wanted:
+            queryset = queryset.prefetch_related(Prefetch(
+                'logs', queryset=MonitorLog.objects.filter(is_success=True).order_by('-timestamp').only('website_id', 'response_time')[:100],
+                to_attr='recent_success_list'))
+        if 'uptime_percentage' in wanted and not settings.TSDB_ENABLED:
+            queryset = queryset.annotate(log_total=Count('logs'), log_success=Count('logs', filter=Q(logs__is_success=True)))
+        if 'active_incident' in wanted:
+            queryset = queryset.prefetch_related(Prefetch(
+                'incidents', queryset=Incident.objects.filter(is_resolved=False), to_attr='open_incidents'))
+        return queryset
+
+    def validate(self, attrs):
+        low = attrs.get('adaptive_min_interval', getattr(self.instance, 'adaptive_min_interval', 60))
+        high = attrs.get('adaptive_max_interval', getattr(self.instance, 'adaptive_max_interval', 3600))
+        if low > high:
+            raise serializers.ValidationError({"adaptive_min_interval": "Must not exceed adaptive_max_interval"})
+        return attrs
 
     def get_recent_logs(self, obj):
-        logs = obj.logs.all()[:20]
+        logs = getattr(obj, 'recent_log_list', None)
+        if logs is None:
+            logs = obj.logs.select_related('error')[:20]
         return MonitorLogSerializer(logs, many=True).data
 
     def get_uptime_percentage(self, obj):
         # Last 30 days logic (simplified for now)
-        total = obj.logs.count()
+        if settings.TSDB_ENABLED:
+            total, success = tsdb.uptime(tsdb.scan(obj.id))
+            return round((success / total) * 100, 2) if total else 100
+        total = getattr(obj, 'log_total', None)
+        if total is None:
+            total = obj.logs.count()
         if total == 0:
             return 100
-        success = obj.logs.filter(is_success=True).count()
+        success = getattr(obj, 'log_success', None)
+        if success is None:
+            success = obj.logs.filter(is_success=True).count()
         return round((success / total) * 100, 2)
 
     def get_performance_metrics(self, obj):
         # Calculate P95, P99 from last 100 successful logs
-        latencies = list(obj.logs.filter(is_success=True).values_list('response_time', flat=True)[:100])
+        prefetched = getattr(obj, 'recent_success_list', None)
+        if prefetched is not None:
+            latencies = [log.response_time for log in prefetched]
+        else:
+            latencies = list(obj.logs.filter(is_success=True).values_list('response_time', flat=True)[:100])
         if not latencies:
             return None
         
@@ -61,7 +165,10 @@ class WebsiteSerializer(serializers.ModelSerializer):
         }
 
     def get_active_incident(self, obj):
-        incident = obj.incidents.filter(is_resolved=False).first()
+        if hasattr(obj, 'open_incidents'):
+            incident = obj.open_incidents[0] if obj.open_incidents else None
+        else:
+            incident = obj.incidents.filter(is_resolved=False).first()
         if incident:
             return IncidentSerializer(incident).data
         return None
@@ -0,0 +1,46 @@
+from django.db.models.signals import post_init, post_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from .access import invalidate_access
+from .models import SystemConfig, Website
+from .utils import reset_redis
+
+
+@receiver(post_init, sender=Website)
+def remember_owner(sender, instance, **kwargs):
+    # Read from __dict__ so deferred-field querysets don't trigger a fetch
+    instance._loaded_owner_id = instance.__dict__.get('owner_id')
+
+
+@receiver(post_save, sender=Website)
+def website_saved(sender, instance, created, **kwargs):
+    # Probe state saves fire this constantly, so only react to ownership changes
+    loaded_owner_id = getattr(instance, '_loaded_owner_id', None)
+    if created or instance.__dict__.get('owner_id', loaded_owner_id) != loaded_owner_id:
+        invalidate_access([instance.owner_id, loaded_owner_id])
+        instance._loaded_owner_id = instance.owner_id
+
+
+@receiver(pre_delete, sender=Website)
+def website_deleted(sender, instance, **kwargs):
+    user_ids = list(instance.authorized_users.values_list('id', flat=True))
+    invalidate_access(user_ids + [instance.owner_id])
+
+
+@receiver(m2m_changed, sender=Website.authorized_users.through)
+def authorized_users_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # user.accessible_websites.set(...) from UserSerializer
+        invalidate_access([instance.pk])
+    elif action == 'pre_clear':
+        invalidate_access(instance.authorized_users.values_list('id', flat=True))
+    else:
+        invalidate_access(pk_set or [])
+
+
+@receiver(post_save, sender=SystemConfig)
+def system_config_saved(sender, instance, **kwargs):
+    # custom_redis_url may have changed; other processes notice within utils.CONFIG_TTL
+    reset_redis()
@@ -0,0 +1,22 @@
+from django.conf import settings
+
+
+def pragmas():
+    return [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        # Durable at checkpoints; with WAL a crash can only lose the last commits, not corrupt
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def configure_connection(sender, connection, **kwargs):
+    """connection_created receiver applying the SQLite profile (SQLITE_TUNING)."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in pragmas():
+            cursor.execute(statement)
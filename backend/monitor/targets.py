@@ -0,0 +1,94 @@
+"""
+Shared probing.
+
+Websites with the same probe type, mode and normalized URL are one probe
+target: a result one of them got is reused by the others for up to
+PROBE_SHARE_MAX_AGE seconds (and never more than half the reader's
+current interval), and each records it with its own thresholds and alerts.
+"""
+import hashlib
+import json
+import logging
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from django.conf import settings
+
+from .probing import probe
+from .budgets import probe_budget
+from .utils import get_redis
+
+logger = logging.getLogger(__name__)
+
+SHARE_KEY = 'probe_share:{}'
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """Lower-case scheme and host, drop default ports and fragments, '/' for an empty path."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if parts.username:
+        # Credentials change the request, keep them in the key
+        host = f"{parts.username}:{parts.password or ''}@{host}"
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+
+def target_key(website):
+    """Websites with the same key would send the same probe, so one result serves them all."""
+    raw = f"{website.probe_type}|{website.probe_mode}|{normalize_url(website.url)}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def group_by_target(websites):
+    groups = {}
+    for website in websites:
+        groups.setdefault(target_key(website), []).append(website)
+    return list(groups.values())
+
+
+def _max_age(website):
+    # Fast failure polling must not be answered with a result older than half its interval
+    return min(settings.PROBE_SHARE_MAX_AGE, website.effective_interval() / 2)
+
+
+def _budgeted_probe(website, session):
+    with probe_budget(website):
+        return probe(website, session)
+
+
+def shared_probe(website, session=None, reuse=True):
+    """
+    Probe `website`, or reuse a result another website with the same target
+    got within PROBE_SHARE_MAX_AGE seconds. A website never gets its own
+    result back, and `reuse=False` (manual checks) always probes, though the
+    fresh result is still shared. Falls back to probing directly if Redis is
+    unavailable. Real probes run within the probe budgets and raise
+    ProbeDeferred when over them; reused results are free.
+    """
+    max_age = _max_age(website)
+    if max_age <= 0:
+        return _budgeted_probe(website, session)
+
+    key = SHARE_KEY.format(target_key(website))
+    try:
+        r = get_redis()
+        cached = r.get(key)
+    except Exception as e:
+        logger.debug(f"Probe share cache unavailable: {e}")
+        return _budgeted_probe(website, session)
+
+    if cached and reuse:
+        entry = json.loads(cached)
+        if entry.get('website_id') != website.id and time.time() - entry['at'] <= max_age:
+            return entry['result']
+
+    result = _budgeted_probe(website, session)
+    try:
+        r.set(key, json.dumps({"at": time.time(), "website_id": website.id, "result": result}), ex=max(1, int(settings.PROBE_SHARE_MAX_AGE)))
+    except Exception as e:
+        logger.debug(f"Failed to share probe result: {e}")
+    return result
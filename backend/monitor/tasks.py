@@ -1,11 +1,25 @@
-import requests
+import math
+import random
 import time
+from functools import partial
 from celery import shared_task
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
 from .models import Website, MonitorLog, Incident, SystemConfig, SystemSnapshot
-from datetime import timedelta
+from .alerts import queue_alert, flush_digest, format_alert, deliver
+from .targets import shared_probe, group_by_target
+from .funnel import submit_result
+from .anomaly import observe_latency
+from .budgets import ProbeDeferred, record_deferral
+from .errors import intern_error, count_error
+from . import tsdb
+from .routing import shard_for_website
+from .triggers import clear_pending, mark_pending
+from .utils import get_redis
+from . import backpressure
+from datetime import datetime, timedelta, timezone as dt_timezone
 import os
 import psutil
 import json
@@ -40,8 +54,11 @@ def take_system_snapshot(title, reason, website_id=None, incident_id=None, respo
     except Exception as e:
         print(f"Failed to capture system snapshot: {e}")
 
+WEBSITE_STATE_FIELDS = ['current_status', 'last_check_time', 'next_check_at', 'consecutive_failures', 'consecutive_successes', 'current_interval',
+                        'latency_mean', 'latency_var', 'latency_samples', 'latency_anomalies', 'probe_cache', 'cert_expires_at', 'updated_at']
+
 @shared_task
-def check_website(website_id):
+def check_website(website_id, deferrals=0, dispatched_at=None, manual=False):
     try:
         website = Website.objects.get(id=website_id)
     except Website.DoesNotExist:
@@ -49,56 +66,131 @@ def check_website(website_id):
         return
 
     logger.info(f"Starting check for {website.name} ({website.url})")
+    clear_pending(website.id)
+    if dispatched_at:
+        backpressure.record_lag(website.id, dispatched_at)
 
-    start_time = time.time()
-    ttfb = None
-    payload_size = 0
-    
     try:
-        # Use stream=True to measure TTFB
-        with requests.get(website.url, timeout=15, stream=True) as response:
-            # TTFB is the time when headers are received
-            ttfb = time.time() - start_time
-            
-            # Read the content to get payload size
-            content = response.content
-            payload_size = len(content)
-            
-            response_time = time.time() - start_time
-            status_code = response.status_code
-            is_success = 200 <= status_code < 400
-            error_message = None if is_success else f"HTTP {status_code}"
-    except requests.exceptions.RequestException as e:
-        response_time = time.time() - start_time
-        status_code = None
-        is_success = False
-        error_message = str(e)
-
-    # Log the result
-    MonitorLog.objects.create(
+        # A manual check must really probe, not replay a result from seconds ago
+        result = shared_probe(website, reuse=not manual)
+    except ProbeDeferred as e:
+        defer_check([website], e, deferrals, manual)
+        return
+    if settings.RESULT_FUNNEL and submit_result(website.id, result):
+        return
+    record_result(website, result)
+    schedule_failure_poll(website, result)
+
+@shared_task
+def check_target(website_ids, deferrals=0, dispatched_at=None):
+    """
+    Check websites that share one probe target (same normalized URL and
+    probe mode) with a single request, then record the result for each of
+    them with their own thresholds, state and alerts.
+    """
+    websites = list(Website.objects.filter(id__in=website_ids))
+    if not websites:
+        return
+    for website in websites:
+        clear_pending(website.id)
+    if dispatched_at:
+        backpressure.record_lag(websites[0].id, dispatched_at)
+
+    leader = websites[0]
+    logger.info(f"Starting shared check for {leader.url} ({len(websites)} websites)")
+    try:
+        result = shared_probe(leader)
+    except ProbeDeferred as e:
+        defer_check(websites, e, deferrals)
+        return
+    for website in websites:
+        if settings.RESULT_FUNNEL and submit_result(website.id, result):
+            continue
+        try:
+            record_result(website, result)
+        except Exception as e:
+            logger.exception(f"Failed to record shared result for website {website.id}: {e}")
+            continue
+        schedule_failure_poll(website, result)
+
+def defer_check(websites, deferred, deferrals, manual=False):
+    """
+    Retry a check that was over a probe budget once the budget allows, or
+    after PROBE_MAX_DEFERRALS retries leave it to the next dispatch.
+    """
+    if deferrals >= settings.PROBE_MAX_DEFERRALS:
+        record_deferral(websites, deferred, 'skipped')
+        return
+    record_deferral(websites, deferred, 'delayed')
+    # Jitter so deferred checks of one host do not all come back at once
+    countdown = deferred.retry_after * random.uniform(1, 1.5)
+    backpressure.mark_queued([w.id for w in websites], countdown)
+    if len(websites) == 1:
+        check_website.apply_async(args=[websites[0].id], kwargs={"deferrals": deferrals + 1, "manual": manual},
+                                  countdown=countdown)
+    else:
+        check_target.apply_async(args=[[w.id for w in websites]], kwargs={"deferrals": deferrals + 1}, countdown=countdown)
+
+def schedule_failure_poll(website, result):
+    # Dynamic Polling: If failing, check again in failure_poll_interval seconds
+    if not result['is_success'] or website.current_status == 'down':
+        if shard_for_website(website.id) in settings.PROBER_DAEMON_SHARDS:
+            # The run_prober daemon owns fast polling for this shard
+            return
+        logger.info(f"Website {website.name} is DOWN or failing. Scheduling next check in {website.failure_poll_interval}s")
+        # Schedule next check in failure_poll_interval seconds
+        backpressure.mark_queued([website.id], website.failure_poll_interval)
+        check_website.apply_async(args=[website.id], countdown=website.failure_poll_interval)
+
+def record_result(website, result, checked_at=None):
+    """
+    Persist one probe result for `website`: write the MonitorLog, take
+    snapshots, open/resolve incidents, send alerts and update the state
+    columns. Shared by the Celery task, the run_prober daemon and the result
+    writer, which passes the probe's `checked_at` time (default: now).
+    Snapshots and alerts wait for the caller's transaction to commit.
+    """
+    now = checked_at or timezone.now()
+    is_success = result['is_success']
+    response_time = result['response_time']
+    error_message = result['error_message']
+
+    # Log the result; failures reference their interned error instead of repeating the text
+    error = intern_error(error_message, website.url) if error_message else None
+    log = MonitorLog.objects.create(
         website=website,
-        status_code=status_code,
+        timestamp=now,
+        status_code=result['status_code'],
         response_time=response_time,
-        ttfb=ttfb,
-        payload_size=payload_size,
+        ttfb=result['ttfb'],
+        payload_size=result['payload_size'],
         is_success=is_success,
-        error_message=error_message
+        error=error,
     )
+    if error is not None:
+        count_error(website.id, error.id, log.timestamp)
+    if settings.TSDB_ENABLED:
+        transaction.on_commit(lambda: tsdb.record(website.id, log.timestamp, result))
 
-    # Trigger latency snapshot if extremely high (e.g. > 5s) and successful
-    if is_success and response_time and response_time > 5.0:
-        # Debounce logic: rely on the snapshot timestamps or just take it sparsely
-        # For simplicity, just fire the task
-        take_system_snapshot(
+    # Latency anomaly relative to this site's own baseline
+    anomaly_z = observe_latency(website, result)
+    latency_spike = anomaly_z is not None
+    if latency_spike and website.latency_anomalies == 1:
+        # Snapshot the start of a slow streak, not every slow check in it
+        transaction.on_commit(partial(
+            take_system_snapshot,
             title=f"High Latency Spike: {website.name}",
-            reason=f"Response time spiked to {response_time:.2f}s",
+            reason=f"Response time {response_time:.2f}s vs. baseline {math.exp(website.latency_mean):.2f}s (z={anomaly_z:.1f})",
             website_id=website.id,
             response_time=response_time
-        )
+        ))
+    if latency_spike and website.latency_anomalies == settings.LATENCY_ALERT_AFTER:
+        transaction.on_commit(partial(
+            send_alert, website, "LATENCY DEGRADED", f"{website.latency_anomalies} consecutive checks well above the usual "
+            f"{math.exp(website.latency_mean) * 1000:.0f}ms. Latest: {response_time * 1000:.0f}ms."))
 
     # State update logic
     prev_status = website.current_status
-    now = timezone.now()
     
     if is_success:
         website.consecutive_failures = 0
@@ -117,7 +209,8 @@ def check_website(website_id):
                 active_incident.save()
                 
                 # Big Signal: Recovery Alert
-                send_alert(website, "RECOVERED", f"Service is back online after {int(duration/60)} minutes.")
+                transaction.on_commit(partial(
+                    send_alert, website, "RECOVERED", f"Service is back online after {int(duration/60)} minutes."))
     else:
         website.consecutive_successes = 0
         website.consecutive_failures += 1
@@ -127,72 +220,105 @@ def check_website(website_id):
             # Small Signal/Warning: First few failures
             if website.consecutive_failures == 1:
                 website.current_status = 'down' # Mark as down immediately to trigger fast polling
-                inc = Incident.objects.create(website=website, reason=error_message)
+                # The full message lives on the signature; the reason is just its class
+                inc = Incident.objects.create(website=website, start_time=now, error=error,
+                                              reason=error.error_class if error else '')
                 
                 # Crashlytics Snapshot
-                take_system_snapshot(
+                transaction.on_commit(partial(
+                    take_system_snapshot,
                     title=f"Service Failure: {website.name}",
                     reason=f"Service dropped offline. Error: {error_message}",
                     website_id=website.id,
                     incident_id=inc.id
-                )
+                ))
             
             # Big Signal: Escalation after threshold
             if website.consecutive_failures == website.alert_threshold:
-                send_alert(website, "CRITICAL FAILURE", f"Service has failed {website.alert_threshold} consecutive times. Error: {error_message}")
+                transaction.on_commit(partial(
+                    send_alert, website, "CRITICAL FAILURE", f"Service has failed {website.alert_threshold} consecutive times. Error: {error_message}",
+                    error_message=error_message))
 
+    website.adapt_interval(is_success, anomaly=latency_spike)
+    if result.get('probe_cache') is not None:
+        website.probe_cache = result['probe_cache']
+    if result.get('cert_expires_at'):
+        website.cert_expires_at = datetime.fromtimestamp(result['cert_expires_at'], tz=dt_timezone.utc)
     website.last_check_time = now
-    website.save()
-
-    # Dynamic Polling: If failing, check again in failure_poll_interval seconds
-    if not is_success or website.current_status == 'down':
-        logger.info(f"Website {website.name} is DOWN or failing. Scheduling next check in {website.failure_poll_interval}s")
-        # Schedule next check in failure_poll_interval seconds
-        check_website.apply_async(args=[website.id], countdown=website.failure_poll_interval)
+    website.next_check_at = None
+    # Only write state columns so concurrent edits to the configuration survive
+    website.save(update_fields=WEBSITE_STATE_FIELDS)
+    return website
 
-def send_alert(website, level, message):
-    subject = f"[{level}] Uptime Pulse: {website.name}"
-    full_message = f"Alert for {website.name} ({website.url})\n\nLevel: {level}\nTime: {timezone.now()}\n\nMessage: {message}"
+def send_alert(website, level, message, error_message=None):
+    subject, full_message = format_alert(website.name, website.url, level, message)
     
     print(f"ALERTER: {subject} - {message}") # Always log to console
     
     if website.alert_email:
-        try:
-            send_mail(
-                subject,
-                full_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [website.alert_email],
-                fail_silently=True,
-            )
-        except Exception as e:
-            print(f"FAILED TO SEND EMAIL: {e}")
+        # Correlated outages are grouped into one digest per recipient
+        if queue_alert(website, level, message, error_message=error_message):
+            return
+        deliver(subject, full_message, website.alert_email)
+
+@shared_task
+def flush_alert_digest(recipient):
+    try:
+        flush_digest(recipient)
+    except Exception as e:
+        print(f"Failed to flush alert digest for {recipient}: {e}")
 
 @shared_task
 def dispatch_all_checks():
     now = timezone.now()
     websites = Website.objects.filter(is_active=True)
+    # Shards handled by `manage.py run_prober` are not dispatched through Celery
+    daemon_shards = set(settings.PROBER_DAEMON_SHARDS)
     
+    due = []
     for website in websites:
         is_due = False
         
-        if not website.last_check_time:
+        if website.next_check_at:
+            # Explicitly scheduled (e.g. staggered first check after a bulk import)
+            is_due = now >= website.next_check_at
+        elif not website.last_check_time:
             is_due = True
         else:
             elapsed = (now - website.last_check_time).total_seconds()
-            
-            # If status is down, use failure_poll_interval (seconds)
-            if website.current_status == 'down':
-                if elapsed >= website.failure_poll_interval:
-                    is_due = True
-            # If status is up or pending, use check_interval (minutes)
-            else:
-                if elapsed >= (website.check_interval * 60):
-                    is_due = True
+            # failure_poll_interval when down, otherwise check_interval or the adaptive interval
+            if elapsed >= website.effective_interval():
+                is_due = True
         
         if is_due:
-            logger.info(f"Dispatching check for {website.name} (Status: {website.current_status})")
-            check_website.delay(website.id)
+            if shard_for_website(website.id) in daemon_shards:
+                continue
+            due.append(website)
+
+    # Skip sites that still have a check queued and, when a shard's queue or
+    # probe lag is over its limit, dispatch only its most urgent sites
+    try:
+        r = get_redis()
+        due, state = backpressure.plan(r, due, now)
+        report = backpressure.save_state(r, state)
+        if report['shedding']:
+            logger.warning(f"Dispatcher shedding load: {json.dumps(state)}")
+        dispatched_at = time.time()
+        queued = set(mark_pending(r, [website.id for website in due], settings.DISPATCH_PENDING_TTL))
+        due = [website for website in due if website.id in queued]
+    except redis.RedisError as e:
+        # Without Redis there is nothing to measure; dispatch everything as before
+        logger.warning(f"Dispatching without backpressure: {e}")
+        dispatched_at = time.time()
+
+    # Websites pointing at the same URL with the same probe mode share one request
+    for group in group_by_target(due):
+        if len(group) == 1:
+            logger.info(f"Dispatching check for {group[0].name} (Status: {group[0].current_status})")
+            check_website.apply_async(args=[group[0].id], kwargs={"dispatched_at": dispatched_at})
+        else:
+            logger.info(f"Dispatching shared check for {group[0].url} ({len(group)} websites)")
+            check_target.apply_async(args=[[website.id for website in group]], kwargs={"dispatched_at": dispatched_at})
 
 @shared_task
 def check_system_health():
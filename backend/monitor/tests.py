@@ -1,3 +1,610 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+import numpy as np
+import redis
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.utils import ConnectionDoesNotExist
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import backpressure, tsdb
+from .access import accessible_website_ids, visible_websites
+from .budgets import DEFERRAL_COUNTS_KEY, ProbeDeferred, probe_budget
+from .funnel import PROCESSING_KEY, RESULTS_KEY, drain, submit_result
+from .bulk import import_websites
+from .models import Incident, MonitorLog, Website
+from .replicas import _read_from_replica
+from .targets import group_by_target, shared_probe, target_key
+from .tasks import check_website, defer_check
+from .triggers import PENDING_KEY, clear_pending, job_status, trigger_checks
+from .utils import reset_redis
+
+
+def make_records(n, seed=0, start_ms=1_700_000_000_000):
+    """Irregular timestamps, noisy latencies, NaN ttfb, missing status codes and failures."""
+    rng = np.random.default_rng(seed)
+    records = np.empty(n, dtype=tsdb.RECORD)
+    records['t'] = start_ms + np.cumsum(rng.integers(1, 120_000, size=n))
+    records['response_time'] = rng.lognormal(-1.5, 0.5, size=n)
+    records['ttfb'] = np.where(rng.random(n) < 0.2, np.nan, records['response_time'] * 0.6)
+    records['status_code'] = rng.choice([200, 200, 200, 503, -1], size=n)
+    records['payload_size'] = rng.choice([18_432, 0, -1], size=n)
+    records['is_success'] = records['status_code'] == 200
+    return records
+
+
+def assert_same(test, a, b):
+    # Byte comparison so NaN == NaN and -0.0 != 0.0
+    test.assertEqual(len(a), len(b))
+    test.assertEqual(np.ascontiguousarray(a).tobytes(), np.ascontiguousarray(b).tobytes())
+
+
+class FakeRedisMixin:
+    """Point every Redis client the app creates at one in-memory fake."""
+
+    def setUp(self):
+        super().setUp()
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch('redis.from_url', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        reset_redis()
+        self.addCleanup(reset_redis)
+
+
+class TsdbTestCase(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.settings = override_settings(TSDB_DIR=self.dir, TSDB_BLOCK_SAMPLES=64)
+        self.settings.enable()
+        tsdb.read_block.cache_clear()
+
+    def tearDown(self):
+        self.settings.disable()
+        tsdb.read_block.cache_clear()
+        shutil.rmtree(self.dir)
+
+    def write_block(self, records, name='block.blk'):
+        path = os.path.join(self.dir, name)
+        with open(path, 'wb') as f:
+            f.write(tsdb.encode_block(records))
+        return path
+
+    def test_block_round_trip(self):
+        records = make_records(1000)
+        assert_same(self, tsdb.read_block(self.write_block(records)), records)
+
+    def test_block_round_trip_extremes(self):
+        # Large delta-of-deltas in both directions and a single-sample block
+        records = make_records(5)
+        records['t'] = [0, 1, 2 ** 40, 2 ** 40 + 1, 2 ** 41]
+        records['response_time'] = [0.0, -0.0, np.inf, 1e-300, np.nan]
+        assert_same(self, tsdb.read_block(self.write_block(records)), records)
+        assert_same(self, tsdb.read_block(self.write_block(records[:1], 'one.blk')), records[:1])
+
+    def test_nan_ttfb_becomes_none(self):
+        records = make_records(3)
+        records['ttfb'] = [np.nan, 0.25, np.nan]
+        logs = tsdb.as_logs(tsdb.read_block(self.write_block(records)))
+        self.assertEqual([log['ttfb'] for log in logs], [None, 0.25, None])
+
+    def test_append_seals_and_scans_in_order(self):
+        records = make_records(200, seed=1)
+        shuffled = records[np.random.default_rng(2).permutation(len(records))]
+        for chunk in np.array_split(shuffled, 7):
+            tsdb.append(1, chunk)
+
+        usage = tsdb.usage(1)
+        self.assertGreater(usage['blocks'], 0)
+        self.assertEqual(usage['sealed_samples'] + usage['head_samples'], 200)
+        assert_same(self, tsdb.scan(1), records)
+
+        start = datetime.fromtimestamp(records['t'][50] / 1000, tz=dt_timezone.utc)
+        end = datetime.fromtimestamp(records['t'][150] / 1000, tz=dt_timezone.utc)
+        assert_same(self, tsdb.scan(1, start, end), records[50:150])
+
+    def test_interrupted_seal_recovers(self):
+        records = make_records(150, seed=3)
+        directory = tsdb.series_dir(1)
+        os.makedirs(directory)
+        # Crashed after renaming the head and writing only the first of its blocks
+        with open(os.path.join(directory, tsdb.SEALING), 'wb') as f:
+            f.write(records[:130].tobytes())
+        first = records[:64]
+        with open(os.path.join(directory, tsdb._block_name(first)), 'wb') as f:
+            f.write(tsdb.encode_block(first))
+        # New samples arrived in a fresh head meanwhile
+        with open(os.path.join(directory, tsdb.HEAD), 'wb') as f:
+            f.write(records[130:].tobytes())
+
+        assert_same(self, tsdb.scan(1), records)
+
+        tsdb.seal(1)
+        self.assertFalse(os.path.exists(os.path.join(directory, tsdb.SEALING)))
+        usage = tsdb.usage(1)
+        self.assertEqual((usage['sealed_samples'], usage['head_samples']), (150, 0))
+        assert_same(self, tsdb.scan(1), records)
+
+    def test_block_names_differ_by_content(self):
+        records = make_records(10, seed=4)
+        other = records.copy()
+        other['response_time'][5] += 1
+        self.assertNotEqual(tsdb._block_name(records), tsdb._block_name(other))
+
+    def test_uptime_counts_every_sample(self):
+        records = make_records(300, seed=5)
+        self.assertEqual(tsdb.uptime(records), (300, int(records['is_success'].sum())))
+        self.assertEqual(tsdb.uptime(records[:0]), (0, 0))
+
+
+class AccessTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user('member')
+        self.other = User.objects.create_user('other')
+        self.owned = Website.objects.create(owner=self.user, name='owned', url='https://owned.example')
+        self.shared = Website.objects.create(owner=self.other, name='shared', url='https://shared.example')
+        self.hidden = Website.objects.create(owner=self.other, name='hidden', url='https://hidden.example')
+        self.shared.authorized_users.add(self.user)
+
+    def test_owned_and_granted_only(self):
+        self.assertEqual(accessible_website_ids(self.user), sorted([self.owned.id, self.shared.id]))
+        self.assertEqual(set(visible_websites(self.user)), {self.owned, self.shared})
+
+    def test_master_sees_everything(self):
+        self.user.is_master = True
+        self.assertEqual(visible_websites(self.user).count(), 3)
+
+    def test_revoked_grant_takes_effect_at_once(self):
+        accessible_website_ids(self.user)
+        self.shared.authorized_users.remove(self.user)
+        self.assertEqual(accessible_website_ids(self.user), [self.owned.id])
+
+    def test_cleared_grants_take_effect_at_once(self):
+        accessible_website_ids(self.user)
+        self.shared.authorized_users.clear()
+        self.assertEqual(accessible_website_ids(self.user), [self.owned.id])
+
+    def test_ownership_transfer_updates_both_users(self):
+        accessible_website_ids(self.user)
+        accessible_website_ids(self.other)
+        self.owned.owner = self.other
+        self.owned.save()
+        self.assertEqual(accessible_website_ids(self.user), [self.shared.id])
+        self.assertIn(self.owned.id, accessible_website_ids(self.other))
+
+    def test_deleted_website_drops_out(self):
+        accessible_website_ids(self.user)
+        self.shared.delete()
+        self.assertEqual(accessible_website_ids(self.user), [self.owned.id])
+
+    @override_settings(DATABASE_ROUTERS=['monitor.replicas.ReplicaRouter'], REPLICA_DATABASES=['missing'])
+    def test_computed_on_primary_during_replica_reads(self):
+        token = _read_from_replica.set(True)
+        try:
+            with self.assertRaises(ConnectionDoesNotExist):
+                list(Website.objects.all())
+            self.assertEqual(accessible_website_ids(self.user), sorted([self.owned.id, self.shared.id]))
+        finally:
+            _read_from_replica.reset(token)
+
+
+class BulkImportTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user('importer')
+        self.other = User.objects.create_user('other')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_creates_with_staggered_first_checks(self):
+        rows = [{"name": f"site {i}", "url": f"https://{i}.example", "check_interval": 10} for i in range(4)]
+        ok, results = import_websites(rows, self.user, visible_websites(self.user))
+        self.assertTrue(ok)
+        self.assertEqual([r['status'] for r in results], ['created'] * 4)
+        first_checks = list(Website.objects.filter(owner=self.user).order_by('name').values_list('next_check_at', flat=True))
+        gaps = {(b - a).total_seconds() for a, b in zip(first_checks, first_checks[1:])}
+        self.assertEqual(gaps, {150.0})
+
+    def test_one_bad_row_writes_nothing(self):
+        rows = [{"name": "good", "url": "https://good.example"}, {"name": "bad", "url": "not a url"}, "row"]
+        ok, results = import_websites(rows, self.user, visible_websites(self.user))
+        self.assertFalse(ok)
+        self.assertEqual([r['status'] for r in results], ['skipped', 'error', 'error'])
+        self.assertIn('url', results[1]['errors'])
+        self.assertFalse(Website.objects.exists())
+
+    def test_updates_only_visible_websites(self):
+        mine = Website.objects.create(owner=self.user, name='mine', url='https://mine.example')
+        theirs = Website.objects.create(owner=self.other, name='theirs', url='https://theirs.example')
+        ok, results = import_websites([{"id": mine.id, "name": "renamed"}, {"id": theirs.id, "name": "taken"}],
+                                      self.user, visible_websites(self.user))
+        self.assertFalse(ok)
+        self.assertEqual(results[1]['errors'], {"id": ["Website not found"]})
+        ok, results = import_websites([{"id": mine.id, "name": "renamed"}], self.user, visible_websites(self.user))
+        self.assertTrue(ok)
+        mine.refresh_from_db()
+        self.assertEqual((results[0]['status'], mine.name), ('updated', 'renamed'))
+
+    def test_csv_upload(self):
+        upload = SimpleUploadedFile('sites.csv', b'\xef\xbb\xbfname,url\nfrom csv,https://csv.example\n')
+        response = self.client.post('/api/websites/bulk/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Website.objects.filter(owner=self.user, name='from csv').exists())
+
+    def test_unreadable_csv_is_rejected(self):
+        for body in (b'name,url\n\xff\xfe,x\n', b'name,url\n' + b'x' * 200_000 + b',x\n'):
+            upload = SimpleUploadedFile('sites.csv', body)
+            response = self.client.post('/api/websites/bulk/', {'file': upload}, format='multipart')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Website.objects.exists())
+
+    def test_row_limit(self):
+        rows = [{"name": str(i), "url": f"https://{i}.example"} for i in range(3)]
+        with override_settings(BULK_IMPORT_MAX_ROWS=2):
+            response = self.client.post('/api/websites/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Website.objects.exists())
+
+
+@override_settings(TRIGGER_BATCH_SIZE=2, TRIGGER_BATCH_INTERVAL=3.0, TRIGGER_RECENT_SECONDS=10)
+class TriggerTestCase(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user('trigger')
+        self.websites = [Website.objects.create(owner=self.user, name=str(i), url=f"https://{i}.example") for i in range(3)]
+        patcher = mock.patch.object(check_website, 'apply_async')
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def trigger(self):
+        return trigger_checks(Website.objects.filter(owner=self.user), self.user)
+
+    def test_batches_are_spaced_out(self):
+        job = self.trigger()
+        self.assertEqual(sorted(job['queued']), [w.id for w in self.websites])
+        countdowns = sorted(call.kwargs['countdown'] for call in self.apply_async.call_args_list)
+        self.assertEqual(countdowns, [0.0, 0.0, 3.0])
+        self.assertTrue(all(call.kwargs['kwargs'] == {"manual": True} for call in self.apply_async.call_args_list))
+
+    def test_queued_checks_are_coalesced(self):
+        self.trigger()
+        job = self.trigger()
+        self.assertEqual((job['queued'], len(job['coalesced'])), ([], 3))
+        self.assertEqual(self.apply_async.call_count, 3)
+
+    def test_started_check_can_be_triggered_again(self):
+        self.trigger()
+        clear_pending(self.websites[0].id)
+        self.assertEqual(self.trigger()['queued'], [self.websites[0].id])
+
+    def test_recently_checked_are_skipped(self):
+        Website.objects.filter(id=self.websites[0].id).update(last_check_time=timezone.now())
+        job = self.trigger()
+        self.assertEqual(job['recent'], [self.websites[0].id])
+        self.assertNotIn(self.websites[0].id, job['queued'])
+
+    def test_job_status(self):
+        job = self.trigger()
+        self.assertIsNone(job_status(job['id'], get_user_model().objects.create_user('stranger')))
+        Website.objects.filter(id=self.websites[0].id).update(last_check_time=timezone.now() + timedelta(seconds=1))
+        status = job_status(job['id'], self.user)
+        self.assertEqual((status['completed'], status['pending'], status['finished']), (1, 2, False))
+
+    def test_falls_back_to_direct_dispatch_when_redis_is_down(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        website = self.websites[0]
+        # The throttle's cache is down too and must not turn this into a 500
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                                   'LOCATION': 'redis://127.0.0.1:1/0'}}), \
+                mock.patch('monitor.views.trigger_checks', side_effect=redis.ConnectionError), \
+                mock.patch.object(check_website, 'delay') as delay, \
+                self.assertLogs('monitor', 'WARNING') as logs:
+            response = client.post(f'/api/websites/{website.id}/trigger_check/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('Throttle cache unavailable' in line for line in logs.output))
+        delay.assert_called_once_with(website.id, manual=True)
+
+
+@override_settings(PROBE_BUDGETS=True, PROBE_MAX_IN_FLIGHT=0, PROBE_HOST_MAX_IN_FLIGHT=0, PROBE_HOST_RATE=0,
+                   PROBE_HOST_BURST=2, PROBE_LEASE_SECONDS=60, PROBE_DEFER_SECONDS=5.0, PROBE_MAX_DEFERRALS=2)
+class BudgetTestCase(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.a = SimpleNamespace(id=1, url='https://a.example/one')
+        self.a2 = SimpleNamespace(id=2, url='https://A.example/two')
+        self.b = SimpleNamespace(id=3, url='https://b.example/')
+        self.now = 1_700_000_000.0
+        patcher = mock.patch('monitor.budgets.time')
+        patcher.start().time.side_effect = lambda: self.now
+        self.addCleanup(patcher.stop)
+
+    def assertDeferred(self, website, reason):
+        with self.assertRaises(ProbeDeferred) as raised:
+            with probe_budget(website):
+                pass
+        self.assertEqual(raised.exception.reason, reason)
+        self.assertGreaterEqual(raised.exception.retry_after, 5.0)
+
+    @override_settings(PROBE_HOST_MAX_IN_FLIGHT=1)
+    def test_host_concurrency(self):
+        with probe_budget(self.a):
+            self.assertDeferred(self.a2, 'host_concurrency')
+            with probe_budget(self.b):
+                pass
+        with probe_budget(self.a2):
+            pass
+
+    @override_settings(PROBE_MAX_IN_FLIGHT=1)
+    def test_global_concurrency(self):
+        with probe_budget(self.a):
+            self.assertDeferred(self.b, 'global_concurrency')
+
+    @override_settings(PROBE_HOST_RATE=0.5)
+    def test_host_rate(self):
+        for _ in range(2):
+            with probe_budget(self.a):
+                pass
+        self.assertDeferred(self.a, 'host_rate')
+        with probe_budget(self.b):
+            pass
+        self.now += 2
+        with probe_budget(self.a):
+            pass
+
+    @override_settings(PROBE_HOST_MAX_IN_FLIGHT=1)
+    def test_lease_of_a_dead_worker_expires(self):
+        with probe_budget(self.a):
+            self.now += 61
+            with probe_budget(self.a2):
+                pass
+
+    @override_settings(PROBE_HOST_MAX_IN_FLIGHT=1)
+    def test_disabled_or_unavailable_budgets_do_not_block(self):
+        with probe_budget(self.a):
+            with override_settings(PROBE_BUDGETS=False), probe_budget(self.a2):
+                pass
+            with mock.patch('monitor.budgets.get_redis', side_effect=redis.ConnectionError), probe_budget(self.a2):
+                pass
+
+    def test_deferred_check_is_retried_then_skipped(self):
+        deferred = ProbeDeferred('host_rate', 5.0)
+        with mock.patch.object(check_website, 'apply_async') as apply_async:
+            defer_check([self.a], deferred, deferrals=0, manual=True)
+            defer_check([self.a], deferred, deferrals=2)
+        apply_async.assert_called_once()
+        self.assertEqual(apply_async.call_args.kwargs['kwargs'], {"deferrals": 1, "manual": True})
+        self.assertGreaterEqual(apply_async.call_args.kwargs['countdown'], 5.0)
+        self.assertEqual(self.redis.hgetall(DEFERRAL_COUNTS_KEY), {b'delayed:host_rate': b'1', b'skipped:host_rate': b'1'})
+
+
+def due_website(id, now, status='up', failures=0, anomalies=0, idle=None, interval=60):
+    return SimpleNamespace(
+        id=id, current_status=status, consecutive_failures=failures, latency_anomalies=anomalies,
+        last_check_time=now - timedelta(seconds=idle) if idle is not None else None,
+        effective_interval=lambda: interval,
+    )
+
+
+@override_settings(PROBE_SHARDS=['probes-0'], DISPATCH_MAX_QUEUE_DEPTH=10, DISPATCH_MAX_LAG_SECONDS=30.0,
+                   DISPATCH_LAG_WINDOW=300, DISPATCH_MIN_BATCH=2)
+class BackpressureTestCase(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.due = [
+            due_website(1, self.now, idle=120),
+            due_website(2, self.now, idle=600),
+            due_website(3, self.now, failures=1, idle=60),
+            due_website(4, self.now, status='down', idle=10),
+            due_website(5, self.now),
+            due_website(6, self.now, anomalies=2, idle=30),
+        ]
+
+    def plan(self):
+        selected, state = backpressure.plan(self.redis, self.due, self.now)
+        return [w.id for w in selected], state['probes-0']
+
+    def test_everything_goes_out_when_healthy(self):
+        self.redis.rpush('probes-0', *range(9))
+        selected, state = self.plan()
+        self.assertEqual(sorted(selected), [1, 2, 3, 4, 5, 6])
+        self.assertEqual((state['queue_depth'], state['shedding'], state['shed']), (9, False, 0))
+
+    def test_already_queued_sites_are_skipped(self):
+        self.redis.set(PENDING_KEY.format(2), 1)
+        selected, state = self.plan()
+        self.assertNotIn(2, selected)
+        self.assertEqual((state['due'], state['already_queued'], state['dispatched']), (6, 1, 5))
+
+    def lag(self, seconds, samples=5):
+        now = self.now.timestamp()
+        # An old sample outside DISPATCH_LAG_WINDOW must not count
+        self.redis.lpush(backpressure.LAG_KEY.format('probes-0'), f"{now - 1000} 500",
+                         *(f"{now} {seconds}" for _ in range(samples)))
+
+    def test_full_queue_gets_a_minimum_batch(self):
+        self.redis.rpush('probes-0', *range(10))
+        selected, state = self.plan()
+        self.assertEqual(selected, [4, 3])
+        self.assertEqual((state['shedding'], state['shed'], state['shed_down']), (True, 4, 0))
+
+    def test_lagging_shard_refills_to_the_depth_limit_by_priority(self):
+        self.redis.rpush('probes-0', *range(7))
+        self.lag(45)
+        selected, state = self.plan()
+        # Down first, then failing or anomalous (most overdue first), then never checked, then most overdue
+        self.assertEqual(selected, [4, 3, 6])
+        self.assertEqual((state['shedding'], state['samples'], state['lag_p95']), (True, 5, 45.0))
+
+    def test_priority_order(self):
+        self.due.append(due_website(7, self.now, status='down', idle=300))
+        selected, _ = self.plan()
+        self.assertEqual(selected, [7, 4, 3, 6, 5, 2, 1])
+
+    def test_low_lag_does_not_shed(self):
+        self.lag(5)
+        selected, state = self.plan()
+        self.assertEqual((len(selected), state['shedding']), (6, False))
+
+    def test_unreadable_broker_does_not_shed(self):
+        with mock.patch('monitor.backpressure.get_broker', side_effect=redis.ConnectionError), \
+                self.assertLogs('monitor.backpressure', 'WARNING'):
+            selected, state = self.plan()
+        self.assertEqual((len(selected), state['queue_depth'], state['shedding']), (6, None, False))
+
+    def test_state_is_reported(self):
+        self.redis.rpush('probes-0', *range(12))
+        _, state = backpressure.plan(self.redis, self.due, self.now)
+        backpressure.save_state(self.redis, state)
+        report = backpressure.dispatch_state(self.redis)
+        self.assertTrue(report['shedding'])
+        self.assertEqual(report['shards']['probes-0']['dispatched'], 2)
+
+
+@override_settings(PROBE_SHARE_MAX_AGE=30, PROBE_BUDGETS=False)
+class SharedProbeTestCase(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.a = Website(id=1, url='https://example.com/status')
+        self.b = Website(id=2, url='HTTPS://Example.com:443/status#top')
+        self.now = 1_700_000_000.0
+        time_patcher = mock.patch('monitor.targets.time')
+        time_patcher.start().time.side_effect = lambda: self.now
+        self.addCleanup(time_patcher.stop)
+        probe_patcher = mock.patch('monitor.targets.probe', side_effect=lambda website, session: {"probed_by": website.id})
+        self.probe = probe_patcher.start()
+        self.addCleanup(probe_patcher.stop)
+
+    def test_target_key_normalizes_urls(self):
+        self.assertEqual(target_key(self.a), target_key(self.b))
+        self.assertNotEqual(target_key(self.a), target_key(Website(url='https://example.com:8443/status')))
+        self.assertNotEqual(target_key(self.a), target_key(Website(url='https://user:pw@example.com/status')))
+        self.assertNotEqual(target_key(self.a), target_key(Website(url=self.a.url, probe_mode='head')))
+        self.assertEqual(len(group_by_target([self.a, self.b, Website(url='https://other.example/')])), 2)
+
+    def test_other_website_reuses_a_fresh_result(self):
+        self.assertEqual(shared_probe(self.a), {"probed_by": 1})
+        self.now += 29
+        self.assertEqual(shared_probe(self.b), {"probed_by": 1})
+        self.assertEqual(self.probe.call_count, 1)
+
+    def test_website_never_gets_its_own_result_back(self):
+        shared_probe(self.a)
+        self.assertEqual(shared_probe(self.a), {"probed_by": 1})
+        self.assertEqual(self.probe.call_count, 2)
+
+    def test_stale_result_is_not_reused(self):
+        shared_probe(self.a)
+        self.now += 31
+        self.assertEqual(shared_probe(self.b), {"probed_by": 2})
+
+    def test_failure_polling_needs_fresher_results(self):
+        self.b.current_status = 'down'
+        self.b.failure_poll_interval = 10
+        shared_probe(self.a)
+        self.now += 6
+        self.assertEqual(shared_probe(self.b), {"probed_by": 2})
+
+    def test_manual_check_probes_but_still_shares(self):
+        shared_probe(self.a)
+        self.assertEqual(shared_probe(self.b, reuse=False), {"probed_by": 2})
+        self.assertEqual(shared_probe(self.a), {"probed_by": 2})
+        self.assertEqual(self.probe.call_count, 2)
+
+    def test_probes_directly_without_redis(self):
+        with mock.patch('monitor.targets.get_redis', side_effect=redis.ConnectionError):
+            shared_probe(self.a)
+            shared_probe(self.b)
+        self.assertEqual(self.probe.call_count, 2)
+
+
+def probe_result(is_success=True, response_time=0.2):
+    return {
+        "is_success": is_success, "response_time": response_time, "ttfb": response_time / 2,
+        "status_code": 200 if is_success else 503, "payload_size": 1024,
+        "error_message": None if is_success else "HTTP 503",
+    }
+
+
+class FunnelTestCase(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        owner = get_user_model().objects.create_user('funnel')
+        self.website = Website.objects.create(owner=owner, name='funnel', url='https://funnel.example',
+                                              alert_threshold=1)
+        self.start = 1_700_000_000.0
+        self.submitted = 0
+
+    def submit(self, result=None, website_id=None):
+        with mock.patch('monitor.funnel.time.time', return_value=self.start + self.submitted * 60):
+            self.assertTrue(submit_result(website_id or self.website.id, result or probe_result()))
+        self.submitted += 1
+
+    def test_drains_in_batches_at_probe_time(self):
+        for _ in range(5):
+            self.submit()
+        self.assertEqual(drain(self.redis, 2), 2)
+        self.assertEqual((self.redis.llen(RESULTS_KEY), self.redis.llen(PROCESSING_KEY)), (3, 0))
+        self.assertEqual(drain(self.redis, 10), 3)
+        self.assertEqual(drain(self.redis, 10), 0)
+        times = list(MonitorLog.objects.order_by('timestamp').values_list('timestamp', flat=True))
+        self.assertEqual([t.timestamp() for t in times], [self.start + i * 60 for i in range(5)])
+        self.website.refresh_from_db()
+        self.assertEqual(self.website.last_check_time, times[-1])
+
+    def test_bad_result_does_not_sink_the_batch(self):
+        self.submit()
+        self.submit(result={"is_success": True})
+        self.submit(website_id=self.website.id + 1000)
+        self.submit()
+        with self.assertLogs('monitor.funnel', 'ERROR'):
+            self.assertEqual(drain(self.redis, 10), 4)
+        self.assertEqual(MonitorLog.objects.count(), 2)
+
+    def test_batch_left_by_a_crashed_writer_is_replayed_once(self):
+        for _ in range(3):
+            self.submit()
+        # The writer committed the first of a batch of two, then died before deleting the batch
+        first = self.redis.lindex(RESULTS_KEY, 0)
+        drain(self.redis, 1)
+        self.redis.rpush(PROCESSING_KEY, first)
+        self.redis.lmove(RESULTS_KEY, PROCESSING_KEY, 'LEFT', 'RIGHT')
+        self.assertEqual(MonitorLog.objects.count(), 1)
+        self.assertEqual(drain(self.redis, 10), 2)
+        self.assertEqual(drain(self.redis, 10), 1)
+        self.assertEqual(MonitorLog.objects.count(), 3)
+
+    def test_alerts_wait_for_the_batch_to_commit(self):
+        self.submit(probe_result(is_success=False))
+        with mock.patch('monitor.tasks.send_alert') as send_alert, \
+                mock.patch('monitor.tasks.take_system_snapshot') as snapshot, \
+                mock.patch.object(check_website, 'apply_async'):
+            with self.captureOnCommitCallbacks() as callbacks:
+                drain(self.redis, 10)
+            self.assertFalse(send_alert.called or snapshot.called)
+            for callback in callbacks:
+                callback()
+        send_alert.assert_called_once()
+        self.assertEqual(send_alert.call_args.args[1], "CRITICAL FAILURE")
+        self.assertEqual(snapshot.call_args.kwargs['incident_id'], Incident.objects.get().id)
+
+    def test_writes_directly_without_redis(self):
+        with mock.patch('monitor.funnel.get_redis', side_effect=redis.ConnectionError), \
+                self.assertLogs('monitor.funnel', 'WARNING'):
+            self.assertFalse(submit_result(self.website.id, probe_result()))
@@ -0,0 +1,20 @@
+import logging
+
+from rest_framework.throttling import ScopedRateThrottle
+
+logger = logging.getLogger(__name__)
+
+
+class FailOpenScopedRateThrottle(ScopedRateThrottle):
+    """
+    ScopedRateThrottle that lets requests through when the cache holding the
+    request history is unreachable, so a cache outage doesn't turn every
+    throttled endpoint into a 500.
+    """
+
+    def allow_request(self, request, view):
+        try:
+            return super().allow_request(request, view)
+        except Exception as e:
+            logger.warning(f"Throttle cache unavailable, not throttling: {e}")
+            return True
@@ -0,0 +1,97 @@
+import json
+import time
+import uuid
+import logging
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Website
+from .utils import get_redis
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'check_pending:{}'
+JOB_KEY = 'trigger_job:{}'
+JOB_TTL = 3600
+
+
+def mark_pending(r, website_ids, ttl):
+    """SET NX a pending marker per website; returns the ids that were not already pending."""
+    with r.pipeline() as pipe:
+        for website_id in website_ids:
+            pipe.set(PENDING_KEY.format(website_id), 1, nx=True, ex=ttl)
+        claimed = pipe.execute()
+    return [website_id for website_id, ok in zip(website_ids, claimed) if ok]
+
+
+def clear_pending(website_id):
+    """Called when a check starts so the next manual trigger queues again."""
+    try:
+        get_redis().delete(PENDING_KEY.format(website_id))
+    except Exception as e:
+        logger.debug(f"Could not clear pending marker for {website_id}: {e}")
+
+
+def trigger_checks(websites, user):
+    """
+    Queue manual checks for `websites`, skipping ones checked in the last
+    TRIGGER_RECENT_SECONDS and merging ones that already have a check queued.
+    The rest are dispatched in batches of TRIGGER_BATCH_SIZE spaced
+    TRIGGER_BATCH_INTERVAL seconds apart. Returns the job record.
+    """
+    from .tasks import check_website
+
+    now = timezone.now()
+    recent_cutoff = now - timedelta(seconds=settings.TRIGGER_RECENT_SECONDS)
+    rows = list(websites.values_list('id', 'last_check_time'))
+    recent = [pk for pk, last in rows if last and last >= recent_cutoff]
+    candidates = [pk for pk, last in rows if not last or last < recent_cutoff]
+
+    r = get_redis()
+    batch_size = settings.TRIGGER_BATCH_SIZE
+    # Keep the marker until the last batch has had time to start
+    ttl = settings.TRIGGER_COALESCE_SECONDS + (len(candidates) // batch_size) * settings.TRIGGER_BATCH_INTERVAL
+    queued = mark_pending(r, candidates, int(ttl) + 1)
+    coalesced = sorted(set(candidates) - set(queued))
+
+    for batch, start in enumerate(range(0, len(queued), batch_size)):
+        for website_id in queued[start:start + batch_size]:
+            check_website.apply_async(args=[website_id], kwargs={"manual": True},
+                                      countdown=batch * settings.TRIGGER_BATCH_INTERVAL)
+
+    job = {
+        "id": uuid.uuid4().hex,
+        "user_id": user.pk,
+        "created": time.time(),
+        "queued": queued,
+        "coalesced": coalesced,
+        "recent": recent,
+    }
+    r.set(JOB_KEY.format(job['id']), json.dumps(job), ex=JOB_TTL)
+    return job
+
+
+def job_status(job_id, user):
+    raw = get_redis().get(JOB_KEY.format(job_id))
+    if not raw:
+        return None
+    job = json.loads(raw)
+    if job['user_id'] != user.pk and not (user.is_master or user.is_staff):
+        return None
+
+    tracked = job['queued'] + job['coalesced']
+    created = datetime.fromtimestamp(job['created'], tz=timezone.get_current_timezone())
+    done = Website.objects.filter(id__in=tracked, last_check_time__gte=created).count()
+    return {
+        "id": job['id'],
+        "created": created,
+        "total": len(tracked) + len(job['recent']),
+        "queued": len(job['queued']),
+        "coalesced": len(job['coalesced']),
+        "recently_checked": len(job['recent']),
+        "completed": done,
+        "pending": len(tracked) - done,
+        "finished": done >= len(tracked),
+    }
@@ -0,0 +1,333 @@
+"""
+Append-only, compressed store for per-website probe samples.
+
+Each website gets a directory under TSDB_DIR with
+  head.bin              raw fixed-size records, appended as results come in
+  lock                  flock()ed around appends and sealing
+  <first>-<last>-<n>-<hash>.blk  sealed blocks of TSDB_BLOCK_SAMPLES samples,
+                        written once and never modified (times are epoch
+                        milliseconds, the hash identifies the contents)
+
+Block columns are encoded Gorilla-style but byte aligned, so a block decodes
+with a few vectorized NumPy operations instead of a bit-by-bit loop:
+timestamps as zigzagged delta-of-deltas, floats XORed with their
+predecessor, and every column byte-shuffled and deflated. Regular check
+intervals collapse to zero bytes and similar latencies share their sign,
+exponent and high mantissa bytes, which zlib squeezes out.
+
+With TSDB_ENABLED every recorded result is also appended here, and the
+history endpoint, fleet summary, uptime percentage and replay_latency read
+from the store instead of MonitorLog; `manage.py tsdb_backfill` imports
+existing logs. In Docker, put TSDB_DIR on the shared volume.
+"""
+import fcntl
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+HEAD = 'head.bin'
+LOCK = 'lock'
+SEALING = 'head.sealing'
+MAGIC = b'TSB1'
+HEADER = struct.Struct('<4sIqq')
+SECTION = struct.Struct('<I')
+
+RECORD = np.dtype([
+    ('t', '<i8'),
+    ('response_time', '<f8'),
+    ('ttfb', '<f8'),
+    ('status_code', '<i2'),
+    ('payload_size', '<i4'),
+    ('is_success', 'u1'),
+])
+# Column -> codec, in on-disk order
+COLUMNS = (
+    ('t', 'dod'),
+    ('response_time', 'xor'),
+    ('ttfb', 'xor'),
+    ('status_code', 'raw'),
+    ('payload_size', 'raw'),
+    ('is_success', 'raw'),
+)
+
+
+def _shuffle(values):
+    """Group byte 0 of every value, then byte 1, ... so zlib sees long similar runs."""
+    return values.view(np.uint8).reshape(-1, values.itemsize).T.tobytes()
+
+
+def _unshuffle(buf, dtype, count):
+    return np.frombuffer(buf, np.uint8).reshape(dtype.itemsize, count).T.copy().view(dtype).ravel()
+
+
+def _encode(values, codec):
+    if codec == 'dod':
+        dod = np.diff(np.diff(values, prepend=0), prepend=0)
+        values = ((dod << 1) ^ (dod >> 63)).astype('<u8')
+    elif codec == 'xor':
+        bits = values.view('<u8')
+        values = bits ^ np.concatenate((np.zeros(1, '<u8'), bits[:-1]))
+    return zlib.compress(_shuffle(np.ascontiguousarray(values)), 6)
+
+
+def _decode(buf, codec, dtype, count):
+    if codec == 'dod':
+        zigzag = _unshuffle(zlib.decompress(buf), np.dtype('<u8'), count)
+        dod = (zigzag >> 1).astype('<i8') ^ -(zigzag & 1).astype('<i8')
+        return np.cumsum(np.cumsum(dod))
+    if codec == 'xor':
+        bits = _unshuffle(zlib.decompress(buf), np.dtype('<u8'), count)
+        return np.bitwise_xor.accumulate(bits).view(dtype)
+    return _unshuffle(zlib.decompress(buf), dtype, count)
+
+
+def encode_block(records):
+    records = np.sort(records, order='t', kind='stable')
+    sections = [_encode(np.ascontiguousarray(records[name]), codec) for name, codec in COLUMNS]
+    header = HEADER.pack(MAGIC, len(records), int(records['t'][0]), int(records['t'][-1]))
+    return header + b''.join(SECTION.pack(len(s)) + s for s in sections)
+
+
+@lru_cache(maxsize=256)
+def read_block(path):
+    """Decode a sealed block (memory-mapped) into a record array. Blocks are immutable, so cached by path."""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            magic, count, _, _ = HEADER.unpack_from(view)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a sample block")
+            records = np.empty(count, dtype=RECORD)
+            offset = HEADER.size
+            for name, codec in COLUMNS:
+                (length,) = SECTION.unpack_from(view, offset)
+                offset += SECTION.size
+                records[name] = _decode(view[offset:offset + length], codec, RECORD[name], count)
+                offset += length
+        finally:
+            view.release()
+    records.flags.writeable = False
+    return records
+
+
+def _block_name(records):
+    # Time range and count alone can collide for different samples; the hash can't
+    digest = hashlib.sha1(np.ascontiguousarray(records).tobytes()).hexdigest()[:16]
+    return f"{int(records['t'].min())}-{int(records['t'].max())}-{len(records)}-{digest}.blk"
+
+
+def _read_records(path):
+    """Whole records of a raw head file; a torn trailing append is ignored."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return np.empty(0, dtype=RECORD)
+    usable = len(data) - len(data) % RECORD.itemsize
+    return np.frombuffer(data[:usable], dtype=RECORD)
+
+
+def series_dir(website_id):
+    return os.path.join(settings.TSDB_DIR, str(int(website_id)))
+
+
+def to_records(rows):
+    """
+    RECORD array from (timestamp, response_time, ttfb, status_code,
+    payload_size, is_success) tuples; missing values become NaN / -1.
+    """
+    return np.array([
+        (
+            int(timestamp.timestamp() * 1000),
+            response_time,
+            np.nan if ttfb is None else ttfb,
+            -1 if status_code is None else status_code,
+            -1 if payload_size is None else payload_size,
+            bool(is_success),
+        )
+        for timestamp, response_time, ttfb, status_code, payload_size, is_success in rows
+    ], dtype=RECORD)
+
+
+def record(website_id, timestamp, result):
+    """Append one probe result; storage errors are logged, never raised into the check."""
+    try:
+        append(website_id, to_records([(
+            timestamp, result['response_time'], result.get('ttfb'), result.get('status_code'),
+            result.get('payload_size'), result['is_success'],
+        )]))
+    except Exception as e:
+        logger.warning(f"Failed to append sample for website {website_id}: {e}")
+
+
+@contextmanager
+def _locked(directory):
+    """Exclusive per-website lock shared by appends and sealing."""
+    with open(os.path.join(directory, LOCK), 'ab') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def append(website_id, records):
+    """Append RECORD rows to a website's head and seal full blocks."""
+    directory = series_dir(website_id)
+    os.makedirs(directory, exist_ok=True)
+    with _locked(directory):
+        with open(os.path.join(directory, HEAD), 'ab') as head:
+            head.write(np.ascontiguousarray(records, dtype=RECORD).tobytes())
+            size = head.tell()
+        if size >= settings.TSDB_BLOCK_SAMPLES * RECORD.itemsize:
+            _seal(directory)
+
+
+def seal(website_id):
+    """Seal whatever is in the head now, e.g. after a backfill."""
+    directory = series_dir(website_id)
+    if os.path.isdir(directory):
+        with _locked(directory):
+            _seal(directory)
+
+
+def _chunks(records):
+    size = settings.TSDB_BLOCK_SAMPLES
+    return [records[start:start + size] for start in range(0, len(records), size)]
+
+
+def _seal(directory):
+    """
+    Turn the head into sealed blocks (lock held). The head is first renamed
+    to head.sealing and only removed once its blocks exist; block names are
+    derived from their contents, so a sealing interrupted at any point is
+    finished on the next call without losing or duplicating samples.
+    """
+    sealing = os.path.join(directory, SEALING)
+    head = os.path.join(directory, HEAD)
+    while True:
+        if not os.path.exists(sealing):
+            if not os.path.exists(head) or os.path.getsize(head) == 0:
+                return
+            os.rename(head, sealing)
+        for chunk in _chunks(_read_records(sealing)):
+            path = os.path.join(directory, _block_name(chunk))
+            if not os.path.exists(path):
+                tmp = f"{path}.tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(encode_block(chunk))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, path)
+        os.unlink(sealing)
+
+
+def _blocks(directory):
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    blocks = []
+    for name in names:
+        if name.endswith('.blk'):
+            first, last, count = name[:-4].split('-')[:3]
+            blocks.append((int(first), int(last), int(count), os.path.join(directory, name)))
+    return blocks
+
+
+def scan(website_id, start=None, end=None):
+    """
+    Samples with start <= time < end (aware datetimes, None = open) as a
+    time-ordered record array: only overlapping blocks are decoded, plus the
+    unsealed head. Times are epoch milliseconds in the `t` column.
+    """
+    lo = int(start.timestamp() * 1000) if start else -2 ** 63
+    hi = int(end.timestamp() * 1000) if end else 2 ** 63 - 1
+    directory = series_dir(website_id)
+    blocks = _blocks(directory)
+    sealed = {os.path.basename(path) for _, _, _, path in blocks}
+
+    parts = [read_block(path) for first, last, _, path in blocks if first < hi and last >= lo]
+    # A head being sealed right now: only the chunks whose block is not written yet
+    parts += [chunk for chunk in _chunks(_read_records(os.path.join(directory, SEALING)))
+              if _block_name(chunk) not in sealed]
+    parts.append(_read_records(os.path.join(directory, HEAD)))
+
+    records = np.concatenate(parts) if parts else np.empty(0, dtype=RECORD)
+    records = records[(records['t'] >= lo) & (records['t'] < hi)]
+    if len(records) > 1 and np.any(np.diff(records['t']) < 0):
+        records = np.sort(records, order='t', kind='stable')
+    return records
+
+
+def as_logs(records):
+    """Newest-first dicts shaped like MonitorLogSerializer output (no id or error message)."""
+    logs = []
+    for row in records[::-1].tolist():
+        t, response_time, ttfb, status_code, payload_size, is_success = row
+        logs.append({
+            "timestamp": datetime.fromtimestamp(t / 1000, tz=dt_timezone.utc).isoformat().replace('+00:00', 'Z'),
+            "status_code": None if status_code < 0 else status_code,
+            "response_time": response_time,
+            "ttfb": None if math.isnan(ttfb) else ttfb,
+            "payload_size": None if payload_size < 0 else payload_size,
+            "is_success": bool(is_success),
+        })
+    return logs
+
+
+def rollup(records, start, bucket_seconds, buckets):
+    """
+    Per-bucket check count, success count and mean successful response
+    time (NaN when none) for `buckets` buckets of `bucket_seconds` from
+    `start`, computed with bincount rather than a Python loop.
+    """
+    index = (records['t'] - int(start.timestamp() * 1000)) // (bucket_seconds * 1000)
+    keep = (index >= 0) & (index < buckets)
+    index, records = index[keep], records[keep]
+    ok = records['is_success'].astype(bool)
+    checks = np.bincount(index, minlength=buckets)
+    successes = np.bincount(index[ok], minlength=buckets)
+    latency_sum = np.bincount(index[ok], weights=records['response_time'][ok], minlength=buckets)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        latency = latency_sum / successes
+    return {"checks": checks, "ok": successes, "latency": latency}
+
+
+def uptime(records):
+    """(checks, successes) over all of `records`, as one rollup bucket."""
+    if not len(records):
+        return 0, 0
+    start = datetime.fromtimestamp(int(records['t'][0]) // 1000, tz=dt_timezone.utc)
+    span = (int(records['t'][-1]) - int(start.timestamp() * 1000)) // 1000 + 1
+    totals = rollup(records, start, span, 1)
+    return int(totals['checks'][0]), int(totals['ok'][0])
+
+
+def usage(website_id):
+    """Earliest sample time, sealed and unsealed sample counts and bytes on disk for one website."""
+    directory = series_dir(website_id)
+    blocks = _blocks(directory)
+    head = os.path.join(directory, HEAD)
+    head_bytes = os.path.getsize(head) if os.path.exists(head) else 0
+    firsts = [first for first, _, _, _ in blocks]
+    head_records = _read_records(head)
+    if len(head_records):
+        firsts.append(int(head_records['t'].min()))
+    return {
+        "first_ms": min(firsts) if firsts else None,
+        "blocks": len(blocks),
+        "sealed_samples": sum(count for _, _, count, _ in blocks),
+        "sealed_bytes": sum(os.path.getsize(path) for _, _, _, path in blocks),
+        "head_samples": head_bytes // RECORD.itemsize,
+        "head_bytes": head_bytes,
+    }
@@ -0,0 +1,50 @@
+import time
+
+import redis
+from django.conf import settings
+
+from .models import SystemConfig
+
+# Other processes learn about a changed custom_redis_url within this many seconds
+CONFIG_TTL = 60
+
+_redis_url = None
+_redis_url_at = 0.0
+_clients = {}
+
+
+def redis_url(config=None):
+    """The configured Redis URL, read from SystemConfig at most every CONFIG_TTL seconds."""
+    global _redis_url, _redis_url_at
+    if config is not None:
+        return config.custom_redis_url or settings.CELERY_BROKER_URL
+    if _redis_url is None or time.monotonic() - _redis_url_at > CONFIG_TTL:
+        _redis_url = redis_url(SystemConfig.get_solo())
+        _redis_url_at = time.monotonic()
+    return _redis_url
+
+
+def _client(url, socket_timeout):
+    key = (url, socket_timeout)
+    client = _clients.get(key)
+    if client is None:
+        client = _clients[key] = redis.from_url(url, socket_timeout=socket_timeout)
+    return client
+
+
+def get_redis(config=None, socket_timeout=2):
+    """A per-process client (and connection pool) for the configured Redis."""
+    return _client(redis_url(config), socket_timeout)
+
+
+def get_broker(socket_timeout=2):
+    """A per-process client for the Celery broker, which custom_redis_url doesn't move."""
+    return _client(settings.CELERY_BROKER_URL, socket_timeout)
+
+
+def reset_redis():
+    """Forget the cached URL and clients, e.g. after SystemConfig changed."""
+    global _redis_url
+    _redis_url = None
+    # Not closed: other threads may be mid-command; dropped pools close when collected
+    _clients.clear()
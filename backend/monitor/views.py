@@ -1,24 +1,44 @@
-from django.db import models
 import psutil
 import os
 from rest_framework import viewsets, permissions
 from rest_framework.views import APIView
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.pagination import PageNumberPagination
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.db import connection
 from django.conf import settings
 import redis
 import psycopg2
+import csv
 import json
+import re
 
-from .models import Website, MonitorLog, SystemConfig, SystemSnapshot
-from .serializers import WebsiteSerializer, MonitorLogSerializer, SystemSnapshotSerializer
+from .models import Website, MonitorLog, SystemConfig, SystemSnapshot, Incident, ErrorCount
+from .serializers import (
+    WebsiteSerializer, MonitorLogSerializer, SystemSnapshotSerializer, SystemSnapshotListSerializer, IncidentHistorySerializer,
+)
+from .profiling import span, SLOW_REQUESTS_KEY
+from .utils import get_redis
+from .access import visible_websites, scope_to_websites, has_full_access, accessible_website_ids
+from .parsers import CSVParser, read_csv_rows
+from .bulk import import_websites
+from .triggers import trigger_checks, job_status
+from .throttling import FailOpenScopedRateThrottle
+from . import analytics, export, tsdb
+from .fleet import fleet_summary
+from .errors import top_errors
+from .budgets import budget_status
+from .backpressure import dispatch_state
 
 @method_decorator(csrf_exempt, name='dispatch')
 class WebsiteViewSet(viewsets.ModelViewSet):
     serializer_class = WebsiteSerializer
+    # Only used by the actions that opt into FailOpenScopedRateThrottle
+    throttle_scope = 'trigger'
 
     @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def history(self, request, pk=None):
@@ -27,7 +47,9 @@ class WebsiteViewSet(viewsets.ModelViewSet):
         from django.utils import timezone
         from datetime import timedelta
         since = timezone.now() - timedelta(hours=hours)
-        logs = website.logs.filter(timestamp__gte=since).order_by('-timestamp')
+        if settings.TSDB_ENABLED:
+            return Response(tsdb.as_logs(tsdb.scan(website.id, since)))
+        logs = website.logs.filter(timestamp__gte=since).select_related('error').order_by('-timestamp')
         
         # Debug: Print to console
         print(f"DEBUG: Fetching history for {website.name} (ID: {website.id}) - Found {logs.count()} logs since {since}")
@@ -35,20 +57,107 @@ class WebsiteViewSet(viewsets.ModelViewSet):
         serializer = MonitorLogSerializer(logs, many=True)
         return Response(serializer.data)
 
-    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated],
+            throttle_classes=[FailOpenScopedRateThrottle])
     def trigger_check(self, request, pk=None):
         website = self.get_object()
-        from .tasks import check_website
-        check_website.delay(website.id)
-        return Response({'status': 'check triggered'})
+        try:
+            job = trigger_checks(Website.objects.filter(id=website.id), request.user)
+        except redis.RedisError:
+            # Redis down: fall back to an uncoalesced dispatch
+            from .tasks import check_website
+            check_website.delay(website.id, manual=True)
+            return Response({'status': 'check triggered'})
+        if job['queued']:
+            return Response({'status': 'check triggered', 'job_id': job['id']})
+        return Response({'status': 'already queued' if job['coalesced'] else 'recently checked', 'job_id': job['id']})
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated],
+            throttle_classes=[FailOpenScopedRateThrottle])
+    def trigger_checks(self, request):
+        """
+        Check many websites now: {"ids": [...]}, {"tag": "..."} or {"all": true}
+        (all websites visible to the user). Returns a job id to poll.
+        """
+        websites = self.get_queryset().filter(is_active=True)
+        if request.data.get('all'):
+            pass
+        elif request.data.get('tag'):
+            tag = re.escape(str(request.data['tag']).strip())
+            websites = websites.filter(tags__iregex=rf'(^|,)\s*{tag}\s*(,|$)')
+        elif isinstance(request.data.get('ids'), list):
+            websites = websites.filter(id__in=[i for i in request.data['ids'] if str(i).isdigit()])
+        else:
+            return Response({"error": "Provide ids, tag or all"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            job = trigger_checks(websites, request.user)
+        except redis.RedisError as e:
+            return Response({"error": f"Dispatcher unavailable ({e})"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({
+            "job_id": job['id'],
+            "queued": len(job['queued']),
+            "coalesced": len(job['coalesced']),
+            "recently_checked": len(job['recent']),
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated],
+            url_path=r'trigger_jobs/(?P<job_id>[0-9a-f]{32})')
+    def trigger_job(self, request, job_id=None):
+        try:
+            job = job_status(job_id, request.user)
+        except redis.RedisError as e:
+            return Response({"error": f"Dispatcher unavailable ({e})"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if job is None:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated],
+            parser_classes=[JSONParser, CSVParser, MultiPartParser])
+    def bulk(self, request):
+        """
+        Create or update many websites at once from a JSON list (or
+        {"websites": [...]}), a text/csv body or a multipart `file` upload.
+        Nothing is written unless every row validates.
+        """
+        if 'file' in request.FILES:
+            try:
+                rows = read_csv_rows(request.FILES['file'].read().decode('utf-8-sig'))
+            except UnicodeDecodeError:
+                return Response({"error": "CSV must be UTF-8"}, status=status.HTTP_400_BAD_REQUEST)
+            except csv.Error as e:
+                return Response({"error": f"CSV parse error - {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        elif isinstance(request.data, dict):
+            rows = request.data.get('websites')
+        else:
+            rows = request.data
+
+        if not isinstance(rows, list) or not rows:
+            return Response({"error": "Expected a non-empty list of websites"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.BULK_IMPORT_MAX_ROWS:
+            return Response({"error": f"At most {settings.BULK_IMPORT_MAX_ROWS} rows per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        ok, results = import_websites(rows, request.user, self.get_queryset())
+        if not ok:
+            return Response({"created": 0, "updated": 0, "results": results}, status=status.HTTP_400_BAD_REQUEST)
+        created = sum(1 for r in results if r['status'] == 'created')
+        return Response({
+            "created": created,
+            "updated": sum(1 for r in results if r['status'] == 'updated'),
+            "results": results,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def summary(self, request):
+        """Compact dashboard view of every visible website with a 24h half-hourly latency sparkline."""
+        return Response(fleet_summary(self.get_queryset()))
 
     def get_queryset(self):
-        if self.request.user.is_master or self.request.user.is_staff:
-            return Website.objects.all()
-        return Website.objects.filter(
-            models.Q(owner=self.request.user) | 
-            models.Q(authorized_users=self.request.user)
-        ).distinct()
+        queryset = visible_websites(self.request.user)
+        if self.action in ('list', 'retrieve'):
+            selected = WebsiteSerializer.selected_fields(self.request.query_params)
+            queryset = WebsiteSerializer.prefetch(queryset, selected)
+        return queryset
 
     def perform_create(self, serializer):
         website = serializer.save(owner=self.request.user)
@@ -60,13 +169,7 @@ class MonitorLogViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = MonitorLogSerializer
     
     def get_queryset(self):
-        if self.request.user.is_master or self.request.user.is_staff:
-            queryset = MonitorLog.objects.all()
-        else:
-            queryset = MonitorLog.objects.filter(
-                models.Q(website__owner=self.request.user) | 
-                models.Q(website__authorized_users=self.request.user)
-            ).distinct()
+        queryset = scope_to_websites(MonitorLog.objects.select_related('error'), self.request.user)
             
         website_id = self.request.query_params.get('website_id')
         if website_id:
@@ -74,15 +177,157 @@ class MonitorLogViewSet(viewsets.ReadOnlyModelViewSet):
             
         return queryset
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Every log in the window, streamed; see export.export_response."""
+        return export.export_response(request, 'logs', export.log_rows)
+
+class IncidentPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+@method_decorator(csrf_exempt, name='dispatch')
+class IncidentViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Incident history plus reliability stats. Filters: website_id, since/until
+    (ISO 8601) or days, and resolved=true|false.
+    """
+    serializer_class = IncidentHistorySerializer
+    pagination_class = IncidentPagination
+
+    def get_queryset(self):
+        queryset = scope_to_websites(Incident.objects.select_related('website'), self.request.user)
+        params = self.request.query_params
+
+        website_id = params.get('website_id')
+        if website_id:
+            queryset = queryset.filter(website_id=website_id)
+        if params.get('resolved') in ('true', 'false'):
+            queryset = queryset.filter(is_resolved=params['resolved'] == 'true')
+        if self.action == 'list':
+            queryset = analytics.with_gaps(queryset)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        try:
+            since, until = analytics.parse_window(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        queryset = self.get_queryset().filter(start_time__gte=since, start_time__lt=until).order_by('-start_time')
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    def _stats_scope(self, request):
+        try:
+            since, until = analytics.parse_window(request.query_params)
+        except ValueError as e:
+            return None, Response({"error": str(e)}, status=400)
+        incidents = self.get_queryset().filter(start_time__gte=since, start_time__lt=until)
+        websites = visible_websites(request.user)
+        website_id = request.query_params.get('website_id')
+        if website_id:
+            websites = websites.filter(id=website_id)
+        scope = 'all' if has_full_access(request.user) else accessible_website_ids(request.user)
+        return (incidents, websites, since, until, scope, website_id), None
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Summary and per-period timeline; `period` is day, week or month."""
+        period = request.query_params.get('period', 'day')
+        if period not in analytics.PERIODS:
+            return Response({"error": f"period must be one of {', '.join(analytics.PERIODS)}"}, status=400)
+        scoped, error = self._stats_scope(request)
+        if error:
+            return error
+        incidents, websites, since, until, scope, website_id = scoped
+
+        def compute():
+            return {
+                "summary": analytics.summary(incidents, since, until, websites.count()),
+                "period": period,
+                "timeline": analytics.timeline(incidents, period),
+            }
+
+        if website_id:
+            return Response(compute())
+        return Response(analytics.cached(scope, dict(request.query_params.items(), view='stats'), compute))
+
+    @action(detail=False, methods=['get'])
+    def by_website(self, request):
+        """Per-website MTTR/MTBF/downtime for websites with incidents in the window, worst first."""
+        scoped, error = self._stats_scope(request)
+        if error:
+            return error
+        incidents, _, since, until, scope, website_id = scoped
+        if website_id:
+            rows = analytics.per_website(incidents, since, until)
+        else:
+            params = {k: v for k, v in request.query_params.items() if k not in ('page', 'page_size')}
+            rows = analytics.cached(scope, dict(params, view='by_website'),
+                                    lambda: analytics.per_website(incidents, since, until))
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(page)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Every incident started in the window, streamed; see export.export_response."""
+        return export.export_response(request, 'incidents', export.incident_rows)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ErrorViewSet(viewsets.ViewSet):
+    """Interned probe errors. `top` ranks them by occurrences; filters: website_id, since/until or days, limit."""
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def top(self, request):
+        params = request.query_params
+        try:
+            since, until = analytics.parse_window(params, default_days=1)
+            limit = min(int(params.get('limit', 20)), 100)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        counts = scope_to_websites(ErrorCount.objects.all(), request.user)
+        if params.get('website_id'):
+            counts = counts.filter(website_id=params['website_id'])
+        return Response({"since": since, "until": until, "results": top_errors(counts, since, until, limit)})
+
+class SnapshotPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
 @method_decorator(csrf_exempt, name='dispatch')
 class SystemSnapshotViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Paginated snapshot summaries (optionally within since/until or days);
+    /api/snapshots/<id>/ returns the full snapshot.
+    """
     serializer_class = SystemSnapshotSerializer
-    
+    pagination_class = SnapshotPagination
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return SystemSnapshotListSerializer
+        return SystemSnapshotSerializer
+
     def get_queryset(self):
         if self.request.user.is_master or self.request.user.is_staff or getattr(self.request.user, 'can_view_crashlytics', False):
-            return SystemSnapshot.objects.all()
+            return SystemSnapshot.objects.select_related('website', 'incident')
         return SystemSnapshot.objects.none()
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset().only(
+            'id', 'title', 'timestamp', 'response_time', 'website__id', 'website__name', 'incident__id', 'incident__is_resolved',
+        )
+        if any(key in request.query_params for key in ('since', 'until', 'days')):
+            try:
+                since, until = analytics.parse_window(request.query_params)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=400)
+            queryset = queryset.filter(timestamp__gte=since, timestamp__lt=until)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
 class SystemHealthView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -96,8 +341,9 @@ class SystemHealthView(APIView):
         db_status = "Healthy"
         if config.custom_postgres_url:
             try:
-                conn = psycopg2.connect(config.custom_postgres_url, connect_timeout=3)
-                conn.close()
+                with span('ext'):
+                    conn = psycopg2.connect(config.custom_postgres_url, connect_timeout=3)
+                    conn.close()
             except Exception as e:
                 db_status = f"Down ({str(e)})"
         else:
@@ -111,8 +357,9 @@ class SystemHealthView(APIView):
         redis_status = "Healthy"
         redis_url = config.custom_redis_url or settings.CELERY_BROKER_URL
         try:
-            r = redis.from_url(redis_url, socket_timeout=2)
-            r.ping()
+            with span('ext'):
+                r = redis.from_url(redis_url, socket_timeout=2)
+                r.ping()
         except Exception as e:
             redis_status = f"Down ({str(e)})"
 
@@ -121,13 +368,21 @@ class SystemHealthView(APIView):
         # Fetch history
         history = []
         try:
-            r = redis.from_url(redis_url, socket_timeout=2)
-            raw = r.lrange('system_health_history', 0, 19)
+            with span('ext'):
+                r = redis.from_url(redis_url, socket_timeout=2)
+                raw = r.lrange('system_health_history', 0, 19)
             history = [json.loads(x) for x in raw]
             history.reverse() # chronological
         except:
             pass
 
+        dispatcher = None
+        try:
+            with span('ext'):
+                dispatcher = dispatch_state(get_redis(config))
+        except Exception:
+            pass
+
         return Response({
             "cpu": psutil.cpu_percent(interval=None),
             "memory": psutil.virtual_memory().percent,
@@ -143,7 +398,10 @@ class SystemHealthView(APIView):
             "cpu_alert_threshold": config.cpu_alert_threshold,
             "memory_alert_threshold": config.memory_alert_threshold,
             "disk_alert_threshold": config.disk_alert_threshold,
-            "history": history
+            "alert_digest_window": config.alert_digest_window,
+            "alert_digest_max_batch": config.alert_digest_max_batch,
+            "history": history,
+            "dispatcher": dispatcher,
         })
         
     def post(self, request):
@@ -164,6 +422,54 @@ class SystemHealthView(APIView):
             config.memory_alert_threshold = int(data['memory_alert_threshold'])
         if 'disk_alert_threshold' in data:
             config.disk_alert_threshold = int(data['disk_alert_threshold'])
+        try:
+            if 'alert_digest_window' in data:
+                config.alert_digest_window = max(0, int(data['alert_digest_window']))
+            if 'alert_digest_max_batch' in data:
+                config.alert_digest_max_batch = max(1, int(data['alert_digest_max_batch']))
+        except (TypeError, ValueError):
+            return Response({"error": "alert_digest_window and alert_digest_max_batch must be integers"}, status=400)
             
         config.save()
         return Response({"status": "Config updated"})
+
+class SlowRequestView(APIView):
+    """
+    Slowest sampled API requests captured by ProfilingMiddleware
+    (REQUEST_PROFILING), slowest first, or newest first with ?sort=recent.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        if not (request.user.is_master or request.user.is_staff):
+            return Response({"error": "Unauthorized"}, status=403)
+        try:
+            raw = get_redis().zrevrange(SLOW_REQUESTS_KEY, 0, -1)
+        except Exception as e:
+            return Response({"error": f"Redis unavailable ({e})"}, status=503)
+        samples = [json.loads(x) for x in raw]
+        if request.query_params.get('sort') == 'recent':
+            samples.sort(key=lambda s: -s['time'])
+        return Response({
+            "enabled": settings.REQUEST_PROFILING,
+            "threshold_ms": settings.SLOW_REQUEST_MS,
+            "results": samples,
+        })
+
+    def delete(self, request):
+        if not (request.user.is_master or request.user.is_staff):
+            return Response({"error": "Unauthorized"}, status=403)
+        get_redis().delete(SLOW_REQUESTS_KEY)
+        return Response(status=204)
+
+class ProbeBudgetView(APIView):
+    """Probe budget limits and usage plus recent delayed or skipped probes (monitor/budgets.py)."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        if not (request.user.is_master or request.user.is_staff):
+            return Response({"error": "Unauthorized"}, status=403)
+        try:
+            return Response(budget_status(get_redis()))
+        except Exception as e:
+            return Response({"error": f"Redis unavailable ({e})"}, status=503)
@@ -12,7 +12,7 @@ const AdminPanel = () => {
         try {
             const [usersRes, websitesRes] = await Promise.all([
                 axios.get('/api/users/'),
-                axios.get('/api/websites/')
+                axios.get('/api/websites/', { params: { fields: 'id,name' } })
             ]);
             setUsers(usersRes.data);
             setWebsites(websitesRes.data);
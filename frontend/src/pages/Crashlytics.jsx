@@ -20,15 +20,19 @@ const Crashlytics = () => {
     const [snapshots, setSnapshots] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const [selectedId, setSelectedId] = useState(null);
     const [selectedSnapshot, setSelectedSnapshot] = useState(null);
+    const [nextPage, setNextPage] = useState(null);
 
+    // The list only carries summary columns; full telemetry is fetched per snapshot
     const fetchSnapshots = async () => {
         try {
             setError(null);
             const res = await axios.get('/api/snapshots/');
-            setSnapshots(res.data);
-            if (res.data.length > 0 && !selectedSnapshot) {
-                setSelectedSnapshot(res.data[0]);
+            setSnapshots(res.data.results);
+            setNextPage(res.data.next);
+            if (res.data.results.length > 0) {
+                setSelectedId(current => current ?? res.data.results[0].id);
             }
         } catch (err) {
             console.error("Failed to fetch snapshots", err);
@@ -38,6 +42,16 @@ const Crashlytics = () => {
         }
     };
 
+    const loadOlder = async () => {
+        try {
+            const res = await axios.get(nextPage);
+            setSnapshots(current => [...current, ...res.data.results.filter(s => !current.some(c => c.id === s.id))]);
+            setNextPage(res.data.next);
+        } catch (err) {
+            console.error("Failed to fetch older snapshots", err);
+        }
+    };
+
     useEffect(() => {
         fetchSnapshots();
         // Refresh every 30s
@@ -45,6 +59,13 @@ const Crashlytics = () => {
         return () => clearInterval(interval);
     }, []);
 
+    useEffect(() => {
+        if (selectedId === null) return;
+        axios.get(`/api/snapshots/${selectedId}/`)
+            .then(res => setSelectedSnapshot(res.data))
+            .catch(err => console.error("Failed to fetch snapshot", err));
+    }, [selectedId]);
+
     if (loading && snapshots.length === 0) {
         return (
             <div className="min-h-[60vh] flex flex-col items-center justify-center gap-4">
@@ -85,11 +106,11 @@ const Crashlytics = () => {
                             {snapshots.map(snap => (
                                 <button
                                     key={snap.id}
-                                    onClick={() => setSelectedSnapshot(snap)}
-                                    className={`w - full text - left p - 4 rounded - xl border transition - all duration - 200 ${selectedSnapshot?.id === snap.id ? 'bg-danger/10 border-danger shadow-[0_0_20px_rgba(239,68,68,0.1)]' : 'bg-slate-900/40 border-slate-800 hover:border-danger/50 hover:bg-slate-900/60'} `}
+                                    onClick={() => setSelectedId(snap.id)}
+                                    className={`w - full text - left p - 4 rounded - xl border transition - all duration - 200 ${selectedId === snap.id ? 'bg-danger/10 border-danger shadow-[0_0_20px_rgba(239,68,68,0.1)]' : 'bg-slate-900/40 border-slate-800 hover:border-danger/50 hover:bg-slate-900/60'} `}
                                 >
                                     <div className="flex items-start justify-between mb-2">
-                                        <div className={`p - 2 rounded - lg ${selectedSnapshot?.id === snap.id ? 'bg-danger/20 text-danger' : 'bg-slate-800 text-secondary'} `}>
+                                        <div className={`p - 2 rounded - lg ${selectedId === snap.id ? 'bg-danger/20 text-danger' : 'bg-slate-800 text-secondary'} `}>
                                             <FileWarning className="w-4 h-4" />
                                         </div>
                                         <span className="text-[10px] font-black uppercase text-secondary/60 tracking-widest flex items-center gap-1">
@@ -103,10 +124,18 @@ const Crashlytics = () => {
                                         <span className="text-secondary">
                                             {new Date(snap.timestamp).toLocaleTimeString()}
                                         </span>
-                                        <ArrowRight className={`w - 3 h - 3 ${selectedSnapshot?.id === snap.id ? 'text-danger' : 'text-slate-700'} `} />
+                                        <ArrowRight className={`w - 3 h - 3 ${selectedId === snap.id ? 'text-danger' : 'text-slate-700'} `} />
                                     </div>
                                 </button>
                             ))}
+                            {nextPage && (
+                                <button
+                                    onClick={loadOlder}
+                                    className="w-full p-3 rounded-xl border border-slate-800 bg-slate-900/40 hover:border-danger/50 text-[10px] font-black uppercase tracking-widest text-secondary"
+                                >
+                                    Load Older Snapshots
+                                </button>
+                            )}
                         </div>
                     </div>
 
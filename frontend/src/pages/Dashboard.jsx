@@ -9,11 +9,11 @@ const WebsiteCard = ({ website }) => {
     const isUp = website.current_status === 'up';
     const navigate = useNavigate();
 
-    // Data for the sparkline chart
-    const chartData = website.recent_logs.slice().reverse().map(l => ({
-        time: new Date(l.timestamp).getTime(),
-        val: Math.round(l.response_time * 1000)
-    }));
+    // 48 half-hourly latency buckets (ms, null when no successful checks)
+    const chartData = website.sparkline.some(v => v !== null)
+        ? website.sparkline.map((val, i) => ({ i, val }))
+        : [];
+    const uptime = website.uptime_24h ?? 100;
 
     return (
         <div
@@ -62,15 +62,15 @@ const WebsiteCard = ({ website }) => {
                     <div className="bg-slate-950/40 p-3 rounded-2xl border border-slate-800/50 backdrop-blur-sm">
                         <p className="text-secondary text-[10px] uppercase font-black tracking-widest mb-1.5 opacity-60">Uptime</p>
                         <div className="flex items-baseline gap-1">
-                            <span className="text-2xl font-black">{Math.floor(website.uptime_percentage)}</span>
-                            <span className="text-xs font-bold text-secondary">%{String(website.uptime_percentage).split('.')[1] || '0'}</span>
+                            <span className="text-2xl font-black">{Math.floor(uptime)}</span>
+                            <span className="text-xs font-bold text-secondary">%{String(uptime).split('.')[1] || '0'}</span>
                         </div>
                     </div>
                     <div className="bg-slate-950/40 p-3 rounded-2xl border border-slate-800/50 backdrop-blur-sm">
                         <p className="text-secondary text-[10px] uppercase font-black tracking-widest mb-1.5 opacity-60">Latency</p>
                         <div className="flex items-baseline gap-1">
                             <span className="text-2xl font-black">
-                                {website.recent_logs.length > 0 ? Math.round(website.recent_logs[0].response_time * 1000) : '--'}
+                                {website.last_latency_ms ?? '--'}
                             </span>
                             <span className="text-xs font-bold text-secondary">ms</span>
                         </div>
@@ -88,6 +88,7 @@ const WebsiteCard = ({ website }) => {
                                     stroke={isUp ? "#10b981" : "#ef4444"}
                                     strokeWidth={3}
                                     dot={false}
+                                    connectNulls
                                     animationDuration={1500}
                                 />
                             </LineChart>
@@ -110,8 +111,8 @@ const Dashboard = () => {
 
     const fetchWebsites = async () => {
         try {
-            const res = await axios.get('/api/websites/');
-            setWebsites(res.data);
+            const res = await axios.get('/api/websites/summary/');
+            setWebsites(res.data.results);
         } catch (err) {
             console.error(err);
         } finally {
@@ -151,13 +152,23 @@ const Dashboard = () => {
                         Real-time latency and uptime analysis across your global infrastructure.
                     </p>
                 </div>
-                <button
-                    onClick={() => setIsModalOpen(true)}
-                    className="group btn btn-primary flex items-center gap-3 px-8 py-4 shadow-2xl shadow-primary/30 w-full lg:w-auto text-lg font-black tracking-tight"
-                >
-                    <Plus className="w-5 h-5 stroke-[3px] group-hover:rotate-90 transition-transform" />
-                    New Monitor
-                </button>
+                <div className="flex flex-col sm:flex-row gap-3 w-full lg:w-auto">
+                    <button
+                        onClick={() => axios.post('/api/websites/trigger_checks/', { all: true })}
+                        className="btn bg-slate-800 hover:bg-primary/20 hover:text-primary flex items-center gap-3 px-6 py-4 w-full lg:w-auto font-black tracking-tight"
+                        title="Check all monitors now"
+                    >
+                        <Activity className="w-5 h-5" />
+                        Pulse All
+                    </button>
+                    <button
+                        onClick={() => setIsModalOpen(true)}
+                        className="group btn btn-primary flex items-center gap-3 px-8 py-4 shadow-2xl shadow-primary/30 w-full lg:w-auto text-lg font-black tracking-tight"
+                    >
+                        <Plus className="w-5 h-5 stroke-[3px] group-hover:rotate-90 transition-transform" />
+                        New Monitor
+                    </button>
+                </div>
             </header>
 
             <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8">
@@ -384,7 +384,7 @@ const WebsiteDetail = () => {
                                 </thead>
                                 <tbody className="divide-y divide-white/5">
                                     {activeLogs.map(log => (
-                                        <tr key={log.id} className="hover:bg-primary/5 transition-colors group">
+                                        <tr key={log.id ?? log.timestamp} className="hover:bg-primary/5 transition-colors group">
                                             <td className="px-6 py-5 text-sm font-bold text-slate-300">
                                                 {new Date(log.timestamp).toLocaleDateString()} <span className="text-slate-500 font-medium ml-2">{new Date(log.timestamp).toLocaleTimeString()}</span>
                                             </td>
@@ -470,6 +470,45 @@ const WebsiteDetail = () => {
                                     <p className="text-[10px] text-secondary font-medium px-2">How fast to pulse when the site is down to detect recovery instantly.</p>
                                 </div>
 
+                                <div className="space-y-4">
+                                    <label className="block text-xs font-black text-secondary uppercase tracking-widest">Probe Type</label>
+                                    <div className="relative group">
+                                        <Activity className="absolute left-4 top-1/2 -translate-y-1/2 w-5 h-5 text-secondary group-focus-within:text-primary transition-colors" />
+                                        <select
+                                            value={config.probe_type || 'http'}
+                                            onChange={(e) => setConfig({ ...config, probe_type: e.target.value })}
+                                            className="w-full bg-slate-950 border border-slate-800 rounded-xl pl-12 pr-4 py-4 focus:outline-none focus:border-primary transition-all"
+                                        >
+                                            <option value="http">HTTP request</option>
+                                            <option value="tcp">TCP connect</option>
+                                            <option value="dns">DNS resolve</option>
+                                            <option value="tls">TLS handshake</option>
+                                        </select>
+                                    </div>
+                                    <p className="text-[10px] text-secondary font-medium px-2">
+                                        TCP, DNS and TLS checks use the URL's host and port (default 80/443 by scheme).
+                                        {website.cert_expires_at ? ` Certificate expires ${new Date(website.cert_expires_at).toLocaleDateString()}.` : ''}
+                                    </p>
+                                </div>
+
+                                <div className="space-y-4">
+                                    <label className="block text-xs font-black text-secondary uppercase tracking-widest">Probe Mode</label>
+                                    <div className="relative group">
+                                        <Globe className="absolute left-4 top-1/2 -translate-y-1/2 w-5 h-5 text-secondary group-focus-within:text-primary transition-colors" />
+                                        <select
+                                            value={config.probe_mode || 'get'}
+                                            onChange={(e) => setConfig({ ...config, probe_mode: e.target.value })}
+                                            className="w-full bg-slate-950 border border-slate-800 rounded-xl pl-12 pr-4 py-4 focus:outline-none focus:border-primary transition-all"
+                                        >
+                                            <option value="get">Full GET</option>
+                                            <option value="head">HEAD only</option>
+                                            <option value="conditional">Conditional GET (ETag / Last-Modified)</option>
+                                            <option value="range">Ranged GET (first bytes only)</option>
+                                        </select>
+                                    </div>
+                                    <p className="text-[10px] text-secondary font-medium px-2">Cheaper modes skip downloading the full page. Servers that reject HEAD or Range fall back to a full GET automatically.</p>
+                                </div>
+
                                 <div className="space-y-4">
                                     <label className="block text-xs font-black text-secondary uppercase tracking-widest">Escalation Threshold</label>
                                     <div className="relative group">
@@ -483,6 +522,38 @@ const WebsiteDetail = () => {
                                     </div>
                                     <p className="text-[10px] text-secondary font-medium px-2">Number of failed pulses required before firing the "Big Alert" email.</p>
                                 </div>
+
+                                <div className="space-y-4">
+                                    <label className="flex items-center gap-3 text-xs font-black text-secondary uppercase tracking-widest">
+                                        <input
+                                            type="checkbox"
+                                            checked={!!config.adaptive_interval}
+                                            onChange={(e) => setConfig({ ...config, adaptive_interval: e.target.checked })}
+                                            className="accent-primary"
+                                        />
+                                        Adaptive Interval (Seconds)
+                                    </label>
+                                    <div className="flex gap-4">
+                                        <input
+                                            type="number"
+                                            disabled={!config.adaptive_interval}
+                                            value={config.adaptive_min_interval}
+                                            onChange={(e) => setConfig({ ...config, adaptive_min_interval: parseInt(e.target.value) })}
+                                            className="w-full bg-slate-950 border border-slate-800 rounded-xl px-4 py-4 focus:outline-none focus:border-primary transition-all disabled:opacity-40"
+                                        />
+                                        <input
+                                            type="number"
+                                            disabled={!config.adaptive_interval}
+                                            value={config.adaptive_max_interval}
+                                            onChange={(e) => setConfig({ ...config, adaptive_max_interval: parseInt(e.target.value) })}
+                                            className="w-full bg-slate-950 border border-slate-800 rounded-xl px-4 py-4 focus:outline-none focus:border-primary transition-all disabled:opacity-40"
+                                        />
+                                    </div>
+                                    <p className="text-[10px] text-secondary font-medium px-2">
+                                        Backs off towards the max while stable and snaps to the min on errors or latency spikes.
+                                        {config.adaptive_interval && website.current_interval ? ` Currently ${website.current_interval}s.` : ''}
+                                    </p>
+                                </div>
                             </div>
 
                             <div className="flex items-center justify-end gap-4 pt-6 mt-6 border-t border-white/5">